@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+"""Benchmark the app's routes against the local Hive-Engine stub.
+
+Starts ``stub_server.py`` in a subprocess, points the app at it through
+``HE_NODES``/``HE_HISTORY_API`` and drives it with Flask's test client. For
+every route it reports throughput and latency percentiles with a cold cache
+(every request starts from empty caches) and a warm one, plus the peak
+Python memory of one request in each state (a separate ``tracemalloc``
+pass, so tracing doesn't skew the timings).
+
+Results can be saved with ``--json`` and compared against an earlier run
+with ``--baseline``; the exit status is 1 if any route regressed by more
+than ``--tolerance``.
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+
+DEFAULT_ROUTES = (
+    "/",
+    "/market/BENCH",
+    "/view/BENCH",
+    "/richlist/BENCH",
+    "/richlist/BENCH/csv",
+    "/api/chart/BENCH/30",
+    "/api/tokens?limit=100",
+    "/api/batch?symbols=BENCH,TOK0000,TOK0001,TOK0002",
+)
+
+
+def start_stub(args):
+    """Start the stub server; returns ``(process, base url)`` once it's ready."""
+    command = [
+        sys.executable,
+        os.path.join(BENCH_DIR, "stub_server.py"),
+        "--port",
+        "0",
+        "--latency",
+        str(args.latency),
+        "--jitter",
+        str(args.jitter),
+        "--seed",
+        str(args.seed),
+    ]
+    if args.fixtures:
+        command += ["--fixtures", args.fixtures]
+    else:
+        command += [
+            "--tokens",
+            str(args.tokens),
+            "--holders",
+            str(args.holders),
+            "--trades",
+            str(args.trades),
+        ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line:
+        process.wait()
+        sys.exit(f"Stub server failed to start (exit {process.returncode})")
+    return process, line.rsplit(" ", 1)[-1].strip()
+
+
+def create_bench_app(stub_url, cache_type):
+    # Config reads the environment at import time, so set it first.
+    os.environ["HE_NODES"] = stub_url
+    os.environ["HE_HISTORY_API"] = stub_url.rstrip("/")
+    os.environ.setdefault("SLOW_REQUEST_THRESHOLD", "0")
+    sys.path.insert(0, os.path.join(ROOT, "src"))
+
+    from viewr import create_app
+    from viewr.config import config_by_name
+
+    config = config_by_name["prod"]
+    # Keep Redis benchmark keys apart so clearing them leaves the rest alone.
+    config.CACHE_KEY_PREFIX = "bench:"
+    if cache_type == "simple":
+        config.get_cache_config = staticmethod(lambda: "SimpleCache")
+    app = create_app("prod")
+    logging.getLogger().setLevel(logging.ERROR)
+    app.logger.setLevel(logging.ERROR)
+    return app
+
+
+def reset_caches(app):
+    """Empty the shared cache and every per-process cache the app keeps."""
+    from viewr.extensions import cache
+    from viewr.services import token_index
+    from viewr.utils import caching
+
+    with app.app_context():
+        cache.clear()
+    caching._local_tier = caching._LocalTier()
+    with token_index._index_lock:
+        token_index._index = None
+        token_index._index_version = None
+        token_index._metrics = None
+        token_index._next_check = 0.0
+
+
+def _request(client, route):
+    start = time.perf_counter()
+    response = client.get(route)
+    response.get_data()
+    seconds = time.perf_counter() - start
+    if response.status_code >= 400:
+        raise RuntimeError(f"{route} returned {response.status_code}")
+    return seconds
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _summary(samples, wall):
+    return {
+        "requests": len(samples),
+        "throughput": round(len(samples) / wall, 2) if wall else None,
+        "mean": round(statistics.fmean(samples), 5),
+        "p50": round(_percentile(samples, 50), 5),
+        "p90": round(_percentile(samples, 90), 5),
+        "p99": round(_percentile(samples, 99), 5),
+        "max": round(max(samples), 5),
+    }
+
+
+def run_cold(app, route, count):
+    """Time ``count`` sequential requests, each against empty caches."""
+    client = app.test_client()
+    samples = []
+    wall = 0.0
+    for _ in range(count):
+        reset_caches(app)
+        seconds = _request(client, route)
+        samples.append(seconds)
+        wall += seconds
+    return _summary(samples, wall)
+
+
+def run_warm(app, route, count, concurrency):
+    """Time ``count`` requests spread over ``concurrency`` threads."""
+    _request(app.test_client(), route)
+    samples = []
+    errors = []
+    lock = threading.Lock()
+    remaining = [count]
+
+    def worker():
+        client = app.test_client()
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            try:
+                seconds = _request(client, route)
+            except Exception as e:
+                errors.append(e)
+                return
+            with lock:
+                samples.append(seconds)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+    if errors:
+        raise errors[0]
+    return _summary(samples, wall)
+
+
+def peak_memory(app, route):
+    """Peak traced Python memory of one cold and one warm request, in bytes."""
+    client = app.test_client()
+    reset_caches(app)
+    peaks = {}
+    tracemalloc.start()
+    try:
+        for phase in ("cold", "warm"):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            _request(client, route)
+            peaks[phase] = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def compare(results, baseline, tolerance):
+    """Return regression messages for routes slower than ``baseline``."""
+    regressions = []
+    for route, phases in results.items():
+        for phase, current in phases.items():
+            previous = baseline.get(route, {}).get(phase)
+            if not previous:
+                continue
+            for field in ("p50", "p90"):
+                if current[field] > previous[field] * (1 + tolerance):
+                    regressions.append(
+                        f"{route} {phase} {field}: {previous[field] * 1000:.1f}ms"
+                        f" -> {current[field] * 1000:.1f}ms"
+                    )
+            if previous.get("peak_bytes") and current["peak_bytes"] > previous[
+                "peak_bytes"
+            ] * (1 + tolerance):
+                regressions.append(
+                    f"{route} {phase} peak memory: {previous['peak_bytes'] / 1e6:.1f}MB"
+                    f" -> {current['peak_bytes'] / 1e6:.1f}MB"
+                )
+    return regressions
+
+
+def print_table(results):
+    header = (
+        f"{'route':<48} {'phase':<5} {'req/s':>8} {'p50 ms':>8} {'p90 ms':>8}"
+        f" {'p99 ms':>8} {'max ms':>8} {'peak MB':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    for route, phases in results.items():
+        for phase, r in phases.items():
+            print(
+                f"{route[:48]:<48} {phase:<5} {r['throughput'] or 0:>8.1f}"
+                f" {r['p50'] * 1000:>8.1f} {r['p90'] * 1000:>8.1f}"
+                f" {r['p99'] * 1000:>8.1f} {r['max'] * 1000:>8.1f}"
+                f" {r['peak_bytes'] / 1e6:>8.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("routes", nargs="*", default=DEFAULT_ROUTES)
+    parser.add_argument("--cold", type=int, default=5, help="cold requests per route")
+    parser.add_argument("--warm", type=int, default=200, help="warm requests per route")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--cache", choices=("simple", "redis"), default="simple")
+    parser.add_argument("--stub-url", help="use an already running stub server")
+    parser.add_argument("--fixtures", help="recorded fixtures for the stub")
+    parser.add_argument("--tokens", type=int, default=500)
+    parser.add_argument("--holders", type=int, default=100_000)
+    parser.add_argument("--trades", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.02, help="stub seconds/call")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--json", help="write the results here")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    process = None
+    stub_url = args.stub_url
+    if stub_url is None:
+        process, stub_url = start_stub(args)
+    try:
+        app = create_bench_app(stub_url, args.cache)
+        results = {}
+        for route in args.routes:
+            print(f"Benchmarking {route} ...", file=sys.stderr)
+            peaks = peak_memory(app, route)
+            results[route] = {
+                "cold": run_cold(app, route, args.cold),
+                "warm": run_warm(app, route, args.warm, args.concurrency),
+            }
+            for phase, peak in peaks.items():
+                results[route][phase]["peak_bytes"] = peak
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "settings": {
+                        k: v for k, v in vars(args).items() if k not in ("json",)
+                    },
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""Record fixtures for ``stub_server.py`` from a live Hive-Engine node.
+
+Copies the tables the app reads for the given tokens (plus the token list,
+market metrics and the tokens' pools), and their market history, into one
+JSON file for ``stub_server.py --fixtures``.
+"""
+
+import argparse
+import json
+import time
+
+import requests
+
+PAGE = 1000
+
+
+class Recorder:
+    def __init__(self, node, history_api):
+        self.url = node.rstrip("/") + "/contracts"
+        self.history_api = history_api.rstrip("/")
+        self.session = requests.Session()
+        self.tables = {}
+
+    def find_all(self, contract, table, query, max_rows=None):
+        """Page through ``contract.table`` for ``query`` and keep the rows."""
+        rows = []
+        while max_rows is None or len(rows) < max_rows:
+            response = self.session.post(
+                self.url,
+                json={
+                    "jsonrpc": "2.0",
+                    "id": 1,
+                    "method": "find",
+                    "params": {
+                        "contract": contract,
+                        "table": table,
+                        "query": query,
+                        "limit": PAGE,
+                        "offset": len(rows),
+                    },
+                },
+                timeout=30,
+            )
+            response.raise_for_status()
+            page = response.json().get("result") or []
+            rows.extend(page)
+            if len(page) < PAGE:
+                break
+        self.tables.setdefault(f"{contract}.{table}", []).extend(rows)
+        return rows
+
+    def market_history(self, symbol, days):
+        response = self.session.get(
+            f"{self.history_api}/marketHistory",
+            params={
+                "symbol": symbol,
+                "timestampStart": int((time.time() - days * 86400) * 1000),
+            },
+            timeout=30,
+        )
+        response.raise_for_status()
+        return response.json()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("symbols", nargs="+", help="tokens to record in full")
+    parser.add_argument("--node", default="https://api.hive-engine.com/rpc/")
+    parser.add_argument("--history-api", default="https://history.hive-engine.com")
+    parser.add_argument("--days", type=int, default=90, help="market history to keep")
+    parser.add_argument("--max-trades", type=int, default=10_000)
+    parser.add_argument("-o", "--output", default="fixtures.json")
+    args = parser.parse_args()
+
+    recorder = Recorder(args.node, args.history_api)
+    recorder.find_all("tokens", "tokens", {})
+    recorder.find_all("market", "metrics", {})
+    history = {}
+    for symbol in args.symbols:
+        print(f"Recording {symbol} ...")
+        query = {"symbol": symbol}
+        recorder.find_all("tokens", "balances", query)
+        recorder.find_all("market", "buyBook", query)
+        recorder.find_all("market", "sellBook", query)
+        recorder.find_all("market", "tradesHistory", query, args.max_trades)
+        pools = recorder.find_all(
+            "marketpools",
+            "pools",
+            {"tokenPair": {"$regex": f"(^|:){symbol}(:|$)"}},
+        )
+        for pool in pools:
+            recorder.find_all(
+                "marketpools", "liquidityPositions", {"tokenPair": pool["tokenPair"]}
+            )
+        history[symbol] = recorder.market_history(symbol, args.days)
+
+    # Tokens sharing a pool record it twice.
+    tables = {
+        name: list({row["_id"]: row for row in rows}.values())
+        for name, rows in recorder.tables.items()
+    }
+    with open(args.output, "w") as f:
+        json.dump({"tables": tables, "market_history": history}, f)
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,471 @@
+#!/usr/bin/env python
+"""Local Hive-Engine stand-in for offline benchmarks.
+
+Serves the JSON-RPC ``find``/``findOne`` contract calls (single or batched),
+``blockchain.getLatestBlockInfo`` and the history API's ``marketHistory``
+from recorded or synthetic fixtures, with adjustable latency.
+
+Fixtures are JSON: ``{"tables": {"contract.table": [rows]}, "market_history":
+{symbol: [candles]}}``, as written by ``--save-fixtures`` or
+``record_fixtures.py``. Without ``--fixtures`` a synthetic dataset is
+generated: ``--tokens`` ordinary tokens plus ``BENCH``, which has
+``--holders`` holders.
+"""
+
+import argparse
+import bisect
+import json
+import random
+import re
+import string
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+BIG_TOKEN = "BENCH"
+DAY = 24 * 60 * 60
+
+
+def account_name(i):
+    """Return a distinct synthetic account name for ``i``.
+
+    The leading letter cycles through the alphabet so holders spread over
+    the app's account-prefix partitions the way real names do.
+    """
+    return f"{string.ascii_lowercase[i % 26]}user{i:07d}"
+
+
+def synthetic_fixtures(tokens=500, holders=100_000, trades=2000, days=30, seed=1):
+    """Return a generated dataset shaped like the Hive-Engine tables."""
+    rng = random.Random(seed)
+    now = int(time.time())
+    symbols = [BIG_TOKEN] + [f"TOK{i:04d}" for i in range(tokens)]
+    tables = {
+        "tokens.tokens": [],
+        "tokens.balances": [],
+        "market.metrics": [],
+        "market.buyBook": [],
+        "market.sellBook": [],
+        "market.tradesHistory": [],
+        "marketpools.pools": [],
+        "marketpools.liquidityPositions": [],
+    }
+    history = {}
+    next_id = {name: 0 for name in tables}
+
+    def add(table, row):
+        next_id[table] += 1
+        tables[table].append({"_id": next_id[table], **row})
+
+    for symbol in symbols:
+        supply = rng.uniform(1e4, 1e9)
+        price = rng.uniform(0.0001, 10)
+        add(
+            "tokens.tokens",
+            {
+                "issuer": "stub",
+                "symbol": symbol,
+                "name": f"{symbol.title()} Token",
+                "metadata": json.dumps(
+                    {
+                        "url": f"https://example.com/{symbol.lower()}",
+                        "icon": f"https://example.com/{symbol.lower()}.png",
+                        "desc": f"Synthetic token {symbol} for benchmarks.",
+                    }
+                ),
+                "precision": 8,
+                "maxSupply": f"{supply * 2:.8f}",
+                "supply": f"{supply:.8f}",
+                "circulatingSupply": f"{supply * 0.9:.8f}",
+                "stakingEnabled": True,
+                "delegationEnabled": True,
+            },
+        )
+        add(
+            "market.metrics",
+            {
+                "symbol": symbol,
+                "volume": f"{rng.uniform(0, 1e5):.8f}",
+                "volumeExpiration": now + DAY,
+                "lastPrice": f"{price:.8f}",
+                "lowestAsk": f"{price * 1.01:.8f}",
+                "highestBid": f"{price * 0.99:.8f}",
+                "lastDayPrice": f"{price * 0.95:.8f}",
+                "lastDayPriceExpiration": now + DAY,
+                "priceChangeHive": f"{price * 0.05:.8f}",
+                "priceChangePercent": "5.26%",
+            },
+        )
+        count = holders if symbol == BIG_TOKEN else rng.randint(10, 200)
+        for i in range(count):
+            add(
+                "tokens.balances",
+                {
+                    "account": account_name(i),
+                    "symbol": symbol,
+                    "balance": f"{rng.paretovariate(1.2):.8f}",
+                    "stake": f"{rng.paretovariate(1.5):.8f}",
+                    "pendingUnstake": "0",
+                    "delegationsIn": "0",
+                    "delegationsOut": "0",
+                    "pendingUndelegations": "0",
+                },
+            )
+        for side, factor in (("market.buyBook", 0.99), ("market.sellBook", 1.01)):
+            for i in range(rng.randint(20, 150)):
+                quantity = rng.uniform(1, 1000)
+                order_price = price * factor ** (i + 1)
+                add(
+                    side,
+                    {
+                        "txId": f"{side}-{symbol}-{i}",
+                        "timestamp": now - rng.randint(0, days * DAY),
+                        "account": account_name(rng.randint(0, 999)),
+                        "symbol": symbol,
+                        "quantity": f"{quantity:.8f}",
+                        "price": f"{order_price:.8f}",
+                        "tokensLocked": f"{quantity * order_price:.8f}",
+                        "expiration": now + 30 * DAY,
+                    },
+                )
+        count = trades if symbol == BIG_TOKEN else trades // 20
+        for i in range(count):
+            quantity = rng.uniform(1, 1000)
+            add(
+                "market.tradesHistory",
+                {
+                    "type": rng.choice(("buy", "sell")),
+                    "buyer": account_name(rng.randint(0, 999)),
+                    "seller": account_name(rng.randint(0, 999)),
+                    "symbol": symbol,
+                    "quantity": f"{quantity:.8f}",
+                    "price": f"{price:.8f}",
+                    "volume": f"{quantity * price:.8f}",
+                    "timestamp": now - days * DAY + i * days * DAY // count,
+                    "buyTxId": f"b{i}",
+                    "sellTxId": f"s{i}",
+                },
+            )
+        candles = []
+        close = price
+        for hour in range(days * 24, 0, -1):
+            open_ = close
+            close = max(open_ * rng.uniform(0.97, 1.03), 1e-8)
+            candles.append(
+                {
+                    "timestamp": (now // 3600 - hour) * 3600,
+                    "openPrice": open_,
+                    "closePrice": close,
+                    "highestPrice": max(open_, close) * 1.01,
+                    "lowestPrice": min(open_, close) * 0.99,
+                    "volumeSteem": rng.uniform(0, 1000),
+                    "volumeToken": rng.uniform(0, 1000),
+                }
+            )
+        history[symbol] = candles
+
+    for symbol in symbols[:50]:
+        pair = f"SWAP.HIVE:{symbol}"
+        add(
+            "marketpools.pools",
+            {
+                "tokenPair": pair,
+                "baseQuantity": f"{rng.uniform(1e3, 1e6):.8f}",
+                "quoteQuantity": f"{rng.uniform(1e3, 1e6):.8f}",
+                "basePrice": "1.0",
+                "quotePrice": "1.0",
+                "totalShares": f"{rng.uniform(1e3, 1e6):.8f}",
+                "baseVolume": f"{rng.uniform(0, 1e5):.8f}",
+                "quoteVolume": f"{rng.uniform(0, 1e5):.8f}",
+                "precision": 8,
+                "creator": "stub",
+            },
+        )
+        for i in range(rng.randint(5, 300)):
+            add(
+                "marketpools.liquidityPositions",
+                {
+                    "account": account_name(i),
+                    "tokenPair": pair,
+                    "shares": f"{rng.paretovariate(1.3):.8f}",
+                    "timeFactor": now,
+                },
+            )
+    return {"tables": tables, "market_history": history}
+
+
+def _compare(value, op, arg):
+    if op == "$in":
+        return value in arg
+    if op == "$nin":
+        return value not in arg
+    if op == "$ne":
+        return value != arg
+    if value is None:
+        return False
+    if op == "$regex":
+        return re.search(arg, str(value)) is not None
+    try:
+        if op == "$gt":
+            return value > arg
+        if op == "$gte":
+            return value >= arg
+        if op == "$lt":
+            return value < arg
+        if op == "$lte":
+            return value <= arg
+    except TypeError:
+        return False
+    raise ValueError(f"Unsupported operator {op}")
+
+
+def matches(row, query):
+    """Evaluate the subset of Hive-Engine's (MongoDB-style) query syntax the
+    app uses."""
+    for field, cond in query.items():
+        if field == "$or":
+            if not any(matches(row, sub) for sub in cond):
+                return False
+        elif field == "$and":
+            if not all(matches(row, sub) for sub in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = row.get(field)
+            if not all(_compare(value, op, arg) for op, arg in cond.items()):
+                return False
+        elif row.get(field) != cond:
+            return False
+    return True
+
+
+class Store:
+    """Tables with per-symbol partitions and cached sorted views."""
+
+    def __init__(self, fixtures):
+        self.tables = fixtures.get("tables", {})
+        self.history = fixtures.get("market_history", {})
+        self._partitions = {}
+        self._sorted = {}
+        self._lock = threading.Lock()
+
+    def _rows(self, table, symbol):
+        key = (table, symbol)
+        if key not in self._partitions:
+            rows = self.tables.get(table, [])
+            if symbol is not None:
+                rows = [row for row in rows if row.get("symbol") == symbol]
+            with self._lock:
+                self._partitions.setdefault(key, rows)
+        return self._partitions[key]
+
+    def _view(self, table, symbol, field):
+        """Rows sorted ascending by ``field`` plus their sort keys."""
+        key = (table, symbol, field)
+        if key not in self._sorted:
+            rows = self._rows(table, symbol)
+            if field != "_id":
+                rows = sorted(rows, key=lambda row: _sort_key(row.get(field)))
+            keys = [_sort_key(row.get(field)) for row in rows]
+            with self._lock:
+                self._sorted.setdefault(key, (rows, keys))
+        return self._sorted[key]
+
+    def find(self, contract, table, query=None, limit=1000, offset=0, indexes=None):
+        query = dict(query or {})
+        table = f"{contract}.{table}"
+        symbol = query.get("symbol")
+        if isinstance(symbol, str):
+            query.pop("symbol")
+        else:
+            symbol = None
+        index = (indexes or [{"index": "_id", "descending": False}])[0]
+        field = index.get("index", "_id")
+        rows, keys = self._view(table, symbol, field)
+        lo, hi = 0, len(rows)
+        # Range conditions on the index field are answered by bisection.
+        cond = query.get(field)
+        if isinstance(cond, dict) and set(cond) <= {"$gt", "$gte", "$lt", "$lte"}:
+            query.pop(field)
+            for op, arg in cond.items():
+                arg = _sort_key(arg)
+                if op == "$gt":
+                    lo = max(lo, bisect.bisect_right(keys, arg))
+                elif op == "$gte":
+                    lo = max(lo, bisect.bisect_left(keys, arg))
+                elif op == "$lt":
+                    hi = min(hi, bisect.bisect_left(keys, arg))
+                else:
+                    hi = min(hi, bisect.bisect_right(keys, arg))
+        positions = (
+            range(hi - 1, lo - 1, -1) if index.get("descending") else range(lo, hi)
+        )
+        result = []
+        skipped = 0
+        for pos in positions:
+            row = rows[pos]
+            if query and not matches(row, query):
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            result.append(row)
+            if len(result) >= limit:
+                break
+        return result
+
+    def market_history(self, symbol, start_ms):
+        candles = self.history.get(symbol, [])
+        start = start_ms / 1000
+        return [c for c in candles if c["timestamp"] >= start]
+
+
+def _sort_key(value):
+    # Mixed types sort as Hive-Engine's strings-after-numbers; None first.
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    return (2, str(value))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    store = None
+    latency = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; with Nagle on, keep-alive
+    # clients would wait out a delayed ACK on every reply.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _delay(self):
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _call(self, endpoint, request):
+        method = request.get("method", "")
+        if "." in method:
+            endpoint, method = method.split(".", 1)
+        params = request.get("params") or {}
+        if endpoint == "blockchain":
+            if method in ("getLatestBlockInfo", "getStatus"):
+                return {"blockNumber": int(time.time()) // 3, "timestamp": time.time()}
+        elif endpoint == "contracts" and method in ("find", "findOne"):
+            rows = self.store.find(
+                params.get("contract"),
+                params.get("table"),
+                params.get("query"),
+                limit=1 if method == "findOne" else params.get("limit", 1000),
+                offset=params.get("offset", 0),
+                indexes=params.get("indexes"),
+            )
+            if method == "findOne":
+                return rows[0] if rows else None
+            return rows
+        raise ValueError(f"Unknown method {endpoint}.{method}")
+
+    def _reply(self, endpoint, request):
+        reply = {"jsonrpc": "2.0", "id": request.get("id")}
+        try:
+            reply["result"] = self._call(endpoint, request)
+        except Exception as e:
+            reply["error"] = {"code": -32601, "message": str(e)}
+        return reply
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = json.loads(self.rfile.read(length) or b"null")
+        self._delay()
+        if self.error_rate and random.random() < self.error_rate:
+            self._send_json({"error": "stub failure"}, status=503)
+            return
+        endpoint = urlparse(self.path).path.strip("/")
+        if isinstance(payload, list):
+            self._send_json([self._reply(endpoint, item) for item in payload])
+        else:
+            self._send_json(self._reply(endpoint, payload or {}))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != "/marketHistory":
+            self._send_json({"error": "not found"}, status=404)
+            return
+        self._delay()
+        params = parse_qs(url.query)
+        symbol = params.get("symbol", [""])[0]
+        start = float(params.get("timestampStart", ["0"])[0])
+        self._send_json(self.store.market_history(symbol, start))
+
+
+def make_server(
+    fixtures, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0
+):
+    """Return a ready (not yet serving) stub server; port 0 picks a free one."""
+    handler = type(
+        "Handler",
+        (StubHandler,),
+        {
+            "store": Store(fixtures),
+            "latency": latency,
+            "jitter": jitter,
+            "error_rate": error_rate,
+        },
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--fixtures", help="recorded fixtures JSON to serve")
+    parser.add_argument("--save-fixtures", help="write the dataset here and exit")
+    parser.add_argument("--tokens", type=int, default=500)
+    parser.add_argument("--holders", type=int, default=100_000)
+    parser.add_argument("--trades", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per call")
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="extra random seconds"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    if args.fixtures:
+        with open(args.fixtures) as f:
+            fixtures = json.load(f)
+    else:
+        fixtures = synthetic_fixtures(
+            tokens=args.tokens, holders=args.holders, trades=args.trades, seed=args.seed
+        )
+    if args.save_fixtures:
+        with open(args.save_fixtures, "w") as f:
+            json.dump(fixtures, f)
+        return
+    server = make_server(
+        fixtures, args.host, args.port, args.latency, args.jitter, args.error_rate
+    )
+    print(f"Hive-Engine stub listening on http://{args.host}:{server.server_port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,11 @@ from flask import Flask
 
 from .config import config_by_name
 from .extensions import cache
+from .utils.deadline import register_request_budget
 from .utils.errors import register_error_handlers
 from .utils.formatters import register_filters
+from .utils.metrics import register_metrics
+from .utils.profiling import register_profiling
 
 
 def create_app(config_name="dev"):
@@ -28,6 +31,9 @@ def create_app(config_name="dev"):
     # Register utilities
     register_filters(app)
     register_error_handlers(app)
+    register_request_budget(app)
+    register_metrics(app)
+    register_profiling(app)
 
     # Register blueprints
     from .routes.api import api_bp
@@ -1,103 +1,811 @@
 import json
 import logging
 import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 
 import requests
+from flask import current_app, has_app_context
 from nectarengine.api import Api
-from nectarengine.market import Market
+from nectarengine.rpc import RPCError
 from requests.adapters import HTTPAdapter, Retry
 
+from ..extensions import cache
+from ..utils.batching import BatchLoader
+from ..utils.deadline import DeadlineExceeded, bounded, remaining
+from ..utils.metrics import RPC_ERRORS, RPC_LATENCY, RPC_REJECTED
+from ..utils.profiling import record, timed
+
 logger = logging.getLogger(__name__)
 
 
-def get_engine_nodes(max_nodes=10, timeout=3):
-    """Return a list of healthy Hive-Engine RPC nodes."""
+FALLBACK_NODE = "https://enginerpc.com/"
+HIVE_API_NODES = [
+    "https://api.hive.blog",
+    "https://api.syncad.com",
+    "https://anyx.io",
+]
+NODES_CACHE_KEY = "he_engine_nodes"
+
+
+def _fetch_node_list(hive_node, timeout=5):
+    """Read the published Hive-Engine node list from one Hive API host."""
     payload = {
         "jsonrpc": "2.0",
         "method": "database_api.find_accounts",
         "params": {"accounts": ["flowerengine"]},
         "id": 1,
     }
-    hive_api_nodes = [
-        "https://api.hive.blog",
-        "https://api.syncad.com",
-        "https://anyx.io",
-    ]
-    nodes = []
-    for hive_node in hive_api_nodes:
+    resp = requests.post(hive_node, json=payload, timeout=timeout)
+    resp.raise_for_status()
+    data = resp.json()
+    meta_str = (
+        data.get("result", {}).get("accounts", [{}])[0].get("json_metadata", "{}")
+    )
+    meta = json.loads(meta_str) if meta_str else {}
+    nodes = meta.get("nodes", [])
+    return nodes if isinstance(nodes, list) else []
+
+
+def discover_nodes(max_nodes=10, timeout=3, deadline=8):
+    """Probe Hive-Engine nodes concurrently and return ``{node: latency}``.
+
+    The Hive API hosts are asked for the node list in parallel (first answer
+    wins), then every listed node is probed in parallel. The whole discovery
+    is bounded by ``deadline`` seconds; nodes that have not answered by then
+    are left out. The result is ordered fastest first and always ends with
+    the fallback node.
+    """
+    stop = time.monotonic() + deadline
+    executor = ThreadPoolExecutor(max_workers=16)
+    try:
+        nodes = []
+        futures = {
+            executor.submit(_fetch_node_list, hive_node): hive_node
+            for hive_node in HIVE_API_NODES
+        }
+        try:
+            for future in as_completed(futures, timeout=stop - time.monotonic()):
+                try:
+                    nodes = future.result()
+                except Exception as e:
+                    logger.warning(
+                        f"Failed to fetch node list from {futures[future]}: {e}"
+                    )
+                    continue
+                if nodes:
+                    break
+        except FuturesTimeoutError:
+            logger.warning("Timed out fetching the Hive-Engine node list")
+
+        futures = {
+            executor.submit(probe_node, node, timeout): node
+            for node in nodes
+            if isinstance(node, str)
+        }
+        latencies = {}
         try:
-            resp = requests.post(hive_node, json=payload, timeout=5)
+            for future in as_completed(
+                futures, timeout=max(stop - time.monotonic(), 0)
+            ):
+                latency = future.result()
+                if latency is not None:
+                    latencies[futures[future]] = latency
+        except FuturesTimeoutError:
+            logger.warning(
+                f"Node discovery deadline hit with {len(latencies)}/{len(futures)} "
+                "nodes answered"
+            )
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    healthy = dict(sorted(latencies.items(), key=lambda item: item[1])[:max_nodes])
+    healthy.setdefault(FALLBACK_NODE, None)
+    return healthy
+
+
+def get_engine_nodes(max_nodes=10, timeout=3):
+    """Return a list of healthy Hive-Engine RPC nodes."""
+    return list(discover_nodes(max_nodes=max_nodes, timeout=timeout))
+
+
+# API instances and session
+session = requests.Session()
+retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504])
+adapter = HTTPAdapter(max_retries=retries)
+session.mount("https://", adapter)
+session.mount("http://", adapter)
+
+# RPC calls routed through the NodePool must not retry inside urllib3: the
+# pool fails over to another node itself, and only sees (and scores) a
+# dead node once the call fails.
+rpc_session = requests.Session()
+rpc_adapter = HTTPAdapter(max_retries=0)
+rpc_session.mount("https://", rpc_adapter)
+rpc_session.mount("http://", rpc_adapter)
+
+HE_HISTORY_API = "https://history.hive-engine.com"
+
+
+class RateLimiter:
+    """Token bucket allowing ``rate`` calls per second with bursts of ``burst``."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(rate, 1))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a call may proceed."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_rate_limiter = None
+
+
+def set_rate_limit(rate, burst=None):
+    """Cap upstream calls from this process at ``rate`` per second (None: off)."""
+    global _rate_limiter
+    _rate_limiter = RateLimiter(rate, burst) if rate else None
+
+
+def _throttle():
+    if _rate_limiter is not None:
+        _rate_limiter.acquire()
+
+
+class CircuitOpenError(RuntimeError):
+    """An upstream is failing and calls to it are refused for now."""
+
+
+class CircuitBreaker:
+    """Fail fast once an upstream keeps failing.
+
+    Closed, calls go through; ``threshold`` failures in a row open it. Open,
+    calls are refused until ``cooldown`` seconds have passed. It is then
+    half-open: a single trial call is let through, and its success closes
+    the breaker while its failure re-opens it.
+    """
+
+    def __init__(self, name, threshold=5, cooldown=30):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return "closed"
+        if self._trial or time.monotonic() - self._opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def retry_after(self):
+        """Seconds until the breaker lets a trial call through."""
+        if self._opened_at is None:
+            return 0.0
+        return max(self._opened_at + self.cooldown - time.monotonic(), 0.0)
+
+    def allow(self):
+        """Return whether a call may go through now."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or time.monotonic() - self._opened_at < self.cooldown:
+                return False
+            self._trial = True
+            return True
+
+    def check(self):
+        """Raise :class:`CircuitOpenError` unless a call may go through now."""
+        if not self.allow():
+            raise CircuitOpenError(
+                f"{self.name} circuit open; retry in {self.retry_after():.0f}s"
+            )
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"{self.name} circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or (
+                self._opened_at is None and self._failures >= self.threshold
+            ):
+                logger.warning(
+                    f"{self.name} circuit open after {self._failures} failures"
+                )
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+    def release(self):
+        """End a call that gave no verdict on the upstream's health."""
+        with self._lock:
+            self._trial = False
+
+    def snapshot(self):
+        return {
+            "state": self.state,
+            "failures": self._failures,
+            "retry_after": round(self.retry_after(), 1),
+        }
+
+
+_history_breaker = CircuitBreaker("Hive-Engine history API")
+
+
+def _out_of_time():
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def get_market_history(symbol, timestamp_start, timeout=(5, 30)):
+    """Fetch market history candles for ``symbol`` since ``timestamp_start``
+    (milliseconds) from the Hive-Engine history API."""
+    url = _config("HE_HISTORY_API", HE_HISTORY_API) + "/marketHistory"
+    connect, read = timeout
+    read = bounded(read)
+    _history_breaker.check()
+    _throttle()
+    try:
+        with timed("rpc"):
+            resp = session.get(
+                url,
+                params={"symbol": symbol, "timestampStart": int(timestamp_start)},
+                timeout=(min(connect, read), read),
+            )
             resp.raise_for_status()
             data = resp.json()
-            meta_str = (
-                data.get("result", {})
-                .get("accounts", [{}])[0]
-                .get("json_metadata", "{}")
-            )
-            meta = json.loads(meta_str) if meta_str else {}
-            nodes = meta.get("nodes", [])
-            if nodes:
-                break
-        except Exception as e:
-            logger.warning(f"Failed to fetch node list from {hive_node}: {e}")
-            continue
+    except Exception as e:
+        if _out_of_time():
+            # Cut short by the budget; says nothing about the upstream.
+            _history_breaker.release()
+            raise DeadlineExceeded("Upstream deadline exceeded") from e
+        _history_breaker.record_failure()
+        raise
+    _history_breaker.record_success()
+    return data if isinstance(data, list) else []
 
-    if not isinstance(nodes, list):
-        nodes = []
 
-    healthy_nodes = []
-    test_payload = {
+def probe_node(node, timeout=3):
+    """Return the round-trip latency of a healthy node, or None if it failed."""
+    payload = {
         "jsonrpc": "2.0",
         "method": "blockchain.getLatestBlockInfo",
         "params": {},
         "id": 1,
     }
-    for node in nodes:
-        if len(healthy_nodes) >= max_nodes:
-            break
+    start = time.monotonic()
+    try:
+        r = requests.post(node, json=payload, timeout=timeout)
+        if r.ok:
+            res = r.json().get("result")
+            if isinstance(res, dict) and res.get("blockNumber"):
+                return time.monotonic() - start
+    except Exception:
+        pass
+    return None
+
+
+def post_batch(node, calls, timeout=30):
+    """Send contract ``calls`` (``(method, params)`` pairs) to ``node`` as one
+    JSON-RPC batch.
+
+    Returns a ``(result, error)`` pair per call, in order; ``error`` is an
+    :class:`RPCError` for a query the node rejected. Transport failures and
+    malformed replies raise, so the pool retries the batch on another node.
+    """
+    payload = [
+        {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+        for i, (method, params) in enumerate(calls)
+    ]
+    url = (node if node.endswith("/") else node + "/") + "contracts"
+    resp = rpc_session.post(url, json=payload, timeout=timeout)
+    resp.raise_for_status()
+    replies = resp.json()
+    if isinstance(replies, dict) and replies.get("error"):
+        raise RPCError(_rpc_error_message(replies["error"]))
+    if not isinstance(replies, list):
+        raise ValueError(f"Unexpected batch reply from {node}")
+    by_id = {reply.get("id"): reply for reply in replies if isinstance(reply, dict)}
+    results = []
+    for i in range(len(calls)):
+        reply = by_id.get(i)
+        if reply is None:
+            results.append((None, RPCError("No reply for batched query")))
+        elif reply.get("error"):
+            results.append((None, RPCError(_rpc_error_message(reply["error"]))))
+        else:
+            results.append((reply.get("result"), None))
+    return results
+
+
+def _rpc_error_message(error):
+    if isinstance(error, dict):
+        return str(error.get("detail") or error.get("message") or error)
+    return str(error)
+
+
+class _NodeStats:
+    __slots__ = (
+        "latency",
+        "error_rate",
+        "failures",
+        "ejected_until",
+        "eject_seconds",
+        "probing",
+    )
+
+    def __init__(self, latency=None):
+        self.latency = latency
+        self.error_rate = 0.0
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.eject_seconds = 0.0
+        self.probing = False
+
+
+class NodePool:
+    """Route RPC calls to the best-scoring Hive-Engine nodes with failover.
+
+    Each node keeps an exponentially weighted latency and error rate. Calls go
+    to one of the ``spread`` best-scoring nodes, nodes that fail ``eject_after``
+    times in a row are ejected and re-probed in the background once their
+    (exponentially growing) cool-down has passed, and a failed call is retried
+    on a different node up to ``max_attempts`` times.
+
+    Ejection is the per-node circuit breaker; ``breaker`` covers the upstream
+    as a whole and opens after ``breaker_threshold`` calls in a row have
+    failed on every node they tried. While it is open, or every node is
+    ejected, calls raise :class:`CircuitOpenError` without touching the
+    network. Attempt timeouts are capped at what is left of the current
+    deadline budget (see :mod:`viewr.utils.deadline`).
+
+    Besides the ``Api`` methods, ``call("batch", calls)`` sends several
+    contract queries as one JSON-RPC batch (see :func:`post_batch`).
+    """
+
+    default_latency = 1.0
+    min_latency = 0.05
+    error_penalty = 4.0
+    # Budget-capped attempt timeouts are rounded down to one of these, so
+    # each node keeps only a few clients.
+    timeout_steps = (1, 2, 5, 10, 20)
+
+    def __init__(
+        self,
+        nodes,
+        max_attempts=3,
+        spread=3,
+        eject_after=3,
+        eject_seconds=30,
+        max_eject_seconds=600,
+        alpha=0.3,
+        timeout=30,
+        breaker_threshold=5,
+        breaker_cooldown=30,
+    ):
+        self.max_attempts = max_attempts
+        self.spread = spread
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self.alpha = alpha
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(
+            "Hive-Engine", threshold=breaker_threshold, cooldown=breaker_cooldown
+        )
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._apis = {}
+        self.update_nodes(nodes)
+
+    @property
+    def nodes(self):
+        return list(self._stats)
+
+    def update_nodes(self, nodes):
+        """Replace the node set, keeping the stats of nodes that remain.
+
+        ``nodes`` is either a list of URLs or a ``{url: latency}`` mapping
+        whose latencies seed the scores of newly added nodes.
+        """
+        latencies = nodes if isinstance(nodes, dict) else dict.fromkeys(nodes)
+        with self._lock:
+            self._stats = {
+                node: self._stats.get(node) or _NodeStats(latency)
+                for node, latency in latencies.items()
+            }
+            self._apis = {
+                key: api for key, api in self._apis.items() if key[0] in self._stats
+            }
+
+    def _score(self, stats, default_latency):
+        latency = stats.latency if stats.latency is not None else default_latency
+        return max(latency, self.min_latency) * (
+            1 + self.error_penalty * stats.error_rate
+        )
+
+    def pick(self, exclude=()):
+        """Return the node the next call should go to, or None."""
+        now = time.monotonic()
+        to_probe = []
+        with self._lock:
+            candidates = []
+            for node, stats in self._stats.items():
+                if node in exclude or stats.ejected_until > now:
+                    continue
+                if stats.ejected_until and not stats.probing:
+                    stats.probing = True
+                    to_probe.append(node)
+                    continue
+                if stats.probing:
+                    continue
+                candidates.append((stats, node))
+            # Unmeasured nodes score as an average node so they still get
+            # traffic and a latency sample.
+            known = [s.latency for s, _ in candidates if s.latency is not None]
+            default_latency = sum(known) / len(known) if known else self.default_latency
+            candidates = [
+                (self._score(stats, default_latency), node)
+                for stats, node in candidates
+            ]
+        for node in to_probe:
+            threading.Thread(target=self._probe, args=(node,), daemon=True).start()
+        if not candidates:
+            return None
+        candidates.sort()
+        best = candidates[: self.spread]
+        weights = [1.0 / score for score, _ in best]
+        return random.choices([node for _, node in best], weights=weights)[0]
+
+    def record_success(self, node, latency):
+        with self._lock:
+            stats = self._stats.get(node)
+            if stats is None:
+                return
+            if stats.latency is None:
+                stats.latency = latency
+            else:
+                stats.latency += self.alpha * (latency - stats.latency)
+            stats.error_rate -= self.alpha * stats.error_rate
+            stats.failures = 0
+
+    def record_failure(self, node):
+        with self._lock:
+            stats = self._stats.get(node)
+            if stats is None:
+                return
+            stats.error_rate += self.alpha * (1.0 - stats.error_rate)
+            stats.failures += 1
+            if stats.failures >= self.eject_after and not stats.ejected_until:
+                stats.eject_seconds = self.eject_seconds
+                stats.ejected_until = time.monotonic() + stats.eject_seconds
+                logger.warning(
+                    f"Ejecting Hive-Engine node {node} for {stats.eject_seconds}s"
+                )
+
+    def _probe(self, node):
+        latency = probe_node(node)
+        with self._lock:
+            stats = self._stats.get(node)
+            if stats is None:
+                return
+            stats.probing = False
+            if latency is not None:
+                stats.latency = latency
+                stats.error_rate = 0.0
+                stats.failures = 0
+                stats.ejected_until = 0.0
+                stats.eject_seconds = 0.0
+                logger.info(f"Hive-Engine node {node} recovered ({latency:.3f}s)")
+            else:
+                stats.eject_seconds = min(
+                    stats.eject_seconds * 2, self.max_eject_seconds
+                )
+                stats.ejected_until = time.monotonic() + stats.eject_seconds
+
+    def _api_for(self, node, timeout):
+        api = self._apis.get((node, timeout))
+        if api is None:
+            # Retries across nodes happen here, not inside the client, so
+            # every failure reaches the node's score. An explicit history
+            # URL stops nectarengine looking one up over the network for
+            # every client it builds.
+            api = Api(
+                url=node,
+                history_url=_config("HE_HISTORY_API", HE_HISTORY_API),
+                timeout=timeout,
+                session=rpc_session,
+                rpc_endpoint_attempts=1,
+            )
+            api = self._apis.setdefault((node, timeout), api)
+        return api
+
+    def _invoke(self, node, timeout, method, args, kwargs):
+        if method == "batch":
+            # nectarengine only ever sends batches of one.
+            return post_batch(node, *args, timeout=timeout, **kwargs)
+        return getattr(self._api_for(node, timeout), method)(*args, **kwargs)
+
+    def _attempt_timeout(self):
+        left = bounded(self.timeout)
+        if left >= self.timeout:
+            return self.timeout
+        return max(
+            (step for step in self.timeout_steps if step <= left),
+            default=self.timeout_steps[0],
+        )
+
+    def call(self, method, *args, **kwargs):
+        """Call an ``Api`` method, retrying on a different node on failure."""
+        try:
+            bounded(self.timeout)
+            self.breaker.check()
+        except CircuitOpenError:
+            RPC_REJECTED.inc(reason="circuit_open")
+            raise
+        except DeadlineExceeded:
+            RPC_REJECTED.inc(reason="deadline")
+            raise
         try:
-            r = requests.post(node, json=test_payload, timeout=timeout)
-            if r.ok:
-                res = r.json().get("result")
-                if isinstance(res, dict) and res.get("blockNumber"):
-                    healthy_nodes.append(node)
+            result = self._call(method, args, kwargs)
+        except RPCError:
+            self.breaker.record_success()
+            raise
+        except CircuitOpenError:
+            RPC_REJECTED.inc(reason="circuit_open")
+            self.breaker.release()
+            raise
+        except DeadlineExceeded:
+            RPC_REJECTED.inc(reason="deadline")
+            self.breaker.release()
+            raise
         except Exception:
-            continue
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
 
-    fallback = "https://enginerpc.com/"
-    if fallback not in healthy_nodes:
-        healthy_nodes.append(fallback)
-    return healthy_nodes
+    def _call(self, method, args, kwargs):
+        tried = []
+        last_exc = None
+        cut_short = False
+        # "contract.table" for find/find_one, so latency can be told apart
+        # per query target.
+        table = ".".join(args[:2]) if all(isinstance(a, str) for a in args[:2]) else ""
+        for _ in range(min(self.max_attempts, len(self._stats))):
+            timeout = self._attempt_timeout()
+            node = self.pick(exclude=tried)
+            if node is None:
+                if not tried:
+                    raise CircuitOpenError("Every Hive-Engine node is ejected")
+                break
+            tried.append(node)
+            _throttle()
+            start = time.monotonic()
+            try:
+                result = self._invoke(node, timeout, method, args, kwargs)
+            except RPCError:
+                # The node answered; the query itself was rejected.
+                self.record_success(node, time.monotonic() - start)
+                RPC_LATENCY.observe(
+                    time.monotonic() - start, method=method, table=table, node=node
+                )
+                raise
+            except Exception as e:
+                last_exc = e
+                RPC_ERRORS.inc(method=method, table=table, node=node)
+                if timeout < self.timeout and time.monotonic() - start >= timeout:
+                    # Ran out a budget-shortened timeout; not the node's fault.
+                    cut_short = True
+                    continue
+                self.record_failure(node)
+                logger.warning(f"Hive-Engine call {method} failed on {node}: {e}")
+                continue
+            finally:
+                record("rpc", time.monotonic() - start)
+            latency = time.monotonic() - start
+            self.record_success(node, latency)
+            RPC_LATENCY.observe(latency, method=method, table=table, node=node)
+            return result
+        if cut_short:
+            raise DeadlineExceeded("Upstream deadline exceeded") from last_exc
+        if last_exc is not None:
+            raise last_exc
+        raise RuntimeError("No Hive-Engine nodes available")
 
+    def snapshot(self):
+        """Return a JSON-serializable view of per-node health."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                node: {
+                    "latency": stats.latency,
+                    "error_rate": round(stats.error_rate, 4),
+                    "ejected": stats.ejected_until > now or stats.probing,
+                    "state": (
+                        "half_open"
+                        if stats.probing
+                        else "open"
+                        if stats.ejected_until > now
+                        else "closed"
+                    ),
+                }
+                for node, stats in self._stats.items()
+            }
+
+
+class _PooledApi:
+    """``Api`` stand-in that dispatches every method call through a NodePool."""
+
+    def __init__(self, pool):
+        self._pool = pool
+
+    def __getattr__(self, name):
+        def caller(*args, **kwargs):
+            return self._pool.call(name, *args, **kwargs)
+
+        return caller
+
+
+def _config(name, default):
+    return current_app.config.get(name, default) if has_app_context() else default
+
+
+def refresh_nodes():
+    """Run node discovery and publish the result to the shared cache."""
+    entry = {
+        "nodes": discover_nodes(deadline=_config("HE_NODE_DISCOVERY_DEADLINE", 8)),
+        "updated": time.time(),
+    }
+    if has_app_context():
+        try:
+            cache.set(
+                NODES_CACHE_KEY,
+                entry,
+                timeout=_config("HE_NODE_CACHE_TTL", 3600),
+            )
+        except Exception as e:
+            logger.warning(f"Failed to publish Hive-Engine node list: {e}")
+    return entry
+
+
+_node_entry = None
+_next_sync = 0.0
+_sync_lock = threading.Lock()
+_refreshing = False
+_pool = None
 
-# API instances and session
-session = requests.Session()
-retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504])
-adapter = HTTPAdapter(max_retries=retries)
-session.mount("https://", adapter)
-session.mount("http://", adapter)
 
-_nodes = None
+def _apply_node_entry(entry):
+    global _node_entry
+    _node_entry = entry
+    if _pool is not None:
+        _pool.update_nodes(entry["nodes"])
+
+
+def _background_refresh(app):
+    global _refreshing
+    try:
+        with app.app_context():
+            _apply_node_entry(refresh_nodes())
+    except Exception as e:
+        logger.warning(f"Background node refresh failed: {e}")
+    finally:
+        _refreshing = False
+
+
+def _start_background_refresh():
+    global _refreshing
+    if _refreshing or not has_app_context():
+        return
+    try:
+        # Only one worker re-runs discovery; the others pick its result up
+        # from the shared cache on their next sync.
+        lock_timeout = _config("HE_NODE_DISCOVERY_DEADLINE", 8) * 2
+        if not cache.add(f"{NODES_CACHE_KEY}:lock", 1, timeout=lock_timeout):
+            return
+    except Exception:
+        pass
+    _refreshing = True
+    app = current_app._get_current_object()
+    threading.Thread(target=_background_refresh, args=(app,), daemon=True).start()
+
+
+def _sync_nodes():
+    """Return this worker's node entry, kept in step with the shared cache."""
+    global _next_sync
+    if _node_entry is not None and time.monotonic() < _next_sync:
+        return _node_entry
+    with _sync_lock:
+        if _node_entry is not None and time.monotonic() < _next_sync:
+            return _node_entry
+        _next_sync = time.monotonic() + _config("HE_NODE_SYNC_INTERVAL", 30)
+        pinned = _config("HE_NODES", None)
+        if pinned:
+            # A fixed node list (e.g. a local stub): no discovery, no sharing.
+            if _node_entry is None or list(_node_entry["nodes"]) != list(pinned):
+                _apply_node_entry(
+                    {"nodes": dict.fromkeys(pinned), "updated": time.time()}
+                )
+            return _node_entry
+        shared = None
+        if has_app_context():
+            try:
+                shared = cache.get(NODES_CACHE_KEY)
+            except Exception as e:
+                logger.warning(f"Failed to read shared Hive-Engine node list: {e}")
+        if shared and (
+            _node_entry is None or shared["updated"] > _node_entry["updated"]
+        ):
+            _apply_node_entry(shared)
+        if _node_entry is None:
+            # Cold start with nothing shared yet: discover inline, bounded by
+            # the discovery deadline.
+            _apply_node_entry(refresh_nodes())
+        elif time.time() - _node_entry["updated"] > _config(
+            "HE_NODE_REFRESH_INTERVAL", 300
+        ):
+            _start_background_refresh()
+    return _node_entry
 
 
 def get_nodes():
-    global _nodes
-    if _nodes is None:
-        _nodes = get_engine_nodes()
-    return _nodes
+    return list(_sync_nodes()["nodes"])
+
+
+def get_node_pool():
+    global _pool
+    entry = _sync_nodes()
+    if _pool is None:
+        with _sync_lock:
+            if _pool is None:
+                _pool = NodePool(
+                    entry["nodes"],
+                    timeout=_config("HE_CALL_TIMEOUT", 30),
+                    breaker_threshold=_config("HE_BREAKER_THRESHOLD", 5),
+                    breaker_cooldown=_config("HE_BREAKER_COOLDOWN", 30),
+                )
+    return _pool
 
 
 def get_he_api():
-    nodes = get_nodes()
-    return Api(
-        url=random.choice(nodes) if nodes else "https://enginerpc.com/",
-        timeout=30,
-        session=session,
-    )
+    return _PooledApi(get_node_pool())
 
 
-def get_he_market():
-    return Market(api=get_he_api())
+def upstream_status():
+    """Return this worker's breaker states and per-node health."""
+    pool = get_node_pool()
+    return {
+        "breaker": pool.breaker.snapshot(),
+        "history_breaker": _history_breaker.snapshot(),
+        "nodes": pool.snapshot(),
+    }
 
 
 class _LazyProxy:
@@ -109,4 +817,123 @@ class _LazyProxy:
 
 
 he_api = _LazyProxy(get_he_api)
-he_market = _LazyProxy(get_he_market)
+
+
+def _find_params(contract, table, query=None, limit=None, offset=0, indexes=None):
+    params = {"contract": contract, "table": table, "query": query or {}}
+    if limit is not None:
+        params.update(limit=limit, offset=offset, indexes=indexes or [])
+    return params
+
+
+class _BatchItem(Future):
+    """Result of one query in a :class:`ContractBatch`."""
+
+    def __init__(self, batch):
+        super().__init__()
+        self._batch = batch
+
+    def result(self, timeout=None):
+        if not self.done():
+            self._batch.flush()
+        return super().result(timeout)
+
+    def exception(self, timeout=None):
+        if not self.done():
+            self._batch.flush()
+        return super().exception(timeout)
+
+
+class ContractBatch:
+    """Contract queries queued up and sent to Hive-Engine together.
+
+    ``find`` and ``find_one`` queue a query and return a future for its
+    result; :meth:`flush` sends the queue as JSON-RPC batches of at most
+    ``HE_BATCH_MAX_SIZE`` queries, one round trip each. A query the node
+    rejects fails its own future with :class:`RPCError`; if a whole batch
+    fails (after the pool's retries) every future in it gets that error.
+    Asking a future for its result flushes the batch first, and used as a
+    context manager the batch is flushed on exit.
+    """
+
+    def __init__(self, api=None, max_size=None):
+        self._api = api if api is not None else he_api
+        self.max_size = max_size or _config("HE_BATCH_MAX_SIZE", 50)
+        self._queue = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+
+    def add(self, method, params):
+        """Queue a raw contract ``method`` call and return its future."""
+        item = _BatchItem(self)
+        with self._lock:
+            self._queue.append((method, params, item))
+        return item
+
+    def find(self, contract, table, query=None, limit=1000, offset=0, indexes=None):
+        return self.add(
+            "find", _find_params(contract, table, query, limit, offset, indexes)
+        )
+
+    def find_one(self, contract, table, query=None):
+        return self.add("findOne", _find_params(contract, table, query))
+
+    def flush(self):
+        """Send every queued query and resolve its future."""
+        with self._lock:
+            queue, self._queue = self._queue, []
+        for start in range(0, len(queue), self.max_size):
+            chunk = queue[start : start + self.max_size]
+            try:
+                replies = self._api.batch(
+                    [(method, params) for method, params, _ in chunk]
+                )
+            except Exception as e:
+                logger.warning(f"Hive-Engine batch of {len(chunk)} queries failed: {e}")
+                for _, _, item in chunk:
+                    item.set_exception(e)
+                continue
+            for (method, _, item), (result, error) in zip(chunk, replies, strict=True):
+                if error is not None:
+                    item.set_exception(error)
+                elif method == "findOne" and isinstance(result, list):
+                    item.set_result(result[0] if result else None)
+                else:
+                    item.set_result(result)
+
+
+def _send_coalesced(keys):
+    batch = ContractBatch()
+    return {key: batch.add(key[0], json.loads(key[1])) for key in keys}
+
+
+# Concurrent coalesced queries (a page's fan-out) share one batch request;
+# identical queries in the same window are sent once.
+_coalescer = BatchLoader(_send_coalesced)
+
+
+def _coalesce(method, params):
+    item = _coalescer.load((method, json.dumps(params, sort_keys=True)))
+    return item.result()
+
+
+def coalesced_find(contract, table, query=None, limit=1000, offset=0, indexes=None):
+    """``he_api.find``, batched with other coalesced queries made concurrently."""
+    return _coalesce(
+        "find", _find_params(contract, table, query, limit, offset, indexes)
+    )
+
+
+def coalesced_find_one(contract, table, query=None):
+    """``he_api.find_one``, batched with other coalesced queries made
+    concurrently."""
+    return _coalesce("findOne", _find_params(contract, table, query))
@@ -7,7 +7,56 @@ class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "dev-key-change-me")
     CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL", "redis://localhost:6379/1")
     # Cache configuration (prefers Redis, falls back to SimpleCache)
-    CACHE_TYPE = "RedisCache"  # Default to Redis
+    CACHE_TYPE = "viewr.utils.serialization.CompressedRedisCache"  # Default to Redis
+    # Redis values: compression codec (auto/zstd/lz4/zlib/none), the encoded
+    # size from which to compress, and opt-in msgpack for plain data
+    CACHE_COMPRESSION = os.environ.get("CACHE_COMPRESSION", "auto")
+    CACHE_COMPRESS_THRESHOLD = int(os.environ.get("CACHE_COMPRESS_THRESHOLD", 1024))
+    CACHE_MSGPACK = os.environ.get("CACHE_MSGPACK", "0") in ("1", "true", "yes")
+    # Hive-Engine node discovery, shared across workers through the cache
+    HE_NODE_DISCOVERY_DEADLINE = float(os.environ.get("HE_NODE_DISCOVERY_DEADLINE", 8))
+    HE_NODE_CACHE_TTL = int(os.environ.get("HE_NODE_CACHE_TTL", 3600))
+    HE_NODE_REFRESH_INTERVAL = int(os.environ.get("HE_NODE_REFRESH_INTERVAL", 300))
+    HE_NODE_SYNC_INTERVAL = int(os.environ.get("HE_NODE_SYNC_INTERVAL", 30))
+    # Comma-separated RPC nodes to use instead of discovery, and the market
+    # history API (both point at the stub server when benchmarking)
+    HE_NODES = [
+        n.strip() for n in os.environ.get("HE_NODES", "").split(",") if n.strip()
+    ]
+    HE_HISTORY_API = os.environ.get("HE_HISTORY_API", "https://history.hive-engine.com")
+    # Hive-Engine RPC: per-attempt timeout, failures in a row before the
+    # upstream circuit opens and how long it stays open, and the upstream
+    # time budget of each request (0 disables it)
+    HE_CALL_TIMEOUT = float(os.environ.get("HE_CALL_TIMEOUT", 30))
+    HE_BREAKER_THRESHOLD = int(os.environ.get("HE_BREAKER_THRESHOLD", 5))
+    HE_BREAKER_COOLDOWN = float(os.environ.get("HE_BREAKER_COOLDOWN", 30))
+    HE_REQUEST_BUDGET = float(os.environ.get("HE_REQUEST_BUDGET", 15))
+    # Most contract queries sent in one JSON-RPC batch request
+    HE_BATCH_MAX_SIZE = int(os.environ.get("HE_BATCH_MAX_SIZE", 50))
+    # Concurrent upstream fetches per page
+    FANOUT_MAX_WORKERS = int(os.environ.get("FANOUT_MAX_WORKERS", 16))
+    FANOUT_TIMEOUT = float(os.environ.get("FANOUT_TIMEOUT", 10))
+    # How often each worker checks whether the token list (and so its search
+    # index) has been refreshed
+    TOKEN_INDEX_CHECK_INTERVAL = int(os.environ.get("TOKEN_INDEX_CHECK_INTERVAL", 30))
+    # Per-process tier in front of the shared cache for hot memoized values
+    MEMO_LOCAL_MAX_BYTES = int(os.environ.get("MEMO_LOCAL_MAX_BYTES", 64 * 1024 * 1024))
+    MEMO_LOCAL_CHECK_INTERVAL = float(os.environ.get("MEMO_LOCAL_CHECK_INTERVAL", 5))
+    # Upstream time budget for computing a memoized value on a cache miss,
+    # in place of the request's (keep it under the 120s build lock)
+    MEMO_BUILD_BUDGET = float(os.environ.get("MEMO_BUILD_BUDGET", 60))
+    # How often each worker adds its metrics to the shared Redis totals
+    METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", 5))
+    # Profiling: requests sending ``X-Profile: <PROFILE_TOKEN>`` (unset: off),
+    # plus a random PROFILE_SAMPLE_RATE share, are profiled and kept for
+    # PROFILE_TTL seconds. Requests slower than SLOW_REQUEST_THRESHOLD
+    # seconds (0: off) are logged with their time split.
+    PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+    PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+    PROFILE_TTL = int(os.environ.get("PROFILE_TTL", 86400))
+    SLOW_REQUEST_THRESHOLD = float(os.environ.get("SLOW_REQUEST_THRESHOLD", 2))
+    # Parallel account-range scans when building a rich list
+    RICHLIST_SCAN_CONCURRENCY = int(os.environ.get("RICHLIST_SCAN_CONCURRENCY", 4))
 
     @staticmethod
     def get_cache_config():
@@ -16,7 +65,7 @@ class Config:
             from redis import from_url
 
             from_url(Config.CACHE_REDIS_URL).ping()
-            return "RedisCache"
+            return "viewr.utils.serialization.CompressedRedisCache"
         except Exception:
             return "SimpleCache"
 
@@ -1,3 +1,19 @@
+from flask import current_app
 from flask_caching import Cache
 
 cache = Cache()
+
+
+def get_redis():
+    """Return a client for the cache's Redis server, or None under SimpleCache."""
+    app = current_app
+    if not app.config.get("CACHE_TYPE", "").endswith("RedisCache"):
+        return None
+    client = app.extensions.get("viewr_redis")
+    if client is None:
+        from redis import from_url
+
+        client = app.extensions.setdefault(
+            "viewr_redis", from_url(app.config["CACHE_REDIS_URL"])
+        )
+    return client
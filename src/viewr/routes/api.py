@@ -1,17 +1,37 @@
+import hashlib
 import json
 import logging
+import os
 from datetime import datetime, timezone
 
-import pandas as pd
-import plotly.graph_objects as go
-import plotly.utils
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, abort, jsonify, request
 
-from ..api.hive_engine import he_api, he_market
+from ..api.hive_engine import CircuitOpenError, he_api, upstream_status
 from ..extensions import cache
-from ..services.market import get_market_data
-from ..services.tokens import get_token_info
+from ..services.market import (
+    RESOLUTIONS,
+    get_last_trade,
+    get_ohlc,
+    get_order_books,
+    get_top_of_book,
+)
+from ..services.pools import get_lp_pools_for_token
+from ..services.richlist import Richlist
+from ..services.token_index import MARKET_FIELDS, SORT_FIELDS, get_token_index
+from ..services.tokens import get_richlist, get_token_info, get_token_infos
+from ..utils.caching import cache_stats, local_cache_stats, memoize
+from ..utils.concurrency import Fetch, gather
+from ..utils.deadline import budget
+from ..utils.metrics import metrics_response
+from ..utils.profiling import (
+    check_token,
+    get_profile,
+    list_profiles,
+    profile_text,
+    slow_requests,
+)
 from ..utils.security import sanitize_symbol
+from ..utils.serialization import serializer_stats
 
 logger = logging.getLogger(__name__)
 
@@ -32,18 +52,142 @@ def health_check():
         status["status"] = "error"
         status["dependencies"]["redis"] = f"error: {str(e)}"
     try:
-        he_api.find_one("tokens", "tokens", query={})
+        with budget(5):
+            he_api.find_one("tokens", "tokens", query={})
         status["dependencies"]["hive_engine"] = "ok"
+    except CircuitOpenError as e:
+        # Pages are still served from cache while the circuit is open.
+        if status["status"] == "ok":
+            status["status"] = "degraded"
+        status["dependencies"]["hive_engine"] = f"circuit open: {str(e)}"
     except Exception as e:
         status["status"] = "error"
         status["dependencies"]["hive_engine"] = f"error: {str(e)}"
-    return jsonify(status), 200 if status["status"] == "ok" else 503
+    try:
+        status["upstream"] = {"pid": os.getpid(), **upstream_status()}
+    except Exception as e:
+        logger.warning(f"Failed to read upstream status: {e}")
+    return jsonify(status), 503 if status["status"] == "error" else 200
+
+
+@api_bp.route("/metrics")
+def metrics():
+    return metrics_response()
+
+
+def _require_profile_token():
+    # Hidden unless the caller has the profiling token.
+    if not check_token(request.headers.get("X-Profile")):
+        abort(404)
+
+
+@api_bp.route("/api/profiles")
+def api_profiles():
+    _require_profile_token()
+    return jsonify({"profiles": list_profiles()}), 200
+
+
+@api_bp.route("/api/profiles/<profile_id>")
+def api_profile(profile_id):
+    """Download a stored profile as a ``.prof`` file, or ``?format=text``.
+
+    Profiles cover the request thread only; fan-out work appears as waits.
+    """
+    _require_profile_token()
+    profile = get_profile(profile_id)
+    if profile is None:
+        abort(404)
+    meta, stats = profile
+    if request.args.get("format") == "text":
+        sort = request.args.get("sort", "cumulative")
+        if sort not in ("cumulative", "tottime", "calls"):
+            return jsonify({"error": "Invalid sort"}), 400
+        return Response(profile_text(stats, sort=sort), mimetype="text/plain")
+    return Response(
+        stats,
+        mimetype="application/octet-stream",
+        headers={
+            "Content-Disposition": f"attachment; filename={meta['id']}.prof",
+        },
+    )
+
+
+@api_bp.route("/api/slow-requests")
+def api_slow_requests():
+    _require_profile_token()
+    return jsonify({"requests": slow_requests()}), 200
+
+
+@api_bp.route("/api/cache/stats")
+def api_cache_stats():
+    _require_profile_token()
+    return jsonify(
+        {
+            "pid": os.getpid(),
+            "local_tier": local_cache_stats(),
+            "functions": cache_stats(),
+            "serialization": serializer_stats(cache.cache),
+        }
+    ), 200
+
+
+@memoize(timeout=60, hard_timeout=300, local=True)
+def _chart_payload(token, days, resolution):
+    """Encode the columnar chart body once and cache it with its ETag."""
+    ohlc = get_ohlc(token, days=days, resolution=resolution)
+    body = json.dumps(
+        {
+            "symbol": token,
+            "resolution": ohlc["resolution"],
+            **{key: ohlc[key] for key in "tohlcv"},
+        },
+        separators=(",", ":"),
+    ).encode("utf-8")
+    # No Last-Modified: the newest bucket keeps changing while it is open, so
+    # no timestamp we have marks the last change. The ETag covers it.
+    return {"body": body, "etag": hashlib.md5(body).hexdigest()}
+
+
+def _plotly_chart(token, days, resolution):
+    """Legacy response: a serialized Plotly figure."""
+    import pandas as pd
+    import plotly.graph_objects as go
+    import plotly.utils
+
+    ohlc = get_ohlc(token, days=days, resolution=resolution)
+    if not ohlc["t"]:
+        fig = go.Figure()
+        fig.update_layout(title=f"{token}/SWAP.HIVE Market Data - No Data Available")
+    else:
+        fig = go.Figure(
+            data=[
+                go.Candlestick(
+                    x=pd.to_datetime(ohlc["t"], unit="s"),
+                    open=ohlc["o"],
+                    high=ohlc["h"],
+                    low=ohlc["l"],
+                    close=ohlc["c"],
+                )
+            ]
+        )
+        fig.update_layout(
+            title=f"{token}/SWAP.HIVE Market Data ({ohlc['resolution']})",
+            xaxis_rangeslider_visible=False,
+        )
+    return (
+        json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder),
+        200,
+        {"Content-Type": "application/json"},
+    )
 
 
 @api_bp.route("/api/chart/<token>/<timeframe>")
 def api_chart(token, timeframe):
     try:
         token = sanitize_symbol(token)
+        resolution = request.args.get("resolution") or None
+        if resolution is not None and resolution not in RESOLUTIONS:
+            return jsonify({"error": "Invalid resolution"}), 400
         token_info = get_token_info(token)
         if not token_info:
             return jsonify({"error": "Invalid token"}), 404
@@ -55,46 +199,215 @@ def api_chart(token, timeframe):
                 days = int(timeframe)
             except Exception:
                 pass
-        market_data = get_market_data(token, days=days)
-        if not market_data:
-            fig = go.Figure()
-            fig.update_layout(
-                title=f"{token}/SWAP.HIVE Market Data - No Data Available"
-            )
-            return (
-                json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder),
-                200,
-                {"Content-Type": "application/json"},
-            )
-        df = pd.DataFrame(market_data)
-        if df["timestamp"].max() > 1000000000000:
-            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="ms")
-        else:
-            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="s")
-        fig = go.Figure(
-            data=[
-                go.Candlestick(
-                    x=df["timestamp"],
-                    open=df["openPrice"],
-                    high=df["highestPrice"],
-                    low=df["lowestPrice"],
-                    close=df["closePrice"],
-                )
-            ]
-        )
-        fig.update_layout(
-            title=f"{token}/SWAP.HIVE Market Data", xaxis_rangeslider_visible=False
-        )
-        return (
-            json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder),
-            200,
-            {"Content-Type": "application/json"},
-        )
+        if request.args.get("format") == "plotly":
+            return _plotly_chart(token, days, resolution)
+
+        payload = _chart_payload(token, days, resolution)
+        response = Response(payload["body"], mimetype="application/json")
+        response.set_etag(payload["etag"])
+        response.cache_control.public = True
+        response.cache_control.max_age = 60
+        return response.make_conditional(request)
     except Exception as e:
         logger.error(f"Error generating chart: {e}")
         return jsonify({"error": "Chart error"}), 500
 
 
+TOKEN_SEARCH_MAX_LIMIT = 50
+TOKEN_LIST_MAX_LIMIT = 1000
+
+
+def _token_summary(token):
+    metadata = token.get("metadata")
+    return {
+        "symbol": token.get("symbol"),
+        "name": token.get("name"),
+        "icon": metadata.get("icon") if isinstance(metadata, dict) else None,
+    }
+
+
+@api_bp.route("/api/tokens")
+def api_tokens():
+    """The token list joined with market metrics, filterable and sortable."""
+    try:
+        offset = max(int(request.args.get("offset", 0)), 0)
+        limit = min(max(int(request.args.get("limit", 100)), 1), TOKEN_LIST_MAX_LIMIT)
+    except ValueError:
+        return jsonify({"error": "Invalid offset or limit"}), 400
+    sort = request.args.get("sort") or None
+    if sort is not None and sort not in SORT_FIELDS:
+        return jsonify({"error": "Invalid sort field"}), 400
+    order = request.args.get("order", "desc")
+    if order not in ("asc", "desc"):
+        return jsonify({"error": "Invalid sort order"}), 400
+    query = request.args.get("q", "").lower()
+
+    matches = get_token_index().search(query, sort=sort, descending=order == "desc")
+    tokens = []
+    for token in matches[offset : offset + limit]:
+        row = _token_summary(token)
+        row["supply"] = token.get("supply")
+        row["circulatingSupply"] = token.get("circulatingSupply")
+        row.update({field: token.get(field) for field in MARKET_FIELDS})
+        tokens.append(row)
+    response = jsonify(
+        {
+            "q": query,
+            "sort": sort,
+            "order": order,
+            "offset": offset,
+            "limit": limit,
+            "total": len(matches),
+            "tokens": tokens,
+        }
+    )
+    response.cache_control.public = True
+    response.cache_control.max_age = 60
+    return response
+
+
+@api_bp.route("/api/tokens/search")
+def api_token_search():
+    """Typeahead over token symbols and names, best matches first."""
+    query = request.args.get("q", "").strip()
+    try:
+        limit = min(max(int(request.args.get("limit", 10)), 1), TOKEN_SEARCH_MAX_LIMIT)
+    except ValueError:
+        return jsonify({"error": "Invalid limit"}), 400
+    if not query:
+        return jsonify({"q": query, "results": []}), 200
+    results = [
+        _token_summary(token)
+        for token in get_token_index().search(query, limit=limit, ranked=True)
+    ]
+    response = jsonify({"q": query, "results": results})
+    response.cache_control.public = True
+    response.cache_control.max_age = 300
+    return response
+
+
+RICHLIST_MAX_LIMIT = 1000
+
+
+@api_bp.route("/api/richlist/<token>")
+def api_richlist(token):
+    """One page of a token's holders, served from the cached rich list."""
+    token = sanitize_symbol(token)
+    try:
+        offset = max(int(request.args.get("offset", 0)), 0)
+        limit = min(max(int(request.args.get("limit", 100)), 1), RICHLIST_MAX_LIMIT)
+    except ValueError:
+        return jsonify({"error": "Invalid offset or limit"}), 400
+    sort = request.args.get("sort", "total")
+    if sort != "account" and sort not in Richlist.SORT_FIELDS:
+        return jsonify({"error": "Invalid sort field"}), 400
+    order = request.args.get("order", "asc" if sort == "account" else "desc")
+    if order not in ("asc", "desc"):
+        return jsonify({"error": "Invalid sort order"}), 400
+    query = request.args.get("q", "").strip().lower()
+
+    token_info = get_token_info(token)
+    if not token_info:
+        return jsonify({"error": "Invalid token"}), 404
+    try:
+        richlist, burned_balance = get_richlist(token)
+    except RuntimeError:
+        return jsonify({"error": "Richlist temporarily unavailable"}), 503
+
+    total, holders = richlist.page(
+        offset, limit, sort=sort, descending=order == "desc", prefix=query
+    )
+    try:
+        supply = float(token_info.get("supply") or 0)
+    except (TypeError, ValueError):
+        supply = 0.0
+    for holder in holders:
+        holder["percentage"] = holder["total"] / supply * 100 if supply else 0.0
+
+    response = jsonify(
+        {
+            "symbol": token,
+            "offset": offset,
+            "limit": limit,
+            "sort": sort,
+            "order": order,
+            "q": query,
+            "total": total,
+            "holders_count": len(richlist),
+            "supply": supply,
+            "burned_balance": burned_balance,
+            "holders": holders,
+        }
+    )
+    response.cache_control.public = True
+    response.cache_control.max_age = 60
+    return response
+
+
+BATCH_FIELDS = ("info", "top_of_book", "last_trade", "pools")
+BATCH_MAX_SYMBOLS = 50
+
+
+@api_bp.route("/api/batch")
+def api_batch():
+    """Several fields for many symbols in one response, for dashboards.
+
+    Token info comes from one batched ``$in`` lookup and top of book from
+    the bulk market metrics; last trades and pools are per-symbol cached
+    calls run concurrently. Fields that fail or time out are null and the
+    response is marked ``partial``.
+    """
+    symbols = [
+        sanitize_symbol(s).upper()
+        for s in request.args.get("symbols", "").split(",")
+        if sanitize_symbol(s)
+    ]
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return jsonify({"error": "No symbols given"}), 400
+    if len(symbols) > BATCH_MAX_SYMBOLS:
+        return jsonify({"error": f"At most {BATCH_MAX_SYMBOLS} symbols"}), 400
+    fields = [
+        f.strip()
+        for f in request.args.get("fields", ",".join(BATCH_FIELDS)).split(",")
+        if f.strip()
+    ]
+    unknown = set(fields) - set(BATCH_FIELDS)
+    if unknown or not fields:
+        return jsonify({"error": "Invalid fields"}), 400
+
+    fetches = {}
+    if "info" in fields:
+        fetches["info"] = Fetch(get_token_infos, symbols, fallback=dict)
+    if "top_of_book" in fields:
+        fetches["top_of_book"] = Fetch(get_top_of_book, symbols, fallback=dict)
+    for symbol in symbols:
+        if "last_trade" in fields:
+            fetches[f"last_trade:{symbol}"] = Fetch(get_last_trade, symbol)
+        if "pools" in fields:
+            fetches[f"pools:{symbol}"] = Fetch(get_lp_pools_for_token, symbol)
+    results = gather(fetches)
+
+    data = {}
+    for symbol in symbols:
+        entry = {}
+        if "info" in fields:
+            entry["info"] = results["info"].get(symbol)
+        if "top_of_book" in fields:
+            entry["top_of_book"] = results["top_of_book"].get(symbol)
+        if "last_trade" in fields:
+            entry["last_trade"] = results[f"last_trade:{symbol}"] or None
+        if "pools" in fields:
+            entry["pools"] = results[f"pools:{symbol}"]
+        data[symbol] = entry
+    partial = results.partial
+    response = jsonify({"fields": fields, "partial": partial, "symbols": data})
+    if not partial:
+        response.cache_control.public = True
+        response.cache_control.max_age = 30
+    return response
+
+
 @api_bp.route("/api/orderbook/<token>")
 def api_orderbook(token):
     token = sanitize_symbol(token)
@@ -102,32 +415,21 @@ def api_orderbook(token):
         excluded_accounts = [
             a.strip() for a in request.args.get("exclude", "").split(",") if a.strip()
         ]
-        buy_orders = []
-        sell_orders = []
+        orders = {"buy": [], "sell": []}
         limit = 100
         offset = 0
-        buy_page = he_market.get_buy_book(symbol=token, limit=limit)
-        while buy_page:
-            buy_orders.extend(
-                [o for o in buy_page if o.get("account") not in excluded_accounts]
-            )
-            offset += len(buy_page)
-            if len(buy_page) < limit:
-                break
-            buy_page = he_market.get_buy_book(symbol=token, limit=limit, offset=offset)
-        offset = 0
-        sell_page = he_market.get_sell_book(symbol=token, limit=limit)
-        while sell_page:
-            sell_orders.extend(
-                [o for o in sell_page if o.get("account") not in excluded_accounts]
-            )
-            offset += len(sell_page)
-            if len(sell_page) < limit:
-                break
-            sell_page = he_market.get_sell_book(
-                symbol=token, limit=limit, offset=offset
-            )
-        return jsonify({"buy_book": buy_orders, "sell_book": sell_orders}), 200
+        # Both books are paged together, one batched request per page,
+        # until each side runs out.
+        sides = tuple(orders)
+        while sides:
+            pages = get_order_books(token, limit=limit, offset=offset, sides=sides)
+            for side, page in pages.items():
+                orders[side].extend(
+                    o for o in page if o.get("account") not in excluded_accounts
+                )
+            sides = tuple(side for side, page in pages.items() if len(page) >= limit)
+            offset += limit
+        return jsonify({"buy_book": orders["buy"], "sell_book": orders["sell"]}), 200
     except Exception as e:
         logger.error(f"Error getting order book for {token}: {e}")
         return jsonify({"error": "Orderbook error"}), 500
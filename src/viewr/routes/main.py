@@ -1,6 +1,5 @@
 import csv
 import io
-import json
 import logging
 
 from flask import (
@@ -14,16 +13,20 @@ from flask import (
     url_for,
 )
 
-from ..api.hive_engine import he_market
 from ..extensions import cache
-from ..services.market import get_trade_history
-from ..services.tokens import get_richlist, get_token_info, get_tokens
-from ..utils.security import is_valid_image_url, sanitize_symbol
+from ..services.market import get_order_books, get_trade_history
+from ..services.richlist import FIELDS
+from ..services.token_index import SORT_FIELDS, get_token_index
+from ..services.tokens import get_richlist, get_token_info
+from ..utils.concurrency import Fetch, gather, response_complete
+from ..utils.security import sanitize_symbol
 
 logger = logging.getLogger(__name__)
 
 main_bp = Blueprint("main", __name__)
 
+RICHLIST_PAGE_SIZE = 100
+
 
 @main_bp.route("/robots.txt")
 def robots_txt():
@@ -37,28 +40,20 @@ def favicon():
 
 @main_bp.route("/")
 @main_bp.route("/page/<int:page>")
-@cache.cached(timeout=3600, query_string=True)
+@cache.cached(
+    timeout=300, query_string=True, unless=lambda: bool(request.args.get("q"))
+)
 def index(page=1):
+    # Searches are answered from the in-process index and not page-cached,
+    # so ad-hoc queries don't each leave a cache entry behind.
     search_query = request.args.get("q", "").lower()
-    all_tokens = get_tokens()
-
-    for token in all_tokens:
-        if token and "metadata" in token and isinstance(token["metadata"], str):
-            try:
-                token["metadata"] = json.loads(token["metadata"])
-                if token["metadata"] and "icon" in token["metadata"]:
-                    if not is_valid_image_url(token["metadata"]["icon"]):
-                        token["metadata"]["icon"] = None
-            except json.JSONDecodeError:
-                pass
-
-    if search_query:
-        all_tokens = [
-            t
-            for t in all_tokens
-            if search_query in t.get("symbol", "").lower()
-            or search_query in t.get("name", "").lower()
-        ]
+    sort = request.args.get("sort")
+    if sort not in SORT_FIELDS:
+        sort = None
+    order = "asc" if request.args.get("order") == "asc" else "desc"
+    all_tokens = get_token_index().search(
+        search_query, sort=sort, descending=order == "desc"
+    )
 
     per_page = 100
     total = len(all_tokens)
@@ -74,52 +69,54 @@ def index(page=1):
         total=total,
         total_pages=total_pages,
         search_query=search_query,
+        sort=sort,
+        order=order,
     )
 
 
 @main_bp.route("/market/<token>")
-@cache.cached(timeout=300)
+@cache.cached(timeout=300, response_filter=response_complete)
 def market(token):
     token = sanitize_symbol(token)
-    token_info = get_token_info(token)
+    results = gather(
+        {
+            "token_info": Fetch(get_token_info, token),
+            "order_books": Fetch(get_order_books, token, fallback=dict),
+            "trade_history": Fetch(
+                get_trade_history, token, limit=500, days=30, fallback=list
+            ),
+        }
+    )
+    token_info = results["token_info"]
     if not token_info:
         abort(404)
 
-    try:
-        buy_book = he_market.get_buy_book(symbol=token)
-    except Exception as e:
-        logger.error(f"Error getting buy book for {token}: {e}")
-        buy_book = []
-
-    try:
-        sell_book = he_market.get_sell_book(symbol=token)
-    except Exception as e:
-        logger.error(f"Error getting sell book for {token}: {e}")
-        sell_book = []
-
-    trade_history = get_trade_history(token, limit=500, days=30)
+    order_books = results["order_books"]
     return render_template(
         "market.html",
         token=token,
         token_info=token_info,
-        buy_book=buy_book,
-        sell_book=sell_book,
-        trade_history=trade_history,
+        buy_book=order_books.get("buy", []),
+        sell_book=order_books.get("sell", []),
+        trade_history=results["trade_history"],
     )
 
 
 @main_bp.route("/view/<token>")
-@cache.cached(timeout=900)
+@cache.cached(timeout=900, response_filter=response_complete)
 def view(token):
     token = sanitize_symbol(token)
-    token_info = get_token_info(token)
+    results = gather(
+        {
+            "token_info": Fetch(get_token_info, token),
+            "richlist": Fetch(get_richlist, token, fallback=([], 0.0)),
+        }
+    )
+    token_info = results["token_info"]
     if not token_info:
         abort(404)
 
-    try:
-        richlist, burned_balance = get_richlist(token)
-    except RuntimeError:
-        richlist, burned_balance = [], 0.0
+    richlist, burned_balance = results["richlist"]
 
     burned_percentage = 0.0
     if token_info.get("supply"):
@@ -156,70 +153,118 @@ def full_richlist(token):
             message="Richlist temporarily unavailable.",
         ), 503
 
+    # Only the first page is rendered; the page fetches the rest from
+    # /api/richlist as it scrolls.
+    _, first_page = richlist.page(0, RICHLIST_PAGE_SIZE)
     return render_template(
         "richlist_full.html",
         token=token,
         token_info=token_info,
-        richlist=richlist,
+        richlist=first_page,
+        holders_count=len(richlist),
+        page_size=RICHLIST_PAGE_SIZE,
         burned_balance=burned_balance,
     )
 
 
+CSV_HEADER = [
+    "Rank",
+    "Account",
+    "Balance",
+    "Stake",
+    "Pending Unstake",
+    "Delegations In",
+    "Delegations Out",
+    "Pending Undelegation",
+    "Total",
+    "Percentage",
+]
+CSV_CHUNK_ROWS = 1000
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.file", "arrow"),
+}
+
+
+def _csv_rows(richlist, total_supply):
+    """Stream the rich list as CSV, one chunk of rows at a time."""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(CSV_HEADER)
+    for start, accounts, columns in richlist.chunks(CSV_CHUNK_ROWS):
+        for i, account in enumerate(accounts):
+            total = columns["total"][i]
+            percentage = (total / total_supply * 100) if total_supply else 0
+            writer.writerow(
+                [
+                    start + i + 1,
+                    account,
+                    *(f"{columns[field][i]:.8f}" for field in FIELDS),
+                    f"{total:.8f}",
+                    f"{percentage:.2f}",
+                ]
+            )
+        yield output.getvalue()
+        output.seek(0)
+        output.truncate()
+    if output.tell():
+        yield output.getvalue()
+
+
+def _columnar_export(richlist, total_supply, export_format):
+    """Write the rich list as a Parquet or Arrow IPC file."""
+    import pyarrow as pa
+
+    table = richlist.to_arrow(total_supply)
+    sink = pa.BufferOutputStream()
+    if export_format == "parquet":
+        import pyarrow.parquet as pq
+
+        pq.write_table(table, sink, compression="zstd")
+    else:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
 @main_bp.route("/richlist/<token>/csv")
-@cache.cached(timeout=900)
 def export_richlist_csv(token):
     token = sanitize_symbol(token)
+    export_format = request.args.get("format", "csv").lower()
+    if export_format not in EXPORT_FORMATS:
+        abort(400)
     try:
         richlist, _ = get_richlist(token)
     except RuntimeError:
         abort(503)
 
-    def generate():
-        token_info = get_token_info(token)
+    token_info = get_token_info(token) or {}
+    try:
+        total_supply = float(token_info.get("supply", 1))
+    except Exception:
+        total_supply = 1
+
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    if export_format == "csv":
+        body = _csv_rows(richlist, total_supply)
+    else:
         try:
-            total_supply = float(token_info.get("supply", 1))
-        except Exception:
-            total_supply = 1
-        data = [
-            [
-                "Rank",
-                "Account",
-                "Balance",
-                "Stake",
-                "Pending Unstake",
-                "Delegations In",
-                "Delegations Out",
-                "Pending Undelegation",
-                "Total",
-                "Percentage",
-            ]
-        ]
-        for idx, holder in enumerate(richlist, 1):
-            balance = float(holder.get("balance", 0) or 0)
-            stake = float(holder.get("stake", 0) or 0)
-            total = balance + stake
-            percentage = (total / total_supply * 100) if total_supply else 0
-            data.append(
-                [
-                    idx,
-                    holder.get("account", ""),
-                    f"{balance:.8f}",
-                    f"{stake:.8f}",
-                    f"{float(holder.get('pendingUnstake', 0) or 0):.8f}",
-                    f"{float(holder.get('delegationsIn', 0) or 0):.8f}",
-                    f"{float(holder.get('delegationsOut', 0) or 0):.8f}",
-                    f"{float(holder.get('pendingUndelegations', 0) or 0):.8f}",
-                    f"{total:.8f}",
-                    f"{percentage:.2f}",
-                ]
-            )
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerows(data)
-        return output.getvalue()
-
-    return Response(
-        generate(),
-        mimetype="text/csv",
-        headers={"Content-Disposition": f"attachment;filename={token}_richlist.csv"},
+            body = _columnar_export(richlist, total_supply, export_format)
+        except ImportError:
+            return render_template(
+                "error_generic.html",
+                code="501 - Not Implemented",
+                message="Columnar exports need the optional pyarrow package.",
+            ), 501
+
+    response = Response(
+        body,
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": (f"attachment;filename={token}_richlist.{extension}")
+        },
     )
+    response.cache_control.public = True
+    response.cache_control.max_age = 900
+    return response
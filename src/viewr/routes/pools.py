@@ -5,6 +5,7 @@ from flask import Blueprint, abort, render_template
 from ..extensions import cache
 from ..services.pools import get_lp_pool, get_lp_pools_for_token, get_lp_positions
 from ..services.tokens import get_token_info
+from ..utils.concurrency import Fetch, gather, response_complete
 from ..utils.security import sanitize_symbol
 
 logger = logging.getLogger(__name__)
@@ -13,13 +14,19 @@ pools_bp = Blueprint("pools", __name__)
 
 
 @pools_bp.route("/lp/<token>")
-@cache.cached(timeout=300)
+@cache.cached(timeout=300, response_filter=response_complete)
 def lp_list(token: str):
     token = sanitize_symbol(token)
-    token_info = get_token_info(token)
+    results = gather(
+        {
+            "token_info": Fetch(get_token_info, token),
+            "pools": Fetch(get_lp_pools_for_token, token, fallback=list),
+        }
+    )
+    token_info = results["token_info"]
     if not token_info:
         abort(404)
-    pools = get_lp_pools_for_token(token)
+    pools = results["pools"]
     enriched = []
     for p in pools:
         tp = p.get("tokenPair", "")
@@ -34,21 +41,35 @@ def lp_list(token: str):
     )
 
 
+def _fetch_pool_and_positions(base, quote):
+    """Return ``(token_pair, pool, positions)`` for the pool in either order.
+
+    Both orders and their positions are fetched in one gather, so their
+    coalesced lookups share one batched request and a reversed URL costs no
+    extra round trip. ``pool`` is None if neither order exists.
+    """
+    pairs = list(dict.fromkeys((f"{base}:{quote}", f"{quote}:{base}")))
+    fetches = {}
+    for pair in pairs:
+        fetches[f"pool:{pair}"] = Fetch(get_lp_pool, pair)
+        fetches[f"positions:{pair}"] = Fetch(
+            get_lp_positions, pair, limit=200, fallback=list
+        )
+    results = gather(fetches)
+    for pair in pairs:
+        if results[f"pool:{pair}"]:
+            return pair, results[f"pool:{pair}"], results[f"positions:{pair}"]
+    return pairs[0], None, []
+
+
 @pools_bp.route("/lp/<base>/<quote>")
-@cache.cached(timeout=300)
+@cache.cached(timeout=300, response_filter=response_complete)
 def lp_detail(base: str, quote: str):
     base = sanitize_symbol(base)
     quote = sanitize_symbol(quote)
-    token_pair = f"{base.upper()}:{quote.upper()}"
-    pool = get_lp_pool(token_pair)
+    token_pair, pool, positions = _fetch_pool_and_positions(base.upper(), quote.upper())
     if not pool:
-        rev_pair = f"{quote.upper()}:{base.upper()}"
-        pool = get_lp_pool(rev_pair)
-        if pool:
-            token_pair = rev_pair
-        else:
-            abort(404)
-    positions = get_lp_positions(token_pair, limit=200)
+        abort(404)
 
     def _to_float(val):
         try:
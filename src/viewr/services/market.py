@@ -1,61 +1,344 @@
+import bisect
 import logging
 import time
 from datetime import datetime
 
-import requests
+import pandas as pd
+from nectarengine.exceptions import TokenDoesNotExists
 
-from ..api.hive_engine import he_market
+from ..api.hive_engine import ContractBatch, get_market_history, he_api
 from ..extensions import cache
+from ..utils.caching import memoize
+from ..utils.metrics import record_page
+from ..utils.profiling import timed
+from .tokens import get_token_info
 
 logger = logging.getLogger(__name__)
 
-HE_HISTORY_API = "https://history.hive-engine.com"
 
+@memoize(timeout=300, hard_timeout=1800, local=True)
+def get_market_metrics():
+    """Return ``market.metrics`` for every token, keyed by symbol."""
+    metrics = {}
+    offset = 0
+    limit = 1000
+    while True:
+        batch = he_api.find("market", "metrics", limit=limit, offset=offset)
+        record_page("market_metrics", batch)
+        if not batch:
+            break
+        for m in batch:
+            if isinstance(m, dict) and m.get("symbol"):
+                metrics[m["symbol"]] = m
+        if len(batch) < limit:
+            break
+        offset += limit
+    return metrics
 
-@cache.memoize(timeout=300)
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_top_of_book(symbols):
+    """Return ``{symbol: {"bid", "ask", "last"}}`` from the bulk metrics.
+
+    One cached ``market.metrics`` fetch covers every symbol; tokens without
+    a market map to None.
+    """
+    metrics = get_market_metrics() or {}
+    book = {}
+    for symbol in symbols:
+        m = metrics.get(symbol)
+        book[symbol] = (
+            {
+                "bid": _to_float(m.get("highestBid")),
+                "ask": _to_float(m.get("lowestAsk")),
+                "last": _to_float(m.get("lastPrice")),
+            }
+            if m
+            else None
+        )
+    return book
+
+
+ORDER_BOOK_TABLES = {"buy": "buyBook", "sell": "sellBook"}
+
+
+def get_order_books(symbol, limit=100, offset=0, sides=tuple(ORDER_BOOK_TABLES)):
+    """Return ``{side: orders}``, one page of each of ``symbol``'s books.
+
+    The pages are fetched in one batched request. The tables are queried
+    directly: ``nectarengine.Market`` connects to Hive and re-reads the token
+    list and every market's metrics each time one is built. Like ``Market``,
+    raises ``TokenDoesNotExists`` for unknown tokens.
+    """
+    if get_token_info(symbol) is None:
+        raise TokenDoesNotExists(f"{symbol} does not exists")
+    with ContractBatch() as batch:
+        pages = {
+            side: batch.find(
+                "market",
+                ORDER_BOOK_TABLES[side],
+                query={"symbol": symbol.upper()},
+                limit=limit,
+                offset=offset,
+            )
+            for side in sides
+        }
+    books = {}
+    for side, page in pages.items():
+        books[side] = page.result() or []
+        record_page("orderbook", books[side])
+    return books
+
+
+TRADE_PAGE_SIZE = 1000
+TRADE_LOG_MAX_PAGES = 10
+TRADE_LOG_RETENTION_DAYS = 30
+TRADE_LOG_MAX_TRADES = TRADE_PAGE_SIZE * TRADE_LOG_MAX_PAGES
+TRADE_LOG_TTL = 7 * 24 * 60 * 60
+
+
+def _find_trades(query, descending):
+    trades = he_api.find(
+        "market",
+        "tradesHistory",
+        query=query,
+        limit=TRADE_PAGE_SIZE,
+        indexes=[{"index": "_id", "descending": descending}],
+    )
+    record_page("trade_history", trades)
+    return trades
+
+
+def _fetch_trades_after(symbol, last_id):
+    """Return trades newer than ``last_id`` (oldest first) and whether the
+    gap was closed within ``TRADE_LOG_MAX_PAGES`` pages."""
+    trades = []
+    for _ in range(TRADE_LOG_MAX_PAGES):
+        batch = _find_trades({"symbol": symbol, "_id": {"$gt": last_id}}, False)
+        if not batch:
+            return trades, True
+        trades.extend(batch)
+        last_id = batch[-1]["_id"]
+        if len(batch) < TRADE_PAGE_SIZE:
+            return trades, True
+    return trades, False
+
+
+def _fetch_recent_trades(symbol, cutoff):
+    """Return up to ``TRADE_LOG_MAX_TRADES`` trades newer than ``cutoff``,
+    walking back from the newest one (oldest first)."""
+    trades = []
+    query = {"symbol": symbol}
+    for _ in range(TRADE_LOG_MAX_PAGES):
+        batch = _find_trades(query, True)
+        if not batch:
+            break
+        recent = [t for t in batch if int(t.get("timestamp", 0)) >= cutoff]
+        trades.extend(recent)
+        if len(recent) < len(batch) or len(batch) < TRADE_PAGE_SIZE:
+            break
+        query = {"symbol": symbol, "_id": {"$lt": batch[-1]["_id"]}}
+    trades.reverse()
+    return trades
+
+
+def sync_trade_log(symbol):
+    """Bring the cached trade log for ``symbol`` up to date.
+
+    Only trades newer than the last stored one are fetched; a cold or
+    too-far-behind log is rebuilt from the newest trades backwards. The log
+    is trimmed to ``TRADE_LOG_RETENTION_DAYS`` and ``TRADE_LOG_MAX_TRADES``
+    and returned oldest first.
+    """
+    symbol = symbol.upper()
+    key = f"trade_log:{symbol}"
+    now = time.time()
+    cutoff = now - TRADE_LOG_RETENTION_DAYS * 24 * 60 * 60
+    log = cache.get(key)
+    stored = log["trades"] if log else []
+    try:
+        trades = None
+        if stored:
+            new, complete = _fetch_trades_after(symbol, stored[-1]["_id"])
+            if complete:
+                trades = stored + new
+        if trades is None:
+            trades = _fetch_recent_trades(symbol, cutoff)
+    except Exception as e:
+        if not stored:
+            raise
+        logger.warning(f"Trade log sync for {symbol} failed, serving stored: {e}")
+        return stored
+    trades = [t for t in trades if int(t.get("timestamp", 0)) >= cutoff]
+    trades = trades[-TRADE_LOG_MAX_TRADES:]
+    cache.set(key, {"trades": trades, "synced": now}, timeout=TRADE_LOG_TTL)
+    return trades
+
+
+@memoize(timeout=30, hard_timeout=300)
+def get_last_trade(symbol):
+    """Return the most recent trade for ``symbol``, or an empty dict."""
+    trades = he_api.find(
+        "market",
+        "tradesHistory",
+        query={"symbol": symbol.upper()},
+        limit=1,
+        indexes=[{"index": "_id", "descending": True}],
+    )
+    return trades[0] if trades else {}
+
+
+@memoize(timeout=300, hard_timeout=1800)
 def get_trade_history(symbol, limit=100, days=30):
+    """Return the newest ``limit`` trades from the last ``days`` days."""
     try:
-        all_trades = []
-        batch_size = 1000
-        total_needed = limit
+        trades = sync_trade_log(symbol)
         if days > 0:
-            total_needed = batch_size * 10
-        offset = 0
-        oldest_timestamp = None
-        current_time = time.time()
-        cutoff_time = current_time - (days * 24 * 60 * 60)
-        while len(all_trades) < total_needed:
-            batch = he_market.get_trades_history(
-                symbol=symbol, limit=batch_size, offset=offset
-            )
-            if not batch:
-                break
-            for trade in batch:
-                if days > 0 and int(trade.get("timestamp", 0)) < cutoff_time:
-                    oldest_timestamp = trade.get("timestamp")
-                    break
-                all_trades.append(trade)
-            if oldest_timestamp and int(oldest_timestamp) < cutoff_time:
-                break
-            offset += batch_size
-            if offset > batch_size * 10:
-                break
-        return all_trades[:limit]
+            cutoff = time.time() - (days * 24 * 60 * 60)
+            trades = [t for t in trades if int(t.get("timestamp", 0)) >= cutoff]
+        return trades[::-1][:limit]
     except Exception as e:
         logger.error(f"Error fetching trade history for {symbol}: {e}")
         return []
 
 
+CANDLE_RETENTION_DAYS = 365 * 5 + 1
+CANDLE_MAX_CANDLES = 50_000
+CANDLE_SYNC_INTERVAL = 60
+CANDLE_STORE_TTL = 7 * 24 * 60 * 60
+
+
+def _normalize_candle(candle):
+    ts = candle.get("timestamp", 0) or 0
+    if ts > 1000000000000:
+        candle["timestamp"] = ts / 1000
+    return candle
+
+
+def _merge_candles(stored, fetched):
+    by_ts = {c["timestamp"]: c for c in stored}
+    # Later fetches win: the newest stored candle may still have been open.
+    by_ts.update((c["timestamp"], c) for c in map(_normalize_candle, fetched))
+    return [by_ts[ts] for ts in sorted(by_ts)]
+
+
+def sync_candles(symbol, start):
+    """Return the cached candle store for ``symbol`` covering ``start`` onwards.
+
+    A store that already reaches back to ``start`` only fetches candles from
+    its newest one on (at most once per ``CANDLE_SYNC_INTERVAL``). A store
+    that doesn't is refetched from ``start`` up to now and merged in: the
+    history API takes a start time only, so the range already stored comes
+    back too. Candles older than ``CANDLE_RETENTION_DAYS`` and beyond
+    ``CANDLE_MAX_CANDLES`` are dropped.
+    """
+    key = f"candles:{symbol}"
+    now = time.time()
+    retention_start = now - CANDLE_RETENTION_DAYS * 24 * 60 * 60
+    start = max(start, retention_start)
+    store = cache.get(key)
+    if store and store["start"] <= start:
+        if now - store["synced"] < CANDLE_SYNC_INTERVAL:
+            return store
+        candles = store["candles"]
+        fetch_from = candles[-1]["timestamp"] if candles else store["start"]
+        covered = store["start"]
+    else:
+        candles = store["candles"] if store else []
+        fetch_from = start
+        covered = start
+    try:
+        fetched = get_market_history(symbol, fetch_from * 1000)
+    except Exception as e:
+        if not store:
+            raise
+        logger.warning(f"Candle sync for {symbol} failed, serving stored: {e}")
+        return store
+    candles = _merge_candles(candles, fetched)
+    candles = [c for c in candles if c["timestamp"] >= retention_start]
+    candles = candles[-CANDLE_MAX_CANDLES:]
+    store = {"candles": candles, "start": covered, "synced": now}
+    cache.set(key, store, timeout=CANDLE_STORE_TTL)
+    return store
+
+
+@memoize(timeout=60, hard_timeout=300)
 def get_market_data(symbol, days=30):
-    timestamp_start = int((datetime.now().timestamp() - days * 24 * 60 * 60) * 1000)
-    params = {"symbol": symbol, "timestampStart": timestamp_start}
-    url = f"{HE_HISTORY_API}/marketHistory"
+    """Return the candles of the last ``days`` days, sliced from the store."""
+    cutoff = datetime.now().timestamp() - days * 24 * 60 * 60
     try:
-        response = requests.get(url, params=params)
-        if response.status_code == 200:
-            data = response.json()
-            cutoff = datetime.now().timestamp() - days * 24 * 60 * 60
-            return [d for d in data if d.get("timestamp", 0) >= cutoff]
+        candles = sync_candles(symbol, cutoff)["candles"]
+        idx = bisect.bisect_left([c["timestamp"] for c in candles], cutoff)
+        return candles[idx:]
     except Exception as e:
         logger.error(f"Error fetching market data for {symbol}: {e}")
     return []
+
+
+# Chart bucket sizes, finest first: label -> (pandas rule, seconds)
+RESOLUTIONS = {
+    "1h": ("1h", 60 * 60),
+    "4h": ("4h", 4 * 60 * 60),
+    "1d": ("24h", 24 * 60 * 60),
+    "1w": ("168h", 7 * 24 * 60 * 60),
+}
+CHART_TARGET_POINTS = 500
+CHART_MAX_POINTS = 2000
+
+
+def pick_resolution(days, target_points=CHART_TARGET_POINTS):
+    """Return the finest resolution that fits ``days`` in ``target_points``."""
+    for label, (_, seconds) in RESOLUTIONS.items():
+        if days * 24 * 60 * 60 / seconds <= target_points:
+            return label
+    return label
+
+
+@memoize(timeout=60, hard_timeout=300)
+def get_ohlc(symbol, days=30, resolution=None):
+    """Return OHLCV columns for the window, resampled to ``resolution``.
+
+    The result is a dict of equal-length lists: ``t`` (bucket start, unix
+    seconds), ``o``, ``h``, ``l``, ``c`` and ``v`` (HIVE volume), capped at
+    ``CHART_MAX_POINTS`` most recent buckets.
+    """
+    resolution = resolution or pick_resolution(days)
+    rule, _ = RESOLUTIONS[resolution]
+    candles = get_market_data(symbol, days=days)
+    if not candles:
+        return {"resolution": resolution, **{k: [] for k in "tohlcv"}}
+    with timed("pandas"):
+        df = pd.DataFrame(candles)
+        df.index = pd.to_datetime(df["timestamp"], unit="s", utc=True)
+        columns = {
+            "o": "openPrice",
+            "h": "highestPrice",
+            "l": "lowestPrice",
+            "c": "closePrice",
+            "v": "volumeSteem",
+        }
+        frame = pd.DataFrame(
+            {
+                key: pd.to_numeric(df[col], errors="coerce")
+                if col in df
+                else pd.Series(0.0, index=df.index)
+                for key, col in columns.items()
+            }
+        )
+        bars = (
+            frame.resample(rule, label="left", closed="left", origin="epoch")
+            .agg({"o": "first", "h": "max", "l": "min", "c": "last", "v": "sum"})
+            .dropna(subset=["o", "c"])
+            .iloc[-CHART_MAX_POINTS:]
+        )
+        result = {"resolution": resolution}
+        result["t"] = bars.index.as_unit("s").asi8.tolist()
+        for key in "ohlcv":
+            result[key] = bars[key].tolist()
+    return result
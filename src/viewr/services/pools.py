@@ -1,12 +1,12 @@
 import logging
 
-from ..api.hive_engine import he_api
-from ..extensions import cache
+from ..api.hive_engine import coalesced_find, coalesced_find_one, he_api
+from ..utils.caching import memoize
 
 logger = logging.getLogger(__name__)
 
 
-@cache.memoize(timeout=600)
+@memoize(timeout=600, hard_timeout=3600)
 def get_lp_pools_for_token(token: str) -> list[dict]:
     """Return all liquidity pools where the given token appears."""
     try:
@@ -27,11 +27,17 @@ def get_lp_pools_for_token(token: str) -> list[dict]:
         return []
 
 
-@cache.memoize(timeout=600)
+@memoize(timeout=600, hard_timeout=3600)
 def get_lp_pool(token_pair: str) -> dict:
-    """Return the data for a single liquidity pool."""
+    """Return the data for a single liquidity pool.
+
+    Fetched alongside the pool's positions (see ``get_lp_positions``) in one
+    batched request when both are missing.
+    """
     try:
-        pool = he_api.find_one("marketpools", "pools", query={"tokenPair": token_pair})
+        pool = coalesced_find_one(
+            "marketpools", "pools", query={"tokenPair": token_pair}
+        )
         if isinstance(pool, list):
             pool = pool[0] if pool else None
         return pool or None
@@ -40,11 +46,11 @@ def get_lp_pool(token_pair: str) -> dict:
         return None
 
 
-@cache.memoize(timeout=600)
+@memoize(timeout=600, hard_timeout=3600)
 def get_lp_positions(token_pair: str, limit: int = 200) -> list[dict]:
     """Return the top liquidity provider positions for a given pool."""
     try:
-        positions = he_api.find(
+        positions = coalesced_find(
             "marketpools",
             "liquidityPositions",
             query={"tokenPair": token_pair},
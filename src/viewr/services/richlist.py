@@ -0,0 +1,192 @@
+import numpy as np
+
+# Numeric balance fields kept per holder, in CSV/template order.
+FIELDS = (
+    "balance",
+    "stake",
+    "pendingUnstake",
+    "delegationsIn",
+    "delegationsOut",
+    "pendingUndelegations",
+)
+
+
+def to_float(v):
+    try:
+        return float(v if v is not None else 0)
+    except Exception:
+        return 0.0
+
+
+class Richlist:
+    """A token's holders as compact columns, sorted by total (largest first).
+
+    Account names are a fixed-width bytes array and every balance field a
+    float64 array, which pickles to a fraction of the size of one dict per
+    holder. Indexing and iteration still yield holder dicts, so templates and
+    exports can treat it like the list it replaces; ``top`` and slicing only
+    materialize the rows asked for, and ``rank`` is a binary search.
+    """
+
+    __slots__ = ("_orders", "_sorted_accounts", "accounts", "columns")
+
+    # Columns a page can be sorted by, besides ``account``.
+    SORT_FIELDS = FIELDS + ("total",)
+
+    def __init__(self, accounts, columns):
+        self.accounts = accounts
+        self.columns = columns
+        self._orders = {}
+        self._sorted_accounts = None
+
+    @classmethod
+    def from_rows(cls, accounts, values):
+        """Build from account names and ``{field: [values]}`` in any order."""
+        columns = {
+            field: np.asarray(values[field], dtype=np.float64) for field in FIELDS
+        }
+        columns["total"] = columns["balance"] + columns["stake"]
+        order = np.argsort(-columns["total"], kind="stable")
+        names = np.array([a.encode("utf-8") for a in accounts], dtype=bytes)
+        if not len(names):
+            names = names.astype("S1")
+        return cls(names[order], {field: col[order] for field, col in columns.items()})
+
+    @classmethod
+    def from_holders(cls, holders):
+        """Build from ``tokens.balances`` rows."""
+        accounts = [h.get("account", "") for h in holders]
+        values = {field: [to_float(h.get(field)) for h in holders] for field in FIELDS}
+        return cls.from_rows(accounts, values)
+
+    def __getstate__(self):
+        # ``total`` is derived and most tokens have no delegations or
+        # unstakes, so all-zero columns are stored as None.
+        columns = {
+            field: self.columns[field] if self.columns[field].any() else None
+            for field in FIELDS
+        }
+        return self.accounts, columns
+
+    def __setstate__(self, state):
+        self.accounts, columns = state
+        self.columns = {
+            field: col if col is not None else np.zeros(len(self.accounts))
+            for field, col in columns.items()
+        }
+        self.columns["total"] = self.columns["balance"] + self.columns["stake"]
+        self._orders = {}
+        self._sorted_accounts = None
+
+    def __len__(self):
+        return len(self.accounts)
+
+    def __bool__(self):
+        return len(self.accounts) > 0
+
+    def _row(self, i):
+        row = {"account": self.accounts[i].decode("utf-8")}
+        for field, col in self.columns.items():
+            row[field] = float(col[i])
+        return row
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("richlist index out of range")
+        return self._row(index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._row(i)
+
+    def top(self, n):
+        """Return the ``n`` largest holders as dicts."""
+        return self[:n]
+
+    def chunks(self, size=1000):
+        """Yield ``(start, accounts, columns)`` as plain lists, ``size`` rows at a time.
+
+        Lets exports stream rows without building a dict per holder.
+        """
+        for start in range(0, len(self), size):
+            stop = start + size
+            accounts = [a.decode("utf-8") for a in self.accounts[start:stop]]
+            columns = {
+                field: col[start:stop].tolist() for field, col in self.columns.items()
+            }
+            yield start, accounts, columns
+
+    def to_arrow(self, supply=None):
+        """Return the rich list as a ``pyarrow.Table`` in rank order.
+
+        Requires the optional ``pyarrow`` package. With ``supply``, a
+        ``percentage`` column of total supply is added.
+        """
+        import pyarrow as pa
+
+        data = {
+            "rank": pa.array(np.arange(1, len(self) + 1, dtype=np.int32)),
+            "account": pa.array(self.accounts, type=pa.binary()).cast(pa.string()),
+        }
+        for field in FIELDS + ("total",):
+            data[field] = pa.array(self.columns[field])
+        if supply:
+            data["percentage"] = pa.array(self.columns["total"] / supply * 100)
+        return pa.table(data)
+
+    def order(self, sort="total", descending=True):
+        """Return row positions ordered by ``sort`` (a field or ``account``).
+
+        Ties keep their rank order. Orderings are built lazily and kept for
+        the lifetime of this object.
+        """
+        if sort == "total" and descending:
+            return np.arange(len(self))
+        key = (sort, descending)
+        if key not in self._orders:
+            if sort == "account":
+                # Account names are unique, so there are no ties to keep.
+                order = np.argsort(self.accounts, kind="stable")
+                if descending:
+                    order = order[::-1]
+            elif sort in self.SORT_FIELDS:
+                values = self.columns[sort]
+                order = np.argsort(-values if descending else values, kind="stable")
+            else:
+                raise ValueError(f"Unknown sort field: {sort}")
+            self._orders[key] = order
+        return self._orders[key]
+
+    def page(self, offset=0, limit=100, sort="total", descending=True, prefix=None):
+        """Return ``(matching_count, rows)`` for one page of holders.
+
+        ``prefix`` restricts the page to accounts starting with it. Every row
+        carries its ``rank`` by total holdings, whatever the sort.
+        """
+        positions = self.order(sort, descending)
+        if prefix:
+            matches = np.char.startswith(self.accounts, prefix.encode("utf-8"))
+            positions = positions[matches[positions]]
+        rows = []
+        for i in positions[offset : offset + limit]:
+            row = self._row(i)
+            row["rank"] = int(i) + 1
+            rows.append(row)
+        return len(positions), rows
+
+    def rank(self, account):
+        """Return the 1-based rank of ``account``, or None if it holds none."""
+        by_account = self.order("account", descending=False)
+        if self._sorted_accounts is None:
+            # Built once, like the orderings, so lookups are a binary search.
+            self._sorted_accounts = self.accounts[by_account]
+        sorted_accounts = self._sorted_accounts
+        key = account.encode("utf-8")
+        pos = int(np.searchsorted(sorted_accounts, key))
+        if pos < len(sorted_accounts) and sorted_accounts[pos] == key:
+            return int(by_account[pos]) + 1
+        return None
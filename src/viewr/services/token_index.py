@@ -0,0 +1,203 @@
+import logging
+import threading
+import time
+
+from flask import current_app, has_app_context
+
+from .market import get_market_metrics
+from .tokens import get_tokens
+
+logger = logging.getLogger(__name__)
+
+# Longest n-gram indexed; longer queries intersect their n-grams and verify.
+GRAM_SIZE = 3
+
+
+# Market fields joined onto each token, None when it has no market.
+MARKET_FIELDS = ("lastPrice", "volume", "priceChangePercent")
+SORT_FIELDS = ("symbol", "name", "supply", "circulatingSupply") + MARKET_FIELDS
+
+
+def _float_or_none(value):
+    try:
+        return float(str(value).rstrip("%"))
+    except (TypeError, ValueError):
+        return None
+
+
+def market_fields(metrics, now=None):
+    """Return the joined market fields for one ``market.metrics`` row.
+
+    24h volume and price change count as zero once their window has expired,
+    as on the Hive-Engine frontend.
+    """
+    if not metrics:
+        return dict.fromkeys(MARKET_FIELDS)
+    now = time.time() if now is None else now
+    volume = _float_or_none(metrics.get("volume"))
+    if (_float_or_none(metrics.get("volumeExpiration")) or 0) < now:
+        volume = 0.0
+    change = _float_or_none(metrics.get("priceChangePercent"))
+    if (_float_or_none(metrics.get("lastDayPriceExpiration")) or 0) < now:
+        change = 0.0
+    return {
+        "lastPrice": _float_or_none(metrics.get("lastPrice")),
+        "volume": volume,
+        "priceChangePercent": change,
+    }
+
+
+def _grams(text):
+    grams = set()
+    for size in range(1, GRAM_SIZE + 1):
+        for i in range(len(text) - size + 1):
+            grams.add(text[i : i + size])
+    return grams
+
+
+class TokenIndex:
+    """Substring search over token symbols and names via an n-gram index.
+
+    Every substring of up to ``GRAM_SIZE`` characters maps to the positions
+    of the tokens containing it, so short queries are a single lookup and
+    longer ones intersect a few posting lists before a final substring check.
+    Each token carries its ``market.metrics`` fields, so listings can be
+    sorted by price or volume without per-token calls.
+    """
+
+    def __init__(self, tokens, metrics=None):
+        metrics = metrics or {}
+        now = time.time()
+        self.tokens = [
+            {**token, **market_fields(metrics.get(token.get("symbol")), now)}
+            for token in tokens
+        ]
+        self._orders = {}
+        self._symbols = []
+        self._names = []
+        postings = {}
+        for pos, token in enumerate(self.tokens):
+            symbol = str(token.get("symbol") or "").lower()
+            name = str(token.get("name") or "").lower()
+            self._symbols.append(symbol)
+            self._names.append(name)
+            for gram in _grams(symbol) | _grams(name):
+                postings.setdefault(gram, []).append(pos)
+        self._postings = postings
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def _matches(self, query):
+        if len(query) <= GRAM_SIZE:
+            return self._postings.get(query, [])
+        grams = sorted(
+            (query[i : i + GRAM_SIZE] for i in range(len(query) - GRAM_SIZE + 1)),
+            key=lambda g: len(self._postings.get(g, ())),
+        )
+        candidates = set(self._postings.get(grams[0], ()))
+        for gram in grams[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(self._postings.get(gram, ()))
+        return [
+            pos
+            for pos in sorted(candidates)
+            if query in self._symbols[pos] or query in self._names[pos]
+        ]
+
+    def order(self, sort, descending=False):
+        """Return token positions sorted by ``sort``; missing values go last."""
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"Unknown sort field: {sort}")
+        key = (sort, descending)
+        if key not in self._orders:
+            text = sort in ("symbol", "name")
+            present, missing = [], []
+            for pos, token in enumerate(self.tokens):
+                value = token.get(sort)
+                if text:
+                    value = str(value or "").lower()
+                elif not isinstance(value, (int, float)):
+                    missing.append(pos)
+                    continue
+                present.append((value, pos))
+            # Sorting on the value alone is stable, so ties keep list order.
+            present.sort(key=lambda item: item[0], reverse=descending)
+            self._orders[key] = [pos for _, pos in present] + missing
+        return self._orders[key]
+
+    def search(self, query, limit=None, ranked=False, sort=None, descending=False):
+        """Return tokens whose symbol or name contains ``query``.
+
+        Results keep the token list order unless sorted by a ``SORT_FIELDS``
+        entry or ``ranked``, which puts an exact symbol match first, then
+        symbol prefixes, then name prefixes.
+        """
+        query = query.lower()
+        if sort is not None:
+            positions = self.order(sort, descending)
+            if query:
+                matches = set(self._matches(query))
+                positions = [pos for pos in positions if pos in matches]
+            return [self.tokens[pos] for pos in positions[:limit]]
+        if not query:
+            return list(self.tokens[:limit])
+        positions = self._matches(query)
+        if ranked:
+
+            def score(pos):
+                symbol = self._symbols[pos]
+                if symbol == query:
+                    return 0, pos
+                if symbol.startswith(query):
+                    return 1, pos
+                if self._names[pos].startswith(query):
+                    return 2, pos
+                return 3, pos
+
+            positions = sorted(positions, key=score)
+        return [self.tokens[pos] for pos in positions[:limit]]
+
+
+_index = None
+_index_version = None
+_metrics = None
+_next_check = 0.0
+_index_lock = threading.Lock()
+
+
+def get_token_index():
+    """Return this process's token index, rebuilt when its sources refresh.
+
+    The shared token list and market metrics are re-read at most every
+    ``TOKEN_INDEX_CHECK_INTERVAL`` seconds; the index is only rebuilt when
+    either cache version has changed. If the metrics can't be fetched the
+    last ones seen are kept.
+    """
+    global _index, _index_version, _metrics, _next_check
+    now = time.monotonic()
+    if _index is not None and now < _next_check:
+        return _index
+    with _index_lock:
+        if _index is not None and now < _next_check:
+            return _index
+        tokens, tokens_version = get_tokens.versioned()
+        try:
+            _metrics = get_market_metrics.versioned()
+        except Exception as e:
+            logger.error(f"Error getting market metrics for token index: {e}")
+            if _metrics is None:
+                _metrics = ({}, None)
+        metrics, metrics_version = _metrics
+        version = (tokens_version, metrics_version)
+        if _index is None or None in version or version != _index_version:
+            _index = TokenIndex(tokens or [], metrics)
+            _index_version = version
+        interval = (
+            current_app.config.get("TOKEN_INDEX_CHECK_INTERVAL", 30)
+            if has_app_context()
+            else 30
+        )
+        _next_check = now + interval
+        return _index
@@ -1,23 +1,44 @@
 import json
 import logging
 
+from flask import current_app
 from requests.exceptions import RequestException
 
 from ..api.hive_engine import he_api
-from ..extensions import cache
+from ..utils.batching import BatchLoader
+from ..utils.caching import memoize
+from ..utils.concurrency import run_parallel
+from ..utils.metrics import record_page
 from ..utils.security import is_valid_image_url
+from .richlist import FIELDS, Richlist, to_float
 
 logger = logging.getLogger(__name__)
 
 
-@cache.memoize(timeout=3600)
+def _parse_metadata(token):
+    """Decode a token's ``metadata`` JSON in place and drop unsafe icon URLs."""
+    if isinstance(token.get("metadata"), str):
+        try:
+            token["metadata"] = json.loads(token["metadata"])
+            if token["metadata"] and "icon" in token["metadata"]:
+                if not is_valid_image_url(token["metadata"]["icon"]):
+                    token["metadata"]["icon"] = None
+        except json.JSONDecodeError:
+            pass
+
+
+@memoize(timeout=3600, hard_timeout=6 * 3600, local=True)
 def get_tokens():
-    """Get list of all tokens from Hive Engine with pagination."""
+    """Get list of all tokens from Hive Engine with pagination.
+
+    Metadata is parsed here, once per refresh, rather than on every render.
+    """
     tokens = []
     offset = 0
     limit = 1000
     while True:
         batch = he_api.find("tokens", "tokens", limit=limit, offset=offset)
+        record_page("tokens", batch)
         if not batch:
             break
         for t in batch:
@@ -33,6 +54,7 @@ def get_tokens():
                     t["supply"] = _to_float(t.get("supply"))
                 if "circulatingSupply" in t and t.get("circulatingSupply") is not None:
                     t["circulatingSupply"] = _to_float(t.get("circulatingSupply"))
+                _parse_metadata(t)
         tokens.extend(batch)
         if len(batch) < limit:
             break
@@ -40,114 +62,183 @@ def get_tokens():
     return tokens
 
 
-@cache.memoize(timeout=900)
+def _normalize_token_info(token_info):
+    _parse_metadata(token_info)
+
+    def _to_float(v):
+        try:
+            return float(v)
+        except Exception:
+            return 0.0
+
+    for k in [
+        "supply",
+        "circulatingSupply",
+        "stakingEnabled",
+        "unstakingCooldown",
+        "precision",
+    ]:
+        if k in token_info and token_info.get(k) is not None:
+            if k in ("supply", "circulatingSupply"):
+                token_info[k] = _to_float(token_info.get(k))
+    return token_info
+
+
+def _find_token_infos(symbols):
+    """Fetch ``tokens.tokens`` rows for ``symbols`` in one ``$in`` query."""
+    rows = he_api.find(
+        "tokens", "tokens", query={"symbol": {"$in": list(symbols)}}, limit=1000
+    )
+    return {
+        row["symbol"]: row
+        for row in rows or []
+        if isinstance(row, dict) and row.get("symbol")
+    }
+
+
+# Concurrent get_token_info misses (a page's fan-out, warmer workers) share
+# one upstream query.
+_token_info_loader = BatchLoader(_find_token_infos)
+
+
+@memoize(timeout=900, hard_timeout=3600, local=True)
 def get_token_info(token):
     """Get token information from Hive-Engine."""
     try:
-        token_info = he_api.find_one("tokens", "tokens", query={"symbol": token})
-        if isinstance(token_info, list) and token_info:
-            token_info = token_info[0]
-        if (
-            token_info
-            and "metadata" in token_info
-            and isinstance(token_info["metadata"], str)
-        ):
-            try:
-                token_info["metadata"] = json.loads(token_info["metadata"])
-                if token_info["metadata"] and "icon" in token_info["metadata"]:
-                    if not is_valid_image_url(token_info["metadata"]["icon"]):
-                        token_info["metadata"]["icon"] = None
-            except json.JSONDecodeError:
-                pass
+        token_info = _token_info_loader.load(token)
         if isinstance(token_info, dict):
-
-            def _to_float(v):
-                try:
-                    return float(v)
-                except Exception:
-                    return 0.0
-
-            for k in [
-                "supply",
-                "circulatingSupply",
-                "stakingEnabled",
-                "unstakingCooldown",
-                "precision",
-            ]:
-                if k in token_info and token_info.get(k) is not None:
-                    if k in ("supply", "circulatingSupply"):
-                        token_info[k] = _to_float(token_info.get(k))
+            _normalize_token_info(token_info)
         return token_info
     except Exception as e:
         logger.error(f"Error getting token info for {token}: {e}")
         return None
 
 
-@cache.memoize(timeout=900)
+def get_token_infos(symbols):
+    """Return ``{symbol: token_info}`` for many symbols at once.
+
+    Cached entries are read in one round trip and the misses fetched with
+    ``$in`` queries, which also fill the per-symbol ``get_token_info``
+    cache. Unknown symbols map to None.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    cached = get_token_info.peek_many([(symbol,) for symbol in symbols])
+    infos = dict(zip(symbols, cached, strict=True))
+    missing = [symbol for symbol, info in infos.items() if info is None]
+    for start in range(0, len(missing), _token_info_loader.max_batch):
+        chunk = missing[start : start + _token_info_loader.max_batch]
+        try:
+            found = _find_token_infos(chunk)
+        except Exception as e:
+            logger.error(f"Error getting token info for {len(chunk)} tokens: {e}")
+            continue
+        for symbol in chunk:
+            token_info = found.get(symbol)
+            if isinstance(token_info, dict):
+                infos[symbol] = _normalize_token_info(token_info)
+                get_token_info.prime(infos[symbol], symbol)
+    return infos
+
+
+RICHLIST_PAGE_SIZE = 1000
+# Hive account names start with a lowercase letter, so the first character
+# splits the keyspace into independent ranges.
+ACCOUNT_PARTITIONS = "bcdefghijklmnopqrstuvwxyz"
+
+
+def _richlist_query(symbol, lower=None, upper=None, inclusive=False):
+    query = {
+        "symbol": symbol,
+        "$or": [
+            {"balance": {"$gt": "0.00000000"}},
+            {"stake": {"$gt": "0.00000000"}},
+        ],
+    }
+    bounds = {}
+    if lower:
+        bounds["$gte" if inclusive else "$gt"] = lower
+    if upper:
+        bounds["$lt"] = upper
+    if bounds:
+        query["account"] = bounds
+    return query
+
+
+def _richlist_page(query):
+    rows = he_api.find(
+        "tokens",
+        "balances",
+        query=query,
+        limit=RICHLIST_PAGE_SIZE,
+        indexes=[{"index": "account", "descending": False}],
+    )
+    record_page("richlist", rows)
+    return rows
+
+
+def _scan_range(symbol, lower, upper, inclusive):
+    """Keyset-paginate balances with ``lower <(=) account < upper``."""
+    rows = []
+    while True:
+        batch = _richlist_page(_richlist_query(symbol, lower, upper, inclusive))
+        if not batch:
+            break
+        rows.extend(batch)
+        if len(batch) < RICHLIST_PAGE_SIZE:
+            break
+        lower = batch[-1].get("account", "")
+        inclusive = False
+    return rows
+
+
+def _scan_balances(symbol):
+    """Return every balance row for ``symbol`` in account order.
+
+    Small tokens fit in the first page. For larger ones the remaining
+    accounts are split by leading character and the ranges scanned
+    concurrently (up to ``RICHLIST_SCAN_CONCURRENCY``); the pooled API
+    spreads those calls over the healthy nodes.
+    """
+    first = _richlist_page(_richlist_query(symbol))
+    if len(first) < RICHLIST_PAGE_SIZE:
+        return first
+    last = first[-1].get("account", "")
+    bounds = [c for c in ACCOUNT_PARTITIONS if c > last]
+    ranges = [(last, bounds[0] if bounds else None, False)]
+    ranges += [
+        (lower, upper, True) for lower, upper in zip(bounds, bounds[1:] + [None])
+    ]
+    concurrency = current_app.config.get("RICHLIST_SCAN_CONCURRENCY", 4)
+    parts = run_parallel(lambda r: _scan_range(symbol, *r), ranges, concurrency)
+    return first + [row for part in parts for row in part]
+
+
+@memoize(timeout=900, hard_timeout=3600, local=True)
 def get_richlist(symbol):
-    """Return the token rich list and total burned balance for a given symbol."""
-    richlist = []
+    """Return the token rich list and total burned balance for a given symbol.
+
+    The rich list is a :class:`~viewr.services.richlist.Richlist`, sorted by
+    total holdings.
+    """
+    accounts = []
+    values = {field: [] for field in FIELDS}
     burned_balance = 0.0
-    page_size = 1000
     seen_accounts = set()
-    last_username = ""
     try:
-        while True:
-            query = {
-                "symbol": symbol,
-                "$or": [
-                    {"balance": {"$gt": "0.00000000"}},
-                    {"stake": {"$gt": "0.00000000"}},
-                ],
-            }
-            if last_username:
-                query["account"] = {"$gt": last_username}
-            batch = he_api.find(
-                "tokens",
-                "balances",
-                query=query,
-                limit=page_size,
-                indexes=[{"index": "account", "descending": False}],
-            )
-            if not batch:
-                break
-            for holder in batch:
-                acct = holder.get("account")
-                if acct == "null":
-                    try:
-                        burned_balance = float(holder.get("balance", 0))
-                    except Exception:
-                        burned_balance = 0.0
-                    continue
-                if acct and acct not in seen_accounts:
-
-                    def _to_float(v):
-                        try:
-                            return float(v if v is not None else 0)
-                        except Exception:
-                            return 0.0
-
-                    for num_key in (
-                        "balance",
-                        "stake",
-                        "pendingUnstake",
-                        "delegationsIn",
-                        "delegationsOut",
-                        "pendingUndelegations",
-                    ):
-                        if num_key in holder:
-                            holder[num_key] = _to_float(holder.get(num_key))
-                    holder["total"] = float(holder.get("balance", 0.0)) + float(
-                        holder.get("stake", 0.0)
-                    )
-                    richlist.append(holder)
-                    seen_accounts.add(acct)
-            if batch:
-                last_username = batch[-1].get("account", "")
-            if len(batch) < page_size:
-                break
-        richlist.sort(key=lambda h: h.get("total", 0), reverse=True)
-        return richlist, burned_balance
+        for holder in _scan_balances(symbol):
+            acct = holder.get("account")
+            if acct == "null":
+                try:
+                    burned_balance = float(holder.get("balance", 0))
+                except Exception:
+                    burned_balance = 0.0
+                continue
+            if acct and acct not in seen_accounts:
+                accounts.append(acct)
+                for field in FIELDS:
+                    values[field].append(to_float(holder.get(field)))
+                seen_accounts.add(acct)
+        return Richlist.from_rows(accounts, values), burned_balance
     except RequestException as e:
         logger.error(f"Richlist RPC failed for symbol {symbol}: {e}")
         raise RuntimeError("Hive-Engine RPC timeout")
@@ -0,0 +1,63 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from .deadline import DeadlineExceeded, bounded
+
+logger = logging.getLogger(__name__)
+
+
+class BatchLoader:
+    """Coalesce concurrent single-key loads into batched fetches.
+
+    The first caller of :meth:`load` waits ``window`` seconds while other
+    callers add their keys, then calls ``fetch_many(keys)`` (at most
+    ``max_batch`` keys at a time) and hands every waiter its result.
+    ``fetch_many`` returns ``{key: value}``; missing keys load as None. If it
+    raises, every caller in that batch gets the exception. Callers wait for
+    their batch no longer than their upstream budget allows and then raise
+    :class:`~viewr.utils.deadline.DeadlineExceeded`; the batch still
+    completes for the others.
+    """
+
+    def __init__(self, fetch_many, window=0.005, max_batch=100):
+        self.fetch_many = fetch_many
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = {}
+        self._scheduled = False
+        self._lock = threading.Lock()
+
+    def load(self, key):
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = self._pending[key] = Future()
+            leader = not self._scheduled
+            self._scheduled = True
+        if leader:
+            time.sleep(self.window)
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._scheduled = False
+            self._dispatch(batch)
+        try:
+            return future.result(timeout=bounded(None))
+        except FutureTimeout:
+            raise DeadlineExceeded("Upstream deadline exceeded") from None
+
+    def _dispatch(self, batch):
+        keys = list(batch)
+        for start in range(0, len(keys), self.max_batch):
+            chunk = keys[start : start + self.max_batch]
+            try:
+                results = self.fetch_many(chunk)
+            except Exception as e:
+                logger.error(f"Batch load of {len(chunk)} keys failed: {e}")
+                for key in chunk:
+                    batch[key].set_exception(e)
+                continue
+            for key in chunk:
+                batch[key].set_result(results.get(key))
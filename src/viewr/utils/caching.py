@@ -0,0 +1,388 @@
+import functools
+import hashlib
+import inspect
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+
+from ..extensions import cache, get_redis
+from .concurrency import submit
+from .deadline import remaining, scope
+from .metrics import CACHE_EVENTS
+from .profiling import timed, timing_scope
+
+logger = logging.getLogger(__name__)
+
+
+class _LocalLock:
+    """Per-key, non-blocking in-process lock used when there is no Redis."""
+
+    _inflight = set()
+    _guard = threading.Lock()
+
+    def __init__(self, key):
+        self.key = key
+
+    def acquire(self):
+        with self._guard:
+            if self.key in self._inflight:
+                return False
+            self._inflight.add(self.key)
+            return True
+
+    def release(self):
+        with self._guard:
+            self._inflight.discard(self.key)
+
+
+class _RedisLock:
+    def __init__(self, client, key, timeout):
+        # Not thread-local: a background refresh releases the lock from a
+        # different thread than the one that took it.
+        self._lock = client.lock(key, timeout=timeout, thread_local=False)
+
+    def acquire(self):
+        return self._lock.acquire(blocking=False)
+
+    def release(self):
+        try:
+            self._lock.release()
+        except Exception as e:
+            # The lock timed out while we were computing; someone else may
+            # already hold it.
+            logger.warning(f"Releasing cache lock failed: {e}")
+
+
+class _NullLock:
+    def release(self):
+        pass
+
+
+def _try_lock(key, timeout):
+    try:
+        client = get_redis()
+    except Exception as e:
+        logger.warning(f"Redis unavailable for cache lock: {e}")
+        client = None
+    lock = (
+        _RedisLock(client, f"lock:{key}", timeout)
+        if client is not None
+        else _LocalLock(key)
+    )
+    try:
+        return lock if lock.acquire() else None
+    except Exception as e:
+        logger.warning(f"Acquiring cache lock for {key} failed: {e}")
+        return _NullLock()
+
+
+def _cache_get(key):
+    try:
+        return cache.get(key)
+    except Exception:
+        logger.exception("Exception possibly due to cache backend.")
+        return None
+
+
+def _cache_set(key, value, timeout):
+    try:
+        cache.set(key, value, timeout=timeout)
+    except Exception:
+        logger.exception("Exception possibly due to cache backend.")
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+_COUNTERS = (
+    "hits",
+    "stale_hits",
+    "misses",
+    "refreshes",
+    "refresh_errors",
+    "local_hits",
+    "remote_reads",
+)
+
+
+def _config(name, default):
+    return current_app.config.get(name, default) if has_app_context() else default
+
+
+def _count(name, counter):
+    with _stats_lock:
+        stats = _stats.get(name)
+        if stats is None:
+            stats = _stats[name] = dict.fromkeys(_COUNTERS, 0)
+        stats[counter] += 1
+    CACHE_EVENTS.inc(function=name, event=counter)
+
+
+def cache_stats():
+    """Return this process's per-function cache counters and hit ratios."""
+    with _stats_lock:
+        snapshot = {name: dict(stats) for name, stats in _stats.items()}
+    for stats in snapshot.values():
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_ratio"] = (
+            round((stats["hits"] + stats["stale_hits"]) / lookups, 4)
+            if lookups
+            else None
+        )
+        # Share of lookups answered from this process without reading the
+        # full entry from the shared cache.
+        stats["local_hit_ratio"] = (
+            round(stats["local_hits"] / lookups, 4) if lookups else None
+        )
+    return snapshot
+
+
+class _LocalTier:
+    """Per-process LRU of memoized entries, bounded by their pickled size.
+
+    Entries are ``(value, fresh_until)`` tuples exactly as stored in the
+    shared cache, and ``fresh_until`` doubles as their version: every write
+    also stores it under ``<key>:v``. A local entry is trusted for
+    ``MEMO_LOCAL_CHECK_INTERVAL`` seconds, then revalidated by reading only
+    that small version key, so a refresh or invalidation in any worker
+    reaches the others within the interval without re-reading large values.
+    """
+
+    def __init__(self):
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, name):
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+        if item is not None:
+            entry, size, checked = item
+            if now - checked < _config("MEMO_LOCAL_CHECK_INTERVAL", 5):
+                _count(name, "local_hits")
+                return entry
+            if _cache_get(f"{key}:v") == entry[1]:
+                with self._lock:
+                    if self._items.get(key) is item:
+                        self._items[key] = (entry, size, now)
+                _count(name, "local_hits")
+                return entry
+        _count(name, "remote_reads")
+        entry = _cache_get(key)
+        if entry is None:
+            self.discard(key)
+        else:
+            self.put(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        try:
+            with timed("cache"):
+                size = len(pickle.dumps(entry, pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            return
+        max_bytes = _config("MEMO_LOCAL_MAX_BYTES", 64 * 1024 * 1024)
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            # Anything over a quarter of the budget would just churn it.
+            if size > max_bytes // 4:
+                return
+            self._items[key] = (entry, size, time.monotonic())
+            self._bytes += size
+            while self._bytes > max_bytes and self._items:
+                _, (_, evicted, _) = self._items.popitem(last=False)
+                self._bytes -= evicted
+
+    def discard(self, key):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self._bytes}
+
+
+_local_tier = _LocalTier()
+
+
+def local_cache_stats():
+    """Return this process's local tier size."""
+    return _local_tier.stats()
+
+
+def memoize(timeout, hard_timeout=None, lock_timeout=120, wait_timeout=30, local=False):
+    """Cache a function's result with stale-while-revalidate semantics.
+
+    ``timeout`` is the soft TTL and ``hard_timeout`` (default ``2 * timeout``)
+    the hard TTL. Within the soft TTL the cached value is returned as is.
+    Between the two, callers get the cached value immediately and one of
+    them, the one that wins a per-key lock (Redis when available, else an
+    in-process lock), refreshes it on the background executor. After the
+    hard TTL the entry is gone: the lock winner computes the value inline and
+    everyone else waits up to ``wait_timeout`` seconds (less if the
+    request's upstream budget ends first) for it to be published, so only
+    one process ever recomputes a key. Neither the winner's compute nor
+    background refreshes are held to the request's budget; the compute gets
+    ``MEMO_BUILD_BUDGET`` seconds instead. ``None`` results are not cached, matching
+    ``cache.memoize``.
+
+    Hits, stale hits, misses and refreshes are counted per function; see
+    :func:`cache_stats`. The wrapped function's ``versioned`` attribute
+    returns the value together with a version that changes on every
+    recompute.
+
+    With ``local=True`` entries are also kept in a per-process LRU in front
+    of the shared cache (see :class:`_LocalTier`), so hot keys aren't
+    fetched and unpickled on every call. Those values are shared between
+    callers in the process and must not be mutated.
+    """
+    if hard_timeout is None:
+        hard_timeout = timeout * 2
+
+    def decorator(func):
+        signature = inspect.signature(func)
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        def cache_key(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            digest = hashlib.md5(
+                repr(tuple(bound.arguments.items())).encode("utf-8")
+            ).hexdigest()
+            return f"memo:{name}:{digest}"
+
+        def publish(key, value):
+            entry = (value, time.time() + timeout)
+            _cache_set(key, entry, hard_timeout)
+            if local:
+                _cache_set(f"{key}:v", entry[1], hard_timeout)
+                _local_tier.put(key, entry)
+            return entry
+
+        def lookup(key):
+            return _local_tier.get(key, name) if local else _cache_get(key)
+
+        def compute(key, args, kwargs):
+            value = func(*args, **kwargs)
+            if value is None:
+                return None, None
+            return publish(key, value)
+
+        def locked_compute(key, lock, args, kwargs):
+            try:
+                return compute(key, args, kwargs)
+            finally:
+                lock.release()
+
+        def build(key, lock, args, kwargs):
+            # Only callers waiting on someone else's build are held to the
+            # request's budget. The build gets MEMO_BUILD_BUDGET of its own,
+            # so a value that takes longer than one request still gets cached.
+            with scope(time.monotonic() + _config("MEMO_BUILD_BUDGET", 60)):
+                return locked_compute(key, lock, args, kwargs)
+
+        def refresh(key, lock, args, kwargs):
+            try:
+                # The refresh outlives the request; don't hold it to its budget
+                # or count it in its timings.
+                with scope(None), timing_scope(None):
+                    locked_compute(key, lock, args, kwargs)
+            except Exception as e:
+                _count(name, "refresh_errors")
+                logger.error(f"Background refresh of {name} failed: {e}")
+
+        def versioned(*args, **kwargs):
+            """Return ``(value, version)``.
+
+            ``version`` changes whenever the cached value is recomputed, so
+            callers can rebuild anything derived from it only when needed. It
+            is None when the value was not cached.
+            """
+            if not has_app_context():
+                return func(*args, **kwargs), None
+            key = cache_key(*args, **kwargs)
+            entry = lookup(key)
+            if entry is not None:
+                if entry[1] > time.time():
+                    _count(name, "hits")
+                    return entry
+                _count(name, "stale_hits")
+                lock = _try_lock(key, lock_timeout)
+                if lock is not None:
+                    _count(name, "refreshes")
+                    submit(refresh, key, lock, args, kwargs)
+                return entry
+
+            _count(name, "misses")
+            lock = _try_lock(key, lock_timeout)
+            if lock is not None:
+                return build(key, lock, args, kwargs)
+
+            left = remaining()
+            wait = wait_timeout if left is None else max(min(wait_timeout, left), 0)
+            deadline = time.monotonic() + wait
+            delay = 0.05
+            while time.monotonic() < deadline:
+                time.sleep(delay)
+                delay = min(delay * 2, 0.5)
+                entry = _cache_get(key)
+                if entry is not None:
+                    return entry
+                # The winner finished without publishing (e.g. an error
+                # result); take over rather than waiting out the timeout.
+                lock = _try_lock(key, lock_timeout)
+                if lock is not None:
+                    return build(key, lock, args, kwargs)
+            logger.warning(f"Timed out waiting for {name}; computing it directly")
+            return func(*args, **kwargs), None
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return versioned(*args, **kwargs)[0]
+
+        def prime(value, *args, **kwargs):
+            """Store ``value`` as the fresh result for these arguments."""
+            if value is not None:
+                publish(cache_key(*args, **kwargs), value)
+
+        def peek_many(calls):
+            """Return the cached value (or None) for each argument tuple.
+
+            Reads all keys in one round trip and never computes or refreshes.
+            """
+            keys = [cache_key(*args) for args in calls]
+            try:
+                entries = cache.get_many(*keys) if keys else []
+            except Exception:
+                logger.exception("Exception possibly due to cache backend.")
+                entries = [None] * len(keys)
+            return [entry[0] if entry is not None else None for entry in entries]
+
+        def invalidate(*args, **kwargs):
+            """Drop the cached value for these arguments, in every worker."""
+            key = cache_key(*args, **kwargs)
+            _local_tier.discard(key)
+            try:
+                cache.delete_many(key, f"{key}:v")
+            except Exception:
+                logger.exception("Exception possibly due to cache backend.")
+
+        wrapper.uncached = func
+        wrapper.versioned = versioned
+        wrapper.prime = prime
+        wrapper.peek_many = peek_many
+        wrapper.cache_key = cache_key
+        wrapper.invalidate = invalidate
+        return wrapper
+
+    return decorator
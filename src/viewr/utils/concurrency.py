@@ -0,0 +1,178 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+
+from flask import current_app, g, has_app_context, has_request_context
+
+from .deadline import get_deadline, scope
+from .profiling import get_timings, timing_scope
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_executor():
+    """Return the shared, bounded executor used for upstream fan-out.
+
+    Under gunicorn's gevent worker ``threading`` is monkey-patched, so the
+    workers are greenlets rather than OS threads.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                max_workers = (
+                    current_app.config.get("FANOUT_MAX_WORKERS", 16)
+                    if has_app_context()
+                    else 16
+                )
+                _executor = ThreadPoolExecutor(
+                    max_workers=max_workers, thread_name_prefix="fanout"
+                )
+    return _executor
+
+
+def _carried():
+    """Request-scoped state that follows work onto worker threads."""
+    return get_deadline(), get_timings()
+
+
+def _run_in_worker(app, carried, func, args, kwargs):
+    _local.in_worker = True
+    deadline, timings = carried
+    try:
+        with scope(deadline), timing_scope(timings):
+            if app is None:
+                return func(*args, **kwargs)
+            with app.app_context():
+                return func(*args, **kwargs)
+    finally:
+        _local.in_worker = False
+
+
+def submit(func, *args, **kwargs):
+    """Run ``func`` on the shared executor inside the current app context.
+
+    The caller's upstream deadline (see :mod:`.deadline`) and request
+    timings (see :mod:`.profiling`) carry over.
+    """
+    app = current_app._get_current_object() if has_app_context() else None
+    return get_executor().submit(_run_in_worker, app, _carried(), func, args, kwargs)
+
+
+def run_parallel(func, items, max_workers):
+    """Return ``[func(item) for item in items]``, at most ``max_workers`` at once.
+
+    Uses a short-lived executor of its own rather than the shared pool, so it
+    is safe to call from inside a fan-out worker. The first exception raised
+    by ``func`` propagates.
+    """
+    items = list(items)
+    if max_workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    app = current_app._get_current_object() if has_app_context() else None
+    carried = _carried()
+    with ThreadPoolExecutor(
+        max_workers=min(max_workers, len(items)), thread_name_prefix="parallel"
+    ) as executor:
+        futures = [
+            executor.submit(_run_in_worker, app, carried, func, (item,), {})
+            for item in items
+        ]
+        try:
+            return [future.result() for future in futures]
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+
+
+class Fetch:
+    """One independent upstream call for :func:`gather`."""
+
+    __slots__ = ("args", "fallback", "func", "kwargs", "timeout")
+
+    def __init__(self, func, *args, fallback=None, timeout=None, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.fallback = fallback
+        self.timeout = timeout
+
+
+class Gathered(dict):
+    """``{name: result}`` from :func:`gather`; ``partial`` if any fell back."""
+
+    partial = False
+
+
+def gather(fetches, timeout=None):
+    """Run ``{name: Fetch}`` concurrently and return ``{name: result}``.
+
+    Each fetch has its own deadline (``Fetch.timeout``, else ``timeout``,
+    else ``FANOUT_TIMEOUT``), cut short by the request's upstream budget if
+    that ends first. A fetch that raises or misses its deadline
+    yields its fallback and sets ``partial`` on the returned
+    :class:`Gathered`. Called on a request's own thread, the request is
+    flagged as partial too, so :func:`response_complete` can keep it out of
+    the page cache; worker threads have no request, so code calling
+    ``gather`` there must pass ``partial`` on itself. Fetches that
+    time out keep running in the background, still under the request's
+    budget. A memoized value they were computing on a miss is the exception:
+    that compute has a budget of its own (see :func:`.caching.memoize`), so
+    it still lands in the cache for the next request.
+
+    Called from inside a fan-out worker, the fetches run inline to avoid
+    exhausting the bounded pool with nested waits.
+    """
+    if timeout is None:
+        timeout = (
+            current_app.config.get("FANOUT_TIMEOUT", 10) if has_app_context() else 10
+        )
+    results = Gathered()
+    if getattr(_local, "in_worker", False):
+        for name, fetch in fetches.items():
+            try:
+                results[name] = fetch.func(*fetch.args, **fetch.kwargs)
+            except Exception as e:
+                logger.error(f"Fetch {name} failed: {e}")
+                results[name] = _fallback(fetch, results)
+        return results
+
+    start = time.monotonic()
+    budget_end = get_deadline()
+    futures = {
+        name: submit(fetch.func, *fetch.args, **fetch.kwargs)
+        for name, fetch in fetches.items()
+    }
+    for name, future in futures.items():
+        fetch = fetches[name]
+        deadline = start + (fetch.timeout if fetch.timeout is not None else timeout)
+        if budget_end is not None:
+            deadline = min(deadline, budget_end)
+        try:
+            results[name] = future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FuturesTimeoutError:
+            logger.warning(f"Fetch {name} missed its deadline; using fallback")
+            results[name] = _fallback(fetch, results)
+        except Exception as e:
+            logger.error(f"Fetch {name} failed: {e}")
+            results[name] = _fallback(fetch, results)
+    if results.partial and has_request_context():
+        g.fanout_partial = True
+    return results
+
+
+def _fallback(fetch, results):
+    results.partial = True
+    return fetch.fallback() if callable(fetch.fallback) else fetch.fallback
+
+
+def response_complete(response):
+    """``response_filter`` for ``cache.cached``: skip pages built from fallbacks."""
+    return not g.get("fanout_partial", False)
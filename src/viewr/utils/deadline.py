@@ -0,0 +1,72 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import current_app
+
+# Absolute time.monotonic() by which upstream calls must be done, or None.
+_deadline = ContextVar("upstream_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The current upstream time budget has run out."""
+
+
+def get_deadline():
+    """Return the current deadline (``time.monotonic()``), or None if unbounded."""
+    return _deadline.get()
+
+
+def remaining():
+    """Return the seconds left in the current budget, or None if unbounded."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def bounded(timeout):
+    """Return ``timeout`` capped at what is left of the current budget.
+
+    Raises :class:`DeadlineExceeded` once the budget is spent.
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("Upstream deadline exceeded")
+    return left if timeout is None else min(timeout, left)
+
+
+@contextmanager
+def scope(deadline):
+    """Run the block under an absolute ``deadline``; None lifts any budget.
+
+    Used to carry a request's deadline into worker threads, and to free
+    background work that outlives the request from it.
+    """
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def budget(seconds):
+    """Bound upstream calls in the block to ``seconds``, within any outer budget."""
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    with scope(deadline if outer is None else min(deadline, outer)):
+        yield
+
+
+def register_request_budget(app):
+    """Give every request ``HE_REQUEST_BUDGET`` seconds of upstream time."""
+
+    @app.before_request
+    def start_budget():
+        seconds = current_app.config.get("HE_REQUEST_BUDGET")
+        _deadline.set(time.monotonic() + seconds if seconds else None)
+
+    @app.teardown_request
+    def end_budget(exc):
+        _deadline.set(None)
@@ -1,8 +1,11 @@
 import logging
 
-from flask import render_template
+from flask import current_app, jsonify, render_template, request
 from werkzeug.exceptions import HTTPException
 
+from ..api.hive_engine import CircuitOpenError
+from .deadline import DeadlineExceeded
+
 logger = logging.getLogger(__name__)
 
 
@@ -22,6 +25,24 @@ def register_error_handlers(app):
         if isinstance(e, HTTPException):
             return e
 
+        if isinstance(e, (CircuitOpenError, DeadlineExceeded)):
+            # Hive-Engine is unavailable and nothing cached could stand in.
+            logger.warning(f"Upstream unavailable for {request.path}: {e}")
+            cooldown = current_app.config.get("HE_BREAKER_COOLDOWN", 30)
+            headers = {"Retry-After": str(int(cooldown))}
+            if request.path.startswith("/api/"):
+                return jsonify({"error": "Hive-Engine unavailable"}), 503, headers
+            return (
+                render_template(
+                    "error_generic.html",
+                    code="503 - Service Unavailable",
+                    message="Hive-Engine is not responding right now. "
+                    "Please try again shortly.",
+                ),
+                503,
+                headers,
+            )
+
         logger.error(f"Unhandled exception: {str(e)}")
         return (
             render_template(
@@ -0,0 +1,319 @@
+import atexit
+import logging
+import os
+import threading
+import time
+
+from flask import Response, current_app, g, request
+
+from ..extensions import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Shared Redis hash every worker adds its counts to. Fields are
+# "name|suffix|labels"; histogram buckets are stored per bucket and summed
+# into Prometheus' cumulative buckets when rendered.
+METRICS_KEY = "viewr:metrics"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Registry:
+    """Metric definitions plus this process's not-yet-published samples.
+
+    Counters and histograms accumulate locally and are added to the shared
+    Redis hash by :meth:`flush`, so every gunicorn worker's counts add up;
+    gauges are last-write-wins. Without Redis the totals stay in-process.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self._pending = {}
+        self._gauges = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._flusher_pid = None
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def add(self, field, value):
+        with self._lock:
+            self._pending[field] = self._pending.get(field, 0.0) + value
+
+    def set(self, field, value):
+        with self._lock:
+            self._gauges[field] = value
+
+    def flush(self):
+        """Publish pending samples; returns False if they had to be dropped."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            gauges, self._gauges = self._gauges, {}
+            self._last_flush = time.monotonic()
+        if not pending and not gauges:
+            return True
+        try:
+            client = get_redis()
+        except Exception as e:
+            logger.warning(f"Redis unavailable for metrics: {e}")
+            client = None
+        if client is None:
+            with self._lock:
+                for field, value in pending.items():
+                    self._totals[field] = self._totals.get(field, 0.0) + value
+                self._totals.update(gauges)
+            return True
+        try:
+            pipe = client.pipeline(transaction=False)
+            for field, value in pending.items():
+                pipe.hincrbyfloat(METRICS_KEY, field, value)
+            if gauges:
+                pipe.hset(METRICS_KEY, mapping=gauges)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to publish metrics: {e}")
+            return False
+        return True
+
+    def maybe_flush(self):
+        interval = current_app.config.get("METRICS_FLUSH_INTERVAL", 5)
+        if time.monotonic() - self._last_flush >= interval:
+            self.flush()
+
+    def start_flusher(self, app):
+        """Flush every ``METRICS_FLUSH_INTERVAL`` from a daemon thread.
+
+        Request teardown only flushes while traffic keeps coming, so this
+        publishes what idle workers and background work (cache refreshes,
+        the warmer) recorded. Started once per process, after any fork.
+        """
+        pid = os.getpid()
+        with self._lock:
+            if self._flusher_pid == pid:
+                return
+            self._flusher_pid = pid
+        threading.Thread(
+            target=self._flush_loop, args=(app,), name="metrics-flush", daemon=True
+        ).start()
+
+    def _flush_loop(self, app):
+        while True:
+            time.sleep(app.config.get("METRICS_FLUSH_INTERVAL", 5))
+            try:
+                with app.app_context():
+                    self.maybe_flush()
+            except Exception as e:
+                logger.warning(f"Periodic metrics flush failed: {e}")
+
+    def _samples(self):
+        client = get_redis()
+        if client is None:
+            with self._lock:
+                return dict(self._totals)
+        return {
+            field.decode(): float(value)
+            for field, value in client.hgetall(METRICS_KEY).items()
+        }
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        self.flush()
+        families = {}
+        for field, value in self._samples().items():
+            try:
+                name, suffix, labels = field.split("|", 2)
+            except ValueError:
+                continue
+            families.setdefault(name, {}).setdefault(labels, {})[suffix] = value
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for labels, samples in sorted(families.get(name, {}).items()):
+                lines.extend(metric.render(labels, samples))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry
+        registry.register(self)
+
+    def _labels(self, labels):
+        return ",".join(f'{k}="{_escape(labels.get(k, ""))}"' for k in self.labelnames)
+
+    def _field(self, suffix, labels):
+        return f"{self.name}|{suffix}|{self._labels(labels)}"
+
+    @staticmethod
+    def _line(name, labels, value):
+        return (
+            f"{name}{{{labels}}} {_fmt(value)}" if labels else f"{name} {_fmt(value)}"
+        )
+
+    def render(self, labels, samples):
+        return [self._line(self.name, labels, samples.get("", 0))]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, value=1, **labels):
+        self.registry.add(self._field("", labels), value)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        self.registry.set(self._field("", labels), value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, **kwargs
+    ):
+        super().__init__(name, documentation, labelnames, **kwargs)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        bucket = next((b for b in self.buckets if value <= b), "+Inf")
+        self.registry.add(self._field(f"bucket:{bucket}", labels), 1)
+        self.registry.add(self._field("sum", labels), value)
+        self.registry.add(self._field("count", labels), 1)
+
+    def render(self, labels, samples):
+        sep = "," if labels else ""
+        lines = []
+        total = 0.0
+        for bucket in self.buckets:
+            total += samples.get(f"bucket:{bucket}", 0)
+            lines.append(
+                self._line(f"{self.name}_bucket", f'{labels}{sep}le="{bucket}"', total)
+            )
+        count = samples.get("count", 0)
+        lines.append(
+            self._line(f"{self.name}_bucket", f'{labels}{sep}le="+Inf"', count)
+        )
+        lines.append(self._line(f"{self.name}_sum", labels, samples.get("sum", 0)))
+        lines.append(self._line(f"{self.name}_count", labels, count))
+        return lines
+
+
+HTTP_LATENCY = Histogram(
+    "viewr_http_request_duration_seconds",
+    "Time to build a response, by route.",
+    ("endpoint", "method", "status"),
+)
+RPC_LATENCY = Histogram(
+    "viewr_rpc_duration_seconds",
+    "Hive-Engine RPC attempt latency, by method, table and node.",
+    ("method", "table", "node"),
+)
+RPC_ERRORS = Counter(
+    "viewr_rpc_errors_total",
+    "Failed Hive-Engine RPC attempts, by method, table and node.",
+    ("method", "table", "node"),
+)
+RPC_REJECTED = Counter(
+    "viewr_rpc_rejected_total",
+    "Hive-Engine calls refused before reaching a node (circuit_open or deadline).",
+    ("reason",),
+)
+CACHE_EVENTS = Counter(
+    "viewr_cache_events_total",
+    "Memoized function lookups and refreshes, by function and event.",
+    ("function", "event"),
+)
+CACHE_WRITTEN_BYTES = Counter(
+    "viewr_cache_written_bytes_total",
+    "Encoded bytes written to Redis, by key family.",
+    ("family",),
+)
+CACHE_ENTRY_BYTES = Gauge(
+    "viewr_cache_entry_bytes",
+    "Encoded size of the last value written to Redis, by key family.",
+    ("family",),
+)
+SCAN_PAGES = Counter(
+    "viewr_scan_pages_total",
+    "Pages fetched by paginated upstream scans.",
+    ("scan",),
+)
+SCAN_ROWS = Counter(
+    "viewr_scan_rows_total",
+    "Rows fetched by paginated upstream scans.",
+    ("scan",),
+)
+
+
+def record_page(scan, rows):
+    """Count one page of ``rows`` fetched by the paginated ``scan``."""
+    SCAN_PAGES.inc(scan=scan)
+    SCAN_ROWS.inc(len(rows or ()), scan=scan)
+
+
+def metrics_response():
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+
+def register_metrics(app):
+    """Time every request and publish this worker's samples periodically."""
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+        if REGISTRY._flusher_pid != os.getpid():
+            REGISTRY.start_flusher(app)
+
+    @app.after_request
+    def observe_request(response):
+        start = g.pop("metrics_start", None)
+        if start is not None:
+            HTTP_LATENCY.observe(
+                time.perf_counter() - start,
+                endpoint=request.endpoint or "unmatched",
+                method=request.method,
+                status=response.status_code,
+            )
+        return response
+
+    @app.teardown_request
+    def flush_metrics(exc):
+        REGISTRY.maybe_flush()
+
+    global _exit_app
+    _exit_app = app
+
+
+# App whose context the exit flush runs in: the last one registered.
+_exit_app = None
+
+
+def _flush_at_exit():
+    if _exit_app is not None:
+        with _exit_app.app_context():
+            REGISTRY.flush()
+
+
+# Registered once per process, however many apps register_metrics sees.
+atexit.register(_flush_at_exit)
@@ -0,0 +1,275 @@
+import cProfile
+import hmac
+import io
+import json
+import logging
+import marshal
+import pstats
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import before_render_template, current_app, g, request, template_rendered
+
+from ..extensions import cache, get_redis
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ("rpc", "cache", "pandas", "template")
+PROFILE_INDEX_KEY = "profile:index"
+PROFILE_INDEX_SIZE = 50
+SLOW_LOG_KEY = "viewr:slow_requests"
+SLOW_LOG_SIZE = 100
+
+_timings = ContextVar("request_timings", default=None)
+# cProfile can only run one profiler at a time, so a worker profiles at
+# most one request at once; others are skipped rather than queued.
+_profile_lock = threading.Lock()
+_slow_log = deque(maxlen=SLOW_LOG_SIZE)
+
+
+class Timings:
+    """Time spent per category during one request, across its worker threads.
+
+    Fan-out work runs in parallel, so the totals can add up to more than the
+    request's wall time.
+    """
+
+    def __init__(self):
+        self.seconds = dict.fromkeys(CATEGORIES, 0.0)
+        self.calls = dict.fromkeys(CATEGORIES, 0)
+        self._lock = threading.Lock()
+
+    def add(self, category, seconds):
+        with self._lock:
+            self.seconds[category] += seconds
+            self.calls[category] += 1
+
+    def summary(self, total):
+        with self._lock:
+            split = {
+                name: {
+                    "seconds": round(self.seconds[name], 4),
+                    "calls": self.calls[name],
+                }
+                for name in CATEGORIES
+            }
+            other = total - sum(self.seconds.values())
+        split["other"] = {"seconds": round(max(other, 0.0), 4)}
+        return split
+
+
+def get_timings():
+    return _timings.get()
+
+
+@contextmanager
+def timing_scope(timings):
+    """Attribute timed work in the block to ``timings`` (None: to nothing)."""
+    token = _timings.set(timings)
+    try:
+        yield
+    finally:
+        _timings.reset(token)
+
+
+def record(category, seconds):
+    """Add ``seconds`` of ``category`` work to the current request, if any."""
+    timings = _timings.get()
+    if timings is not None:
+        timings.add(category, seconds)
+
+
+@contextmanager
+def timed(category):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(category, time.perf_counter() - start)
+
+
+def check_token(value):
+    """Return whether ``value`` is the configured ``PROFILE_TOKEN``."""
+    token = current_app.config.get("PROFILE_TOKEN")
+    return bool(token) and hmac.compare_digest(value or "", token)
+
+
+def _wants_profile():
+    if request.endpoint in (None, "static"):
+        return False
+    if check_token(request.headers.get("X-Profile")):
+        return True
+    rate = current_app.config.get("PROFILE_SAMPLE_RATE", 0)
+    return rate > 0 and random.random() < rate
+
+
+class _LoadedStats:
+    """Stand-in profiler so ``pstats.Stats`` can read stored stats."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def _save_profile(profiler, response, seconds, split):
+    profiler.create_stats()
+    meta = {
+        "id": uuid.uuid4().hex[:16],
+        "method": request.method,
+        "path": request.full_path.rstrip("?"),
+        "endpoint": request.endpoint,
+        "status": response.status_code,
+        "seconds": round(seconds, 4),
+        "timings": split,
+        "created": time.time(),
+    }
+    ttl = current_app.config.get("PROFILE_TTL", 86400)
+    cache.set(
+        f"profile:{meta['id']}",
+        {"meta": meta, "stats": marshal.dumps(profiler.stats)},
+        timeout=ttl,
+    )
+    index = cache.get(PROFILE_INDEX_KEY) or []
+    cache.set(PROFILE_INDEX_KEY, [meta] + index[: PROFILE_INDEX_SIZE - 1], timeout=ttl)
+    return meta["id"]
+
+
+def list_profiles():
+    return cache.get(PROFILE_INDEX_KEY) or []
+
+
+def get_profile(profile_id):
+    """Return ``(meta, marshalled stats)`` for a stored profile, or None."""
+    entry = cache.get(f"profile:{profile_id}")
+    return (entry["meta"], entry["stats"]) if entry else None
+
+
+def profile_text(stats, limit=60, sort="cumulative"):
+    """Render stored stats as the ``pstats`` table, top ``limit`` functions."""
+    stream = io.StringIO()
+    pstats.Stats(_LoadedStats(marshal.loads(stats)), stream=stream).sort_stats(
+        sort
+    ).print_stats(limit)
+    return stream.getvalue()
+
+
+def _log_slow(response, seconds, split):
+    parts = " ".join(
+        f"{name}={entry['seconds']:.3f}s"
+        + (f"/{entry['calls']}" if "calls" in entry else "")
+        for name, entry in split.items()
+    )
+    logger.warning(
+        f"Slow request {request.method} {request.full_path.rstrip('?')} "
+        f"{response.status_code} {seconds:.3f}s: {parts}"
+    )
+    entry = {
+        "method": request.method,
+        "path": request.full_path.rstrip("?"),
+        "endpoint": request.endpoint,
+        "status": response.status_code,
+        "seconds": round(seconds, 4),
+        "timings": split,
+        "created": time.time(),
+    }
+    try:
+        client = get_redis()
+        if client is None:
+            _slow_log.appendleft(entry)
+            return
+        pipe = client.pipeline(transaction=False)
+        pipe.lpush(SLOW_LOG_KEY, json.dumps(entry))
+        pipe.ltrim(SLOW_LOG_KEY, 0, SLOW_LOG_SIZE - 1)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to record slow request: {e}")
+
+
+def slow_requests():
+    """Return the most recent slow requests, newest first."""
+    client = get_redis()
+    if client is None:
+        return list(_slow_log)
+    return [json.loads(raw) for raw in client.lrange(SLOW_LOG_KEY, 0, -1)]
+
+
+def _stop_profiler():
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        _profile_lock.release()
+    return profiler
+
+
+def register_profiling(app):
+    """Time-split every request, and profile the ones asked for or sampled.
+
+    A request is profiled when its ``X-Profile`` header matches
+    ``PROFILE_TOKEN`` or it falls in the ``PROFILE_SAMPLE_RATE`` sample; the
+    profile is stored for ``PROFILE_TTL`` seconds and its id returned in the
+    ``X-Profile-Id`` header. cProfile only sees the request's own thread:
+    work fanned out to the executor shows up as time waiting on futures, so
+    read it alongside the time split, which does count worker threads.
+    Requests slower than ``SLOW_REQUEST_THRESHOLD`` seconds are logged with
+    the time spent on upstream RPC, cache I/O, pandas and template
+    rendering.
+    """
+
+    @app.before_request
+    def start_request_timing():
+        g.request_start = time.perf_counter()
+        _timings.set(Timings())
+        if _wants_profile() and _profile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError as e:
+                # Another profiler (e.g. a debugger) is already active.
+                _profile_lock.release()
+                logger.warning(f"Could not start profiler: {e}")
+                return
+            g.profiler = profiler
+
+    @app.after_request
+    def finish_request_timing(response):
+        profiler = _stop_profiler()
+        start = g.get("request_start")
+        timings = _timings.get()
+        if start is None or timings is None:
+            return response
+        seconds = time.perf_counter() - start
+        split = timings.summary(seconds)
+        if profiler is not None:
+            try:
+                response.headers["X-Profile-Id"] = _save_profile(
+                    profiler, response, seconds, split
+                )
+            except Exception as e:
+                logger.warning(f"Failed to store profile: {e}")
+        threshold = current_app.config.get("SLOW_REQUEST_THRESHOLD", 0)
+        if threshold and seconds >= threshold:
+            _log_slow(response, seconds, split)
+        return response
+
+    @app.teardown_request
+    def end_request_timing(exc):
+        _stop_profiler()
+        _timings.set(None)
+
+    def template_started(sender, template, context, **extra):
+        g.setdefault("template_starts", []).append(time.perf_counter())
+
+    def template_finished(sender, template, context, **extra):
+        starts = g.get("template_starts")
+        if starts:
+            record("template", time.perf_counter() - starts.pop())
+
+    before_render_template.connect(template_started, app, weak=False)
+    template_rendered.connect(template_finished, app, weak=False)
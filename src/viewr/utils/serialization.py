@@ -0,0 +1,353 @@
+import logging
+import pickle
+import threading
+import time
+import zlib
+from string import hexdigits
+
+from cachelib.serializers import BaseRedisSerializer
+from flask_caching.backends.rediscache import RedisCache
+
+from .metrics import CACHE_ENTRY_BYTES, CACHE_WRITTEN_BYTES
+from .profiling import timed
+
+logger = logging.getLogger(__name__)
+
+# Encoded values are MAGIC + format byte + codec byte + payload. Values
+# written by the stock serializer ("!" + pickle, or a bare integer) still
+# load.
+MAGIC = b"~"
+PICKLE = b"p"
+MSGPACK = b"m"
+_TUPLE_EXT = 1
+
+
+def _zlib_codec():
+    return lambda data: zlib.compress(data, 1), zlib.decompress
+
+
+def _lz4_codec():
+    import lz4.frame
+
+    return lz4.frame.compress, lz4.frame.decompress
+
+
+def _zstd_codec():
+    import zstandard
+
+    # (De)compressor objects aren't thread-safe; keep one per thread.
+    local = threading.local()
+
+    def compress(data):
+        if not hasattr(local, "c"):
+            local.c = zstandard.ZstdCompressor(level=3)
+        return local.c.compress(data)
+
+    def decompress(data):
+        if not hasattr(local, "d"):
+            local.d = zstandard.ZstdDecompressor()
+        return local.d.decompress(data)
+
+    return compress, decompress
+
+
+# name: (tag, loader); loaders raise ImportError when the package is missing.
+CODECS = {
+    "zstd": (b"s", _zstd_codec),
+    "lz4": (b"4", _lz4_codec),
+    "zlib": (b"z", _zlib_codec),
+}
+NO_CODEC = b"n"
+
+
+def _load_codec(name):
+    try:
+        return CODECS[name][1]()
+    except ImportError:
+        return None
+
+
+def _family(key):
+    """Group keys for stats: the function for memoized values, else the prefix."""
+    if key.startswith("view/"):
+        segment = key[5:].lstrip("/").split("/", 1)[0]
+        # Pages cached with their query string are keyed by a digest.
+        if len(segment) in (32, 64) and all(c in hexdigits for c in segment):
+            segment = "<query>"
+        return "view/" + segment
+    parts = key.split(":")
+    if parts[0] in ("memo", "lock") and len(parts) > 1:
+        family = ":".join(parts[:2])
+        # Version stamps of locally tiered entries (see caching._LocalTier).
+        return f"{family}:v" if len(parts) > 3 and parts[-1] == "v" else family
+    return parts[0]
+
+
+class SerializerStats:
+    """Per key-family sizes and encode/decode times, plus the largest keys."""
+
+    LARGEST_KEYS = 20
+    _FIELDS = (
+        "writes",
+        "reads",
+        "raw_bytes",
+        "stored_bytes",
+        "read_bytes",
+        "encode_seconds",
+        "decode_seconds",
+    )
+
+    def __init__(self):
+        self._families = {}
+        self._largest = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, key):
+        family = _family(key)
+        bucket = self._families.get(family)
+        if bucket is None:
+            bucket = self._families[family] = dict.fromkeys(self._FIELDS, 0)
+        return bucket
+
+    def record_write(self, key, raw, stored, codec, seconds):
+        family = _family(key)
+        CACHE_WRITTEN_BYTES.inc(stored, family=family)
+        CACHE_ENTRY_BYTES.set(stored, family=family)
+        with self._lock:
+            bucket = self._bucket(key)
+            bucket["writes"] += 1
+            bucket["raw_bytes"] += raw
+            bucket["stored_bytes"] += stored
+            bucket["encode_seconds"] += seconds
+            self._largest[key] = {"raw": raw, "stored": stored, "codec": codec}
+            if len(self._largest) > self.LARGEST_KEYS:
+                smallest = min(self._largest, key=lambda k: self._largest[k]["stored"])
+                del self._largest[smallest]
+
+    def record_read(self, key, stored, seconds):
+        with self._lock:
+            bucket = self._bucket(key)
+            bucket["reads"] += 1
+            bucket["read_bytes"] += stored
+            bucket["decode_seconds"] += seconds
+
+    def snapshot(self):
+        with self._lock:
+            families = {name: dict(b) for name, b in self._families.items()}
+            largest = dict(self._largest)
+        for bucket in families.values():
+            bucket["ratio"] = (
+                round(bucket["stored_bytes"] / bucket["raw_bytes"], 4)
+                if bucket["raw_bytes"]
+                else None
+            )
+            for field in ("encode_seconds", "decode_seconds"):
+                bucket[field] = round(bucket[field], 6)
+        return {
+            "families": families,
+            "largest_keys": dict(
+                sorted(largest.items(), key=lambda kv: -kv[1]["stored"])
+            ),
+        }
+
+
+class CacheSerializer(BaseRedisSerializer):
+    """Redis serializer that compresses large values and can use msgpack.
+
+    Values are msgpack-encoded when ``use_msgpack`` is set, the package is
+    installed and the value is plain data (tuples survive the round trip);
+    anything else is pickled. Encodings of ``threshold`` bytes or more are
+    compressed with ``compression`` ("zstd", "lz4", "zlib", or "auto" for the
+    best one installed). Integers stay plain ASCII so ``inc``/``dec`` keep
+    working.
+    """
+
+    def __init__(self, compression="auto", threshold=1024, use_msgpack=False):
+        self.threshold = threshold
+        self.stats = SerializerStats()
+        names = list(CODECS) if compression == "auto" else [compression]
+        self.codec_name, self._compress = None, None
+        for name in names:
+            if name == "none":
+                break
+            codec = _load_codec(name)
+            if codec is not None:
+                self.codec_name = name
+                self._tag = CODECS[name][0]
+                self._compress = codec[0]
+                break
+            logger.warning(f"Cache compression {name} unavailable")
+        self._decompressors = {}
+        self._msgpack = None
+        if use_msgpack:
+            try:
+                import msgpack
+
+                self._msgpack = msgpack
+            except ImportError:
+                pass
+
+    def _default(self, obj):
+        # strict_types hands tuples to us instead of packing them as lists.
+        if isinstance(obj, tuple):
+            return self._msgpack.ExtType(_TUPLE_EXT, self._packb(list(obj)))
+        raise TypeError(f"Not plain data: {type(obj).__name__}")
+
+    def _packb(self, value):
+        return self._msgpack.packb(
+            value, default=self._default, strict_types=True, use_bin_type=True
+        )
+
+    def _ext_hook(self, code, payload):
+        if code == _TUPLE_EXT:
+            return tuple(self._unpackb(payload))
+        return self._msgpack.ExtType(code, payload)
+
+    def _unpackb(self, data):
+        return self._msgpack.unpackb(
+            data, ext_hook=self._ext_hook, strict_map_key=False, raw=False
+        )
+
+    def _pack(self, value):
+        if self._msgpack is not None:
+            try:
+                return MSGPACK, self._packb(value)
+            except (TypeError, ValueError, OverflowError):
+                pass
+        return PICKLE, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def _unpack(self, fmt, data):
+        if fmt == PICKLE:
+            return pickle.loads(data)
+        return self._unpackb(data)
+
+    def _decompressor(self, tag):
+        if tag not in self._decompressors:
+            name = next((n for n, (t, _) in CODECS.items() if t == tag), None)
+            codec = _load_codec(name) if name else None
+            self._decompressors[tag] = codec[1] if codec else None
+        return self._decompressors[tag]
+
+    def dumps(self, value, protocol=pickle.HIGHEST_PROTOCOL, key=None):
+        if type(value) is int:
+            return str(value).encode("ascii")
+        start = time.perf_counter()
+        fmt, data = self._pack(value)
+        raw = len(data)
+        tag = NO_CODEC
+        if self._compress is not None and raw >= self.threshold:
+            compressed = self._compress(data)
+            if len(compressed) < raw:
+                tag, data = self._tag, compressed
+        encoded = MAGIC + fmt + tag + data
+        if key is not None:
+            self.stats.record_write(
+                key,
+                raw,
+                len(encoded),
+                self.codec_name if tag != NO_CODEC else None,
+                time.perf_counter() - start,
+            )
+        return encoded
+
+    def loads(self, value, key=None):
+        if value is None or not value.startswith(MAGIC):
+            return super().loads(value)
+        start = time.perf_counter()
+        fmt, tag, data = value[1:2], value[2:3], value[3:]
+        try:
+            if tag != NO_CODEC:
+                decompress = self._decompressor(tag)
+                if decompress is None:
+                    logger.warning(f"No decompressor for cached value {key}")
+                    return None
+                data = decompress(data)
+            if fmt == MSGPACK and self._msgpack is None:
+                logger.warning(f"msgpack needed to read cached value {key}")
+                return None
+            result = self._unpack(fmt, data)
+        except Exception as e:
+            logger.warning(f"Decoding cached value {key} failed: {e}")
+            return None
+        if key is not None:
+            self.stats.record_read(key, len(value), time.perf_counter() - start)
+        return result
+
+
+class CompressedRedisCache(RedisCache):
+    """``RedisCache`` using :class:`CacheSerializer`, with per-key accounting.
+
+    Reads and writes count as cache time in the request's timings.
+
+    Configured by ``CACHE_COMPRESSION``, ``CACHE_COMPRESS_THRESHOLD`` and
+    ``CACHE_MSGPACK``.
+    """
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        backend = super().factory(app, config, args, kwargs)
+        backend.serializer = CacheSerializer(
+            compression=config.get("CACHE_COMPRESSION", "auto"),
+            threshold=config.get("CACHE_COMPRESS_THRESHOLD", 1024),
+            use_msgpack=config.get("CACHE_MSGPACK", False),
+        )
+        return backend
+
+    @timed("cache")
+    def get(self, key):
+        raw = self._read_client.get(f"{self._get_prefix()}{key}")
+        return self.serializer.loads(raw, key=key)
+
+    @timed("cache")
+    def get_many(self, *keys):
+        prefixed = [f"{self._get_prefix()}{key}" for key in keys]
+        return [
+            self.serializer.loads(raw, key=key)
+            for key, raw in zip(keys, self._read_client.mget(prefixed), strict=True)
+        ]
+
+    @timed("cache")
+    def set(self, key, value, timeout=None):
+        timeout = self._normalize_timeout(timeout)
+        return self._write_client.set(
+            name=f"{self._get_prefix()}{key}",
+            value=self.serializer.dumps(value, key=key),
+            ex=timeout if timeout != -1 else None,
+        )
+
+    @timed("cache")
+    def add(self, key, value, timeout=None):
+        timeout = self._normalize_timeout(timeout)
+        name = f"{self._get_prefix()}{key}"
+        created = self._write_client.setnx(
+            name=name, value=self.serializer.dumps(value, key=key)
+        )
+        if created and timeout != -1:
+            self._write_client.expire(name=name, time=timeout)
+        return created
+
+    @timed("cache")
+    def set_many(self, mapping, timeout=None):
+        timeout = self._normalize_timeout(timeout)
+        pipe = self._write_client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipe.set(
+                name=f"{self._get_prefix()}{key}",
+                value=self.serializer.dumps(value, key=key),
+                ex=timeout if timeout != -1 else None,
+            )
+        results = pipe.execute()
+        return [key for key, ok in zip(mapping, results, strict=True) if ok]
+
+
+def serializer_stats(backend):
+    """Return the backend's serializer stats, or None if it doesn't keep any."""
+    serializer = getattr(backend, "serializer", None)
+    if not isinstance(serializer, CacheSerializer):
+        return None
+    return {
+        "compression": serializer.codec_name,
+        "threshold": serializer.threshold,
+        "msgpack": serializer._msgpack is not None,
+        **serializer.stats.snapshot(),
+    }
@@ -24,8 +24,13 @@ document.addEventListener("DOMContentLoaded", function () {
   // Make tables sortable
   const tables = document.querySelectorAll(".table");
   tables.forEach((table) => {
-    // Skip order book tables
-    if (table.id === "buy-book-table" || table.id === "sell-book-table") {
+    // Skip order book tables and the server-sorted listings
+    if (
+      table.id === "buy-book-table" ||
+      table.id === "sell-book-table" ||
+      table.id === "richlist-table" ||
+      table.id === "token-table"
+    ) {
       return;
     }
     const headers = table.querySelectorAll("th");
@@ -44,6 +49,11 @@ document.addEventListener("DOMContentLoaded", function () {
     initMarketPage();
   }
 
+  // Initialize the paginated full richlist when needed
+  if (document.getElementById("richlist-table")) {
+    initRichlistPage();
+  }
+
   // Initialize lazy loading for token icons
   initLazyTokenIcons();
 
@@ -179,6 +189,8 @@ function initMarketPage() {
 }
 
 // Load candlestick chart data from API
+// The API returns columnar OHLCV arrays (t/o/h/l/c/v); the Plotly figure
+// is built here rather than on the server.
 function loadCandlestickChart(token, timeframe) {
   fetch(`/api/chart/${token}/${timeframe}`)
     .then((response) => {
@@ -188,8 +200,30 @@ function loadCandlestickChart(token, timeframe) {
       return response.json();
     })
     .then((chartData) => {
+      const hasData = chartData.t && chartData.t.length > 0;
+      const data = hasData
+        ? [
+            {
+              type: "candlestick",
+              x: chartData.t.map((t) => new Date(t * 1000)),
+              open: chartData.o,
+              high: chartData.h,
+              low: chartData.l,
+              close: chartData.c,
+            },
+          ]
+        : [];
+      const layout = {
+        title: {
+          text: hasData
+            ? `${token}/SWAP.HIVE Market Data (${chartData.resolution})`
+            : `${token}/SWAP.HIVE Market Data - No Data Available`,
+        },
+        xaxis: { rangeslider: { visible: false } },
+      };
+
       // Plot the chart
-      Plotly.newPlot("candlestick-chart", chartData.data, chartData.layout, {
+      Plotly.newPlot("candlestick-chart", data, layout, {
         responsive: true,
       });
 
@@ -211,6 +245,152 @@ function loadCandlestickChart(token, timeframe) {
     });
 }
 
+// Full richlist: rows are fetched from /api/richlist a page at a time
+function initRichlistPage() {
+  const table = document.getElementById("richlist-table");
+  const tbody = table.querySelector("tbody");
+  const status = document.getElementById("richlist-status");
+  const sentinel = document.getElementById("richlist-sentinel");
+  const search = document.getElementById("richlist-search");
+  const state = {
+    token: table.dataset.token,
+    pageSize: parseInt(table.dataset.pageSize, 10) || 100,
+    offset: parseInt(table.dataset.offset, 10) || 0,
+    total: parseInt(table.dataset.total, 10) || 0,
+    sort: "total",
+    order: "desc",
+    q: "",
+    loading: false,
+    generation: 0,
+  };
+
+  const fmt = (value, digits) =>
+    Number(value || 0).toLocaleString("en-US", {
+      minimumFractionDigits: digits,
+      maximumFractionDigits: digits,
+    });
+
+  function appendRows(holders) {
+    const fragment = document.createDocumentFragment();
+    holders.forEach((holder) => {
+      const row = document.createElement("tr");
+      const cells = [
+        holder.rank,
+        holder.account,
+        fmt(holder.balance, 8),
+        fmt(holder.stake, 8),
+        fmt(holder.pendingUnstake, 8),
+        fmt(holder.delegationsIn, 8),
+        fmt(holder.delegationsOut, 8),
+        fmt(holder.pendingUndelegations, 8),
+        fmt(holder.total, 8),
+        `${fmt(holder.percentage, 2)}%`,
+      ];
+      cells.forEach((text) => {
+        const cell = document.createElement("td");
+        cell.textContent = text;
+        row.appendChild(cell);
+      });
+      fragment.appendChild(row);
+    });
+    tbody.appendChild(fragment);
+  }
+
+  function updateStatus() {
+    const shown = Math.min(state.offset, state.total);
+    status.textContent = state.q
+      ? `${state.total} matching holders (showing ${shown})`
+      : `${state.total} holders (showing ${shown})`;
+    sentinel.textContent = state.offset < state.total ? "Loading more..." : "";
+  }
+
+  function loadMore(reset = false) {
+    if (reset) {
+      state.generation += 1;
+      state.offset = 0;
+      state.total = 1;
+      tbody.innerHTML = "";
+    }
+    if (state.loading && !reset) return;
+    if (state.offset >= state.total) return;
+    state.loading = true;
+    const generation = state.generation;
+    const params = new URLSearchParams({
+      offset: state.offset,
+      limit: state.pageSize,
+      sort: state.sort,
+      order: state.order,
+    });
+    if (state.q) params.set("q", state.q);
+    fetch(`/api/richlist/${state.token}?${params}`)
+      .then((response) => {
+        if (!response.ok) {
+          throw new Error("Network response was not ok");
+        }
+        return response.json();
+      })
+      .then((data) => {
+        // Drop responses for a sort or search that has since changed
+        if (generation !== state.generation) return;
+        appendRows(data.holders);
+        state.offset += data.holders.length;
+        state.total = data.total;
+        updateStatus();
+      })
+      .catch((error) => {
+        console.error("Error loading richlist:", error);
+        sentinel.textContent = "Error loading holders.";
+      })
+      .finally(() => {
+        if (generation === state.generation) {
+          state.loading = false;
+          // Keep filling while the sentinel is still on screen
+          const rect = sentinel.getBoundingClientRect();
+          if (rect.top < window.innerHeight) loadMore();
+        }
+      });
+  }
+
+  table.querySelectorAll("th[data-sort]").forEach((header) => {
+    header.style.cursor = "pointer";
+    header.setAttribute("title", "Click to sort");
+    header.addEventListener("click", function () {
+      const sort = header.dataset.sort;
+      if (state.sort === sort) {
+        state.order = state.order === "asc" ? "desc" : "asc";
+      } else {
+        state.sort = sort;
+        state.order = sort === "account" ? "asc" : "desc";
+      }
+      table.querySelectorAll("th").forEach((th) => {
+        th.classList.remove("sorted-asc", "sorted-desc");
+      });
+      header.classList.add(state.order === "asc" ? "sorted-asc" : "sorted-desc");
+      loadMore(true);
+    });
+  });
+
+  let searchTimer = null;
+  search.addEventListener("input", function () {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(() => {
+      state.q = search.value.trim().toLowerCase();
+      loadMore(true);
+    }, 300);
+  });
+
+  if ("IntersectionObserver" in window) {
+    new IntersectionObserver((entries) => {
+      if (entries.some((entry) => entry.isIntersecting)) loadMore();
+    }).observe(sentinel);
+  } else {
+    window.addEventListener("scroll", function () {
+      if (sentinel.getBoundingClientRect().top < window.innerHeight) loadMore();
+    });
+  }
+  updateStatus();
+}
+
 // Global variable to track excluded accounts
 let excludedAccounts = [];
 
@@ -0,0 +1,29 @@
+import pytest
+
+from viewr import create_app
+from viewr.api import hive_engine
+from viewr.config import Config
+from viewr.utils import caching
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """An app on SimpleCache, with no Redis and no per-process cache state."""
+    monkeypatch.setattr(Config, "get_cache_config", staticmethod(lambda: "SimpleCache"))
+    monkeypatch.setattr(caching, "_local_tier", caching._LocalTier())
+    app = create_app("dev")
+    app.config.update(TESTING=True, HE_REQUEST_BUDGET=0)
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def node_state(monkeypatch):
+    """Start from no synced node list and no pool."""
+    monkeypatch.setattr(hive_engine, "_node_entry", None)
+    monkeypatch.setattr(hive_engine, "_next_sync", 0.0)
+    monkeypatch.setattr(hive_engine, "_pool", None)
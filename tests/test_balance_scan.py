@@ -0,0 +1,69 @@
+import pytest
+
+from viewr.services import tokens
+
+
+class FakeBalances:
+    """``he_api`` over an in-memory ``balances`` table."""
+
+    def __init__(self, accounts):
+        self.rows = [{"account": a, "balance": "1"} for a in sorted(accounts)]
+        self.queries = []
+
+    def find(self, contract, table, query, limit, indexes):
+        assert (contract, table) == ("tokens", "balances")
+        assert indexes == [{"index": "account", "descending": False}]
+        self.queries.append(query)
+        bounds = query.get("account", {})
+        rows = [
+            r
+            for r in self.rows
+            if ("$gt" not in bounds or r["account"] > bounds["$gt"])
+            and ("$gte" not in bounds or r["account"] >= bounds["$gte"])
+            and ("$lt" not in bounds or r["account"] < bounds["$lt"])
+        ]
+        return [dict(r) for r in rows[:limit]]
+
+
+def sequential_scan(fake):
+    return [r["account"] for r in fake.rows]
+
+
+@pytest.fixture
+def scan(app, monkeypatch):
+    def scan(accounts):
+        fake = FakeBalances(accounts)
+        monkeypatch.setattr(tokens, "he_api", fake)
+        with app.app_context():
+            rows = tokens._scan_balances("BEE")
+        return fake, [r["account"] for r in rows]
+
+    return scan
+
+
+def test_small_token_fits_the_first_page(scan):
+    fake, accounts = scan(["bob", "alice"])
+    assert accounts == ["alice", "bob"]
+    assert len(fake.queries) == 1
+
+
+def test_partitions_match_a_sequential_scan(scan):
+    accounts = (
+        [f"a{i:04d}" for i in range(1200)]  # the first page ends inside "a"
+        + ["b", "b1", "b-2", "c.3", "k9"]  # bare and digit-bearing boundaries
+        + [f"m{i:04d}" for i in range(1500)]  # one partition pages past 1000
+        + ["null", "y", "z", "z0", "zz9"]
+    )
+    fake, scanned = scan(accounts)
+    assert scanned == sequential_scan(fake)
+
+    ranges = {tuple(sorted(q.get("account", {}).items())) for q in fake.queries}
+    assert (("$gt", "a0999"), ("$lt", "b")) in ranges
+    assert (("$gte", "z"),) in ranges
+    assert (("$gt", "m0999"), ("$lt", "n")) in ranges
+
+
+def test_first_page_ending_in_the_last_partition(scan):
+    fake, scanned = scan([f"z{i:04d}" for i in range(1001)])
+    assert scanned == sequential_scan(fake)
+    assert fake.queries[1]["account"] == {"$gt": "z0999"}
@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+
+from viewr.utils.batching import BatchLoader
+from viewr.utils.deadline import DeadlineExceeded, budget
+
+
+def load_all(loader, keys):
+    results = {}
+
+    def load(key):
+        try:
+            results[key] = loader.load(key)
+        except Exception as e:
+            results[key] = e
+
+    threads = [threading.Thread(target=load, args=(key,)) for key in keys]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_loads_share_one_fetch():
+    batches = []
+
+    def fetch_many(keys):
+        batches.append(sorted(keys))
+        return {key: key.lower() for key in keys if key != "MISSING"}
+
+    loader = BatchLoader(fetch_many, window=0.1)
+    results = load_all(loader, ["A", "B", "B", "MISSING"])
+    assert results == {"A": "a", "B": "b", "MISSING": None}
+    assert batches == [["A", "B", "MISSING"]]
+
+
+def test_batches_are_split_at_max_batch():
+    batches = []
+
+    def fetch_many(keys):
+        batches.append(len(keys))
+        return {key: key for key in keys}
+
+    loader = BatchLoader(fetch_many, window=0.1, max_batch=2)
+    results = load_all(loader, ["A", "B", "C", "D", "E"])
+    assert results == {key: key for key in "ABCDE"}
+    assert batches == [2, 2, 1]
+
+
+def test_failed_fetch_reaches_every_caller_in_the_batch():
+    def fetch_many(keys):
+        raise ConnectionError("upstream down")
+
+    loader = BatchLoader(fetch_many, window=0.1)
+    results = load_all(loader, ["A", "B"])
+    assert all(isinstance(result, ConnectionError) for result in results.values())
+    # The next load starts a new batch.
+    loader.fetch_many = lambda keys: {key: 1 for key in keys}
+    assert loader.load("A") == 1
+
+
+def test_single_load():
+    loader = BatchLoader(lambda keys: {"A": 1}, window=0)
+    assert loader.load("A") == 1
+    with pytest.raises(KeyError):
+        BatchLoader(lambda keys: {}[keys[0]], window=0).load("B")
+
+
+def test_waiters_give_up_at_their_deadline():
+    batches = []
+
+    def fetch_many(keys):
+        batches.append(sorted(keys))
+        return {key: key for key in keys}
+
+    loader = BatchLoader(fetch_many, window=0.3)
+    results = {}
+    leader = threading.Thread(
+        target=lambda: results.update(A=loader.load("A")), daemon=True
+    )
+    leader.start()
+    time.sleep(0.05)
+    # Joins the leader's batch but can't wait out its window.
+    with budget(0.05), pytest.raises(DeadlineExceeded):
+        loader.load("B")
+    leader.join()
+    assert results == {"A": "A"}
+    assert batches == [["A", "B"]]
@@ -0,0 +1,15 @@
+def test_cache_stats_hidden_without_the_profile_token(app, client):
+    app.config["PROFILE_TOKEN"] = "secret"
+    assert client.get("/api/cache/stats").status_code == 404
+    assert (
+        client.get("/api/cache/stats", headers={"X-Profile": "wrong"}).status_code
+        == 404
+    )
+    response = client.get("/api/cache/stats", headers={"X-Profile": "secret"})
+    assert response.status_code == 200
+    assert "functions" in response.get_json()
+
+
+def test_cache_stats_hidden_when_profiling_is_off(app, client):
+    app.config["PROFILE_TOKEN"] = None
+    assert client.get("/api/cache/stats", headers={"X-Profile": ""}).status_code == 404
@@ -0,0 +1,229 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import cachelib.simple
+import pytest
+
+from viewr.utils import caching
+from viewr.utils.caching import cache_stats, memoize
+from viewr.utils.concurrency import Fetch, gather
+from viewr.utils.deadline import bounded, budget
+
+calls = []
+
+
+@memoize(timeout=60)
+def slow_build(symbol):
+    time.sleep(0.2)
+    # Raises DeadlineExceeded if the caller's budget still applied.
+    bounded(None)
+    calls.append(symbol)
+    return {"symbol": symbol}
+
+
+def test_slow_cold_compute_outlives_the_request_budget(app):
+    calls.clear()
+    with app.app_context():
+        with budget(0.05):
+            assert slow_build("SLOW") == {"symbol": "SLOW"}
+        assert slow_build("SLOW") == {"symbol": "SLOW"}
+    assert calls == ["SLOW"]
+
+
+def test_fetch_past_the_budget_still_fills_the_cache(app):
+    calls.clear()
+    with app.app_context():
+        with budget(0.05):
+            results = gather({"build": Fetch(slow_build, "LATE", fallback="fallback")})
+        assert results == {"build": "fallback"}
+        time.sleep(0.3)
+        assert slow_build.peek_many([("LATE",)]) == [{"symbol": "LATE"}]
+    assert calls == ["LATE"]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Wall clock for cache TTLs that tests move forward by hand."""
+    now = [1_700_000_000.0]
+    fake = SimpleNamespace(
+        time=lambda: now[0], monotonic=time.monotonic, sleep=time.sleep
+    )
+    monkeypatch.setattr(caching, "time", fake)
+    monkeypatch.setattr(cachelib.simple, "time", fake.time)
+
+    def advance(seconds):
+        now[0] += seconds
+
+    return advance
+
+
+def counter():
+    """A memoized function returning how many times it has run."""
+    runs = []
+    gate = threading.Event()
+    gate.set()
+
+    @memoize(timeout=10, hard_timeout=100)
+    def compute(symbol):
+        gate.wait(5)
+        runs.append(symbol)
+        return len(runs)
+
+    return compute, runs, gate
+
+
+def test_fresh_values_come_from_the_cache(app, clock):
+    compute, runs, _ = counter()
+    with app.app_context():
+        assert compute("A") == 1
+        clock(9)
+        assert compute("A") == 1
+    assert runs == ["A"]
+
+
+def test_stale_values_are_served_while_one_caller_refreshes(app, clock):
+    compute, runs, gate = counter()
+    name = f"{compute.__module__}.{compute.__qualname__}"
+    refreshes = cache_stats().get(name, {}).get("refreshes", 0)
+    with app.app_context():
+        value, version = compute.versioned("A")
+        clock(20)
+        gate.clear()
+        assert compute("A") == 1
+        assert compute("A") == 1
+        gate.set()
+        deadline = time.monotonic() + 5
+        while compute.versioned("A")[1] == version and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert compute.versioned("A") != (value, version)
+        assert compute("A") == 2
+    assert cache_stats()[name]["refreshes"] == refreshes + 1
+    assert runs == ["A", "A"]
+
+
+def test_expired_values_are_recomputed_inline(app, clock):
+    compute, runs, _ = counter()
+    with app.app_context():
+        assert compute("A") == 1
+        clock(101)
+        assert compute("A") == 2
+    assert runs == ["A", "A"]
+
+
+def test_concurrent_misses_compute_once(app, clock):
+    compute, runs, gate = counter()
+    gate.clear()
+    results = []
+
+    def call():
+        with app.app_context():
+            results.append(compute("A"))
+
+    threads = [threading.Thread(target=call) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    gate.set()
+    for thread in threads:
+        thread.join()
+    assert results == [1] * 5
+    assert runs == ["A"]
+
+
+def test_none_is_not_cached(app):
+    runs = []
+
+    @memoize(timeout=10)
+    def lookup(symbol):
+        runs.append(symbol)
+
+    with app.app_context():
+        assert lookup("A") is None
+        assert lookup("A") is None
+    assert runs == ["A", "A"]
+
+
+def local_counter():
+    runs = []
+
+    @memoize(timeout=60, local=True)
+    def compute(symbol):
+        runs.append(symbol)
+        return len(runs)
+
+    return compute, runs
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    """Keys read from the shared cache."""
+    keys = []
+    cache_get = caching._cache_get
+
+    def spy(key):
+        keys.append(key)
+        return cache_get(key)
+
+    monkeypatch.setattr(caching, "_cache_get", spy)
+    return keys
+
+
+def test_local_tier_answers_without_reading_the_shared_cache(app, reads):
+    compute, runs = local_counter()
+    app.config["MEMO_LOCAL_CHECK_INTERVAL"] = 60
+    name = f"{compute.__module__}.{compute.__qualname__}"
+    with app.app_context():
+        assert compute("A") == 1
+        local_hits = cache_stats()[name]["local_hits"]
+        reads.clear()
+        assert compute("A") == 1
+        assert cache_stats()[name]["local_hits"] == local_hits + 1
+    assert reads == []
+    assert runs == ["A"]
+
+
+def test_local_tier_revalidates_by_version(app, monkeypatch, reads):
+    compute, runs = local_counter()
+    app.config["MEMO_LOCAL_CHECK_INTERVAL"] = 0
+    with app.app_context():
+        assert compute("A") == 1
+        key = compute.cache_key("A")
+        reads.clear()
+        # Unchanged version: only the small version key is read.
+        assert compute("A") == 1
+        assert reads == [f"{key}:v"]
+
+        # Another worker publishes a new value, bumping the version.
+        ours = caching._local_tier
+        monkeypatch.setattr(caching, "_local_tier", caching._LocalTier())
+        compute.prime(42, "A")
+        monkeypatch.setattr(caching, "_local_tier", ours)
+        reads.clear()
+        assert compute("A") == 42
+        assert reads == [f"{key}:v", key]
+    assert runs == ["A"]
+
+
+def test_invalidate_clears_the_local_copy(app):
+    compute, runs = local_counter()
+    app.config["MEMO_LOCAL_CHECK_INTERVAL"] = 60
+    with app.app_context():
+        assert compute("A") == 1
+        compute.invalidate("A")
+        assert caching.local_cache_stats()["entries"] == 0
+        assert compute("A") == 2
+    assert runs == ["A", "A"]
+
+
+def test_invalidation_in_another_worker_reaches_this_one(app, monkeypatch):
+    compute, runs = local_counter()
+    app.config["MEMO_LOCAL_CHECK_INTERVAL"] = 0
+    with app.app_context():
+        assert compute("A") == 1
+        ours = caching._local_tier
+        monkeypatch.setattr(caching, "_local_tier", caching._LocalTier())
+        compute.invalidate("A")
+        monkeypatch.setattr(caching, "_local_tier", ours)
+        assert compute("A") == 2
+    assert runs == ["A", "A"]
@@ -0,0 +1,92 @@
+import time
+
+import pytest
+
+from viewr.services import market
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+
+@pytest.fixture
+def history(app, monkeypatch):
+    """A fake history API over hourly candles for the last 10 days."""
+    now = time.time() // HOUR * HOUR
+    candles = {
+        now - h * HOUR: {"timestamp": now - h * HOUR, "closePrice": 1.0}
+        for h in range(10 * 24)
+    }
+    requests = []
+
+    def get_market_history(symbol, timestamp_start):
+        requests.append(timestamp_start / 1000)
+        if history.down:
+            raise ConnectionError("history API down")
+        return [
+            dict(c) for ts, c in sorted(candles.items()) if ts >= timestamp_start / 1000
+        ]
+
+    history.now = now
+    history.candles = candles
+    history.requests = requests
+    history.down = False
+    monkeypatch.setattr(market, "get_market_history", get_market_history)
+    with app.app_context():
+        yield history
+
+
+def test_cold_store_fetches_the_window(history):
+    store = market.sync_candles("BEE", history.now - 2 * DAY)
+    assert history.requests == [history.now - 2 * DAY]
+    assert store["start"] == history.now - 2 * DAY
+    assert len(store["candles"]) == 2 * 24 + 1
+
+
+def test_synced_store_only_fetches_from_its_newest_candle(history, monkeypatch):
+    market.sync_candles("BEE", history.now - 2 * DAY)
+    market.sync_candles("BEE", history.now - DAY)
+    assert len(history.requests) == 1  # within CANDLE_SYNC_INTERVAL
+
+    monkeypatch.setattr(market, "CANDLE_SYNC_INTERVAL", 0)
+    # The newest candle was still open; its update replaces the stored one.
+    history.candles[history.now]["closePrice"] = 2.0
+    store = market.sync_candles("BEE", history.now - DAY)
+    assert history.requests[-1] == history.now
+    assert store["start"] == history.now - 2 * DAY
+    assert len(store["candles"]) == 2 * 24 + 1
+    assert store["candles"][-1]["closePrice"] == 2.0
+
+
+def test_wider_window_refetches_from_its_start(history):
+    market.sync_candles("BEE", history.now - DAY)
+    store = market.sync_candles("BEE", history.now - 5 * DAY)
+    assert history.requests == [history.now - DAY, history.now - 5 * DAY]
+    assert store["start"] == history.now - 5 * DAY
+    timestamps = [c["timestamp"] for c in store["candles"]]
+    assert timestamps == sorted(set(timestamps))
+    assert len(timestamps) == 5 * 24 + 1
+
+
+def test_retention_and_size_caps(history, monkeypatch):
+    monkeypatch.setattr(market, "CANDLE_RETENTION_DAYS", 3)
+    store = market.sync_candles("BEE", history.now - 9 * DAY)
+    assert history.requests[0] >= history.now - 3 * DAY - 1
+    assert store["candles"][0]["timestamp"] >= history.now - 3 * DAY - 1
+
+    monkeypatch.setattr(market, "CANDLE_MAX_CANDLES", 10)
+    monkeypatch.setattr(market, "CANDLE_SYNC_INTERVAL", 0)
+    store = market.sync_candles("BEE", history.now - DAY)
+    assert [c["timestamp"] for c in store["candles"]] == [
+        history.now - h * HOUR for h in range(9, -1, -1)
+    ]
+
+
+def test_failures_serve_the_stored_candles(history, monkeypatch):
+    stored = market.sync_candles("BEE", history.now - DAY)
+    history.down = True
+    monkeypatch.setattr(market, "CANDLE_SYNC_INTERVAL", 0)
+    assert market.sync_candles("BEE", history.now - DAY) == stored
+    # Nothing stored for the wider window's start either way.
+    assert market.sync_candles("BEE", history.now - 2 * DAY) == stored
+    with pytest.raises(ConnectionError):
+        market.sync_candles("BEE2", history.now - DAY)
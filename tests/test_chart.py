@@ -0,0 +1,39 @@
+from viewr.routes import api
+
+OHLC = {
+    "resolution": "1w",
+    "t": [1_700_000_000],
+    "o": [1.0],
+    "h": [2.0],
+    "l": [0.5],
+    "c": [1.5],
+    "v": [10.0],
+}
+
+
+def test_open_bucket_changes_are_never_304(client, monkeypatch):
+    ohlc = dict(OHLC)
+    monkeypatch.setattr(api, "get_token_info", lambda token: {"symbol": token})
+    monkeypatch.setattr(api, "get_ohlc", lambda *args, **kwargs: ohlc)
+    monkeypatch.setattr(api, "_chart_payload", api._chart_payload.uncached)
+
+    first = client.get("/api/chart/BEE/30")
+    assert first.status_code == 200
+    assert first.headers.get("Last-Modified") is None
+    etag = first.headers["ETag"]
+    assert (
+        client.get("/api/chart/BEE/30", headers={"If-None-Match": etag}).status_code
+        == 304
+    )
+
+    # Same bucket start, new close: the ETag changes and nothing else matches.
+    ohlc["c"] = [1.8]
+    again = client.get(
+        "/api/chart/BEE/30",
+        headers={
+            "If-None-Match": etag,
+            "If-Modified-Since": "Wed, 01 Jan 2031 00:00:00 GMT",
+        },
+    )
+    assert again.status_code == 200
+    assert again.get_json()["c"] == [1.8]
@@ -0,0 +1,55 @@
+import time
+
+import pytest
+
+from viewr.api.hive_engine import CircuitBreaker, CircuitOpenError
+
+
+def open_breaker(cooldown=60):
+    breaker = CircuitBreaker("test", threshold=3, cooldown=cooldown)
+    for _ in range(3):
+        breaker.record_failure()
+    return breaker
+
+
+def test_failures_in_a_row_open_the_breaker():
+    breaker = CircuitBreaker("test", threshold=3, cooldown=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+
+
+def test_cooldown_lets_one_trial_call_through():
+    breaker = open_breaker(cooldown=0.05)
+    time.sleep(0.06)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_trial_reopens_the_breaker():
+    breaker = open_breaker(cooldown=0.05)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_released_trial_lets_another_through():
+    breaker = open_breaker(cooldown=0.05)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
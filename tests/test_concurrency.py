@@ -0,0 +1,32 @@
+from flask import g
+
+from viewr.utils.concurrency import Fetch, gather, response_complete, submit
+
+
+def fail():
+    raise RuntimeError("upstream down")
+
+
+def test_fallbacks_mark_the_result_and_request_partial(app):
+    with app.test_request_context():
+        results = gather({"ok": Fetch(lambda: 1), "down": Fetch(fail, fallback=list)})
+        assert results == {"ok": 1, "down": []}
+        assert results.partial
+        assert not response_complete(None)
+
+
+def test_complete_results_are_not_partial(app):
+    with app.test_request_context():
+        results = gather({"ok": Fetch(lambda: 1)})
+        assert not results.partial
+        assert response_complete(None)
+
+
+def test_partial_reaches_the_caller_from_a_worker(app):
+    def nested():
+        results = gather({"down": Fetch(fail, fallback=0)})
+        return dict(results), results.partial
+
+    with app.test_request_context():
+        assert submit(nested).result() == ({"down": 0}, True)
+        assert "fanout_partial" not in g
@@ -0,0 +1,58 @@
+import time
+
+import fakeredis
+from flask import current_app
+
+from viewr import create_app
+from viewr.utils import metrics
+from viewr.utils.metrics import Counter, Histogram, Registry
+
+
+def test_workers_add_up_in_redis(app, monkeypatch):
+    redis = fakeredis.FakeRedis()
+    monkeypatch.setattr(metrics, "get_redis", lambda: redis)
+    workers = [Registry(), Registry()]
+    for registry in workers:
+        Counter("test_calls_total", "Calls.", ("kind",), registry=registry).inc(
+            2, kind="a"
+        )
+        Histogram("test_seconds", "Time.", buckets=(1, 5), registry=registry).observe(3)
+    with app.app_context():
+        workers[0].flush()
+        text = workers[1].render()
+
+    assert 'test_calls_total{kind="a"} 4' in text
+    assert 'test_seconds_bucket{le="1"} 0' in text
+    assert 'test_seconds_bucket{le="5"} 2' in text
+    assert "test_seconds_sum 6" in text
+    assert "test_seconds_count 2" in text
+
+
+def test_idle_process_still_flushes(app):
+    app.config["METRICS_FLUSH_INTERVAL"] = 0.01
+    registry = Registry()
+    calls = Counter("test_idle_total", "Calls.", registry=registry)
+    registry.start_flusher(app)
+    registry.start_flusher(app)
+    calls.inc()
+    time.sleep(0.1)
+    assert registry._pending == {}
+    assert registry._totals == {"test_idle_total||": 1}
+
+
+def test_exit_flush_is_registered_once(app, monkeypatch):
+    registered = []
+    monkeypatch.setattr(metrics.atexit, "register", registered.append)
+    create_app("dev")
+    create_app("dev")
+    assert registered == []
+
+    flushed = []
+    monkeypatch.setattr(
+        metrics.REGISTRY,
+        "flush",
+        lambda: flushed.append(current_app._get_current_object()),
+    )
+    metrics.register_metrics(app)
+    metrics._flush_at_exit()
+    assert flushed == [app]
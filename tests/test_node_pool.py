@@ -0,0 +1,83 @@
+import pytest
+
+from viewr.api import hive_engine
+from viewr.api.hive_engine import CircuitOpenError, NodePool
+
+
+class NodeApi:
+    """Stands in for nectarengine's ``Api``; behaviour is set per node."""
+
+    created = []
+    calls = []
+    failing = set()
+
+    def __init__(self, url, **kwargs):
+        self.url = url
+        NodeApi.created.append((url, kwargs))
+
+    def find(self, contract, table, **kwargs):
+        NodeApi.calls.append(self.url)
+        if self.url in NodeApi.failing:
+            raise ConnectionError(f"{self.url} is down")
+        return [{"node": self.url}]
+
+
+@pytest.fixture
+def nodes(monkeypatch):
+    monkeypatch.setattr(hive_engine, "Api", NodeApi)
+    monkeypatch.setattr(hive_engine, "probe_node", lambda node, timeout=3: None)
+    NodeApi.created = []
+    NodeApi.calls = []
+    NodeApi.failing = set()
+    return NodeApi
+
+
+def test_clients_leave_retries_to_the_pool(nodes):
+    pool = NodePool(["http://a/"], timeout=7)
+    pool.call("find", "tokens", "tokens")
+    pool.call("find", "tokens", "balances")
+    assert nodes.created == [
+        (
+            "http://a/",
+            {
+                "history_url": hive_engine.HE_HISTORY_API,
+                "timeout": 7,
+                "session": hive_engine.rpc_session,
+                "rpc_endpoint_attempts": 1,
+            },
+        )
+    ]
+
+
+def test_failures_fail_over_to_another_node(nodes):
+    nodes.failing = {"http://bad/"}
+    pool = NodePool(["http://bad/", "http://good/"], eject_after=100, spread=2)
+    for _ in range(20):
+        assert pool.call("find", "t", "t") == [{"node": "http://good/"}]
+    assert "http://bad/" in nodes.calls
+    health = pool.snapshot()
+    assert health["http://bad/"]["error_rate"] > 0
+    assert health["http://good/"]["error_rate"] == 0
+
+
+def test_failures_in_a_row_eject_a_node(nodes):
+    pool = NodePool(["http://a/", "http://b/"], eject_after=3)
+    pool.record_failure("http://a/")
+    pool.record_failure("http://a/")
+    pool.record_success("http://a/", 0.1)
+    pool.record_failure("http://a/")
+    pool.record_failure("http://a/")
+    assert not pool.snapshot()["http://a/"]["ejected"]
+    pool.record_failure("http://a/")
+    assert pool.snapshot()["http://a/"]["state"] == "open"
+    assert all(pool.pick() == "http://b/" for _ in range(20))
+
+
+def test_every_node_ejected_fails_fast(nodes):
+    nodes.failing = {"http://a/"}
+    pool = NodePool(["http://a/"], eject_after=1, breaker_threshold=100)
+    with pytest.raises(ConnectionError):
+        pool.call("find", "t", "t")
+    with pytest.raises(CircuitOpenError):
+        pool.call("find", "t", "t")
+    assert nodes.calls == ["http://a/"]
@@ -0,0 +1,31 @@
+from viewr.routes import pools
+
+POOL = {"tokenPair": "SWAP.HIVE:BEE", "totalShares": "10"}
+
+
+def test_reversed_pair_found_in_one_gather(app, monkeypatch):
+    rounds = []
+    gather = pools.gather
+    monkeypatch.setattr(
+        pools, "gather", lambda fetches: rounds.append(fetches) or gather(fetches)
+    )
+    monkeypatch.setattr(
+        pools,
+        "get_lp_pool",
+        lambda pair: POOL if pair == "SWAP.HIVE:BEE" else None,
+    )
+    monkeypatch.setattr(pools, "get_lp_positions", lambda pair, limit: [pair])
+
+    with app.test_request_context():
+        result = pools._fetch_pool_and_positions("BEE", "SWAP.HIVE")
+
+    assert result == ("SWAP.HIVE:BEE", POOL, ["SWAP.HIVE:BEE"])
+    assert len(rounds) == 1
+
+
+def test_missing_pool_in_either_order(app, monkeypatch):
+    monkeypatch.setattr(pools, "get_lp_pool", lambda pair: None)
+    monkeypatch.setattr(pools, "get_lp_positions", lambda pair, limit: [])
+
+    with app.test_request_context():
+        assert pools._fetch_pool_and_positions("A", "B") == ("A:B", None, [])
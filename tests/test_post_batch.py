@@ -0,0 +1,87 @@
+import pytest
+import requests
+
+from viewr.api import hive_engine
+from viewr.api.hive_engine import RPCError, post_batch
+
+CALLS = [
+    ("find", {"contract": "tokens", "table": "balances"}),
+    ("findOne", {"contract": "tokens", "table": "tokens"}),
+    ("find", {"contract": "market", "table": "buyBook"}),
+]
+
+
+class Reply:
+    def __init__(self, body, status=200):
+        self.body = body
+        self.status = status
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise requests.HTTPError(f"{self.status} error")
+
+    def json(self):
+        return self.body
+
+
+@pytest.fixture
+def reply(monkeypatch):
+    sent = []
+
+    def respond(body, status=200):
+        def post(url, json, timeout):
+            sent.append((url, json, timeout))
+            return Reply(body, status)
+
+        monkeypatch.setattr(hive_engine.rpc_session, "post", post)
+        return sent
+
+    return respond
+
+
+def test_replies_are_matched_to_calls_by_id(reply):
+    sent = reply(
+        [
+            {"id": 2, "result": []},
+            {"id": 0, "result": [{"account": "alice"}]},
+            {"id": 1, "error": {"code": -32600, "message": "bad query"}},
+        ]
+    )
+    results = post_batch("http://node", CALLS, timeout=5)
+
+    url, payload, timeout = sent[0]
+    assert url == "http://node/contracts"
+    assert [item["id"] for item in payload] == [0, 1, 2]
+    assert timeout == 5
+    assert results[0] == ([{"account": "alice"}], None)
+    assert results[1][0] is None
+    assert isinstance(results[1][1], RPCError)
+    assert str(results[1][1]) == "bad query"
+    assert results[2] == ([], None)
+
+
+def test_missing_replies_are_errors(reply):
+    reply([{"id": 0, "result": None}])
+    results = post_batch("http://node/", CALLS)
+    assert results[0] == (None, None)
+    assert all(isinstance(error, RPCError) for _, error in results[1:])
+
+
+def test_whole_batch_error_raises(reply):
+    reply({"jsonrpc": "2.0", "error": {"detail": "batch too large"}})
+    with pytest.raises(RPCError, match="batch too large"):
+        post_batch("http://node", CALLS)
+
+
+def test_malformed_and_failed_replies_raise(reply):
+    reply({"result": []})
+    with pytest.raises(ValueError):
+        post_batch("http://node", CALLS)
+    reply([], status=502)
+    with pytest.raises(requests.HTTPError):
+        post_batch("http://node", CALLS)
+
+
+def test_batches_are_not_retried_inside_the_call():
+    adapter = hive_engine.rpc_session.get_adapter("http://node/")
+    assert adapter.max_retries.total == 0
@@ -0,0 +1,109 @@
+import pickle
+
+import pytest
+
+from viewr.routes import api
+from viewr.services.richlist import Richlist
+
+
+def make_richlist():
+    return Richlist.from_holders(
+        [
+            {"account": "carol", "balance": "5", "stake": "0"},
+            {"account": "alice", "balance": "1", "stake": "2"},
+            {"account": "bob", "balance": "10", "stake": "1"},
+        ]
+    )
+
+
+def test_rank_by_total_holdings():
+    richlist = make_richlist()
+    assert [richlist.rank(a) for a in ("bob", "carol", "alice")] == [1, 2, 3]
+    assert richlist.rank("dave") is None
+    assert richlist.rank("") is None
+
+
+def test_rank_builds_the_account_index_once():
+    richlist = make_richlist()
+    richlist.rank("bob")
+    index = richlist._sorted_accounts
+    richlist.rank("alice")
+    assert richlist._sorted_accounts is index
+
+
+def test_rank_after_unpickling():
+    richlist = pickle.loads(pickle.dumps(make_richlist()))
+    assert richlist.rank("carol") == 2
+
+
+def test_order_by_field_and_account():
+    richlist = make_richlist()
+
+    def names(positions):
+        return [richlist[int(i)]["account"] for i in positions]
+
+    assert names(richlist.order()) == ["bob", "carol", "alice"]
+    assert names(richlist.order("total", descending=False)) == ["alice", "carol", "bob"]
+    assert names(richlist.order("stake")) == ["alice", "bob", "carol"]
+    assert names(richlist.order("account", descending=False)) == [
+        "alice",
+        "bob",
+        "carol",
+    ]
+    assert names(richlist.order("account")) == ["carol", "bob", "alice"]
+    with pytest.raises(ValueError):
+        richlist.order("nonsense")
+
+
+def test_page_bounds_prefix_and_rank():
+    richlist = make_richlist()
+    total, rows = richlist.page(offset=1, limit=1)
+    assert total == 3
+    assert [(r["account"], r["rank"]) for r in rows] == [("carol", 2)]
+    assert richlist.page(offset=5, limit=10) == (3, [])
+
+    total, rows = richlist.page(limit=10, sort="account", descending=False)
+    assert [(r["account"], r["rank"]) for r in rows] == [
+        ("alice", 3),
+        ("bob", 1),
+        ("carol", 2),
+    ]
+    total, rows = richlist.page(prefix="ca")
+    assert total == 1 and rows[0]["account"] == "carol"
+
+
+@pytest.fixture
+def richlist_api(client, monkeypatch):
+    monkeypatch.setattr(
+        api, "get_token_info", lambda token: {"symbol": token, "supply": "100"}
+    )
+    monkeypatch.setattr(api, "get_richlist", lambda token: (make_richlist(), 4.0))
+    return client
+
+
+def test_api_richlist_page(richlist_api):
+    body = richlist_api.get("/api/richlist/BEE?offset=1&limit=5").get_json()
+    assert [h["account"] for h in body["holders"]] == ["carol", "alice"]
+    assert body["holders"][0]["percentage"] == pytest.approx(5.0)
+    assert (body["total"], body["holders_count"], body["burned_balance"]) == (3, 3, 4.0)
+
+    body = richlist_api.get("/api/richlist/BEE?sort=account").get_json()
+    assert body["order"] == "asc"
+    assert [h["account"] for h in body["holders"]] == ["alice", "bob", "carol"]
+
+
+def test_api_richlist_clamps_offset_and_limit(richlist_api):
+    body = richlist_api.get("/api/richlist/BEE?offset=-3&limit=0").get_json()
+    assert (body["offset"], body["limit"]) == (0, 1)
+    assert [h["account"] for h in body["holders"]] == ["bob"]
+
+    body = richlist_api.get("/api/richlist/BEE?limit=100000").get_json()
+    assert body["limit"] == api.RICHLIST_MAX_LIMIT
+
+
+@pytest.mark.parametrize(
+    "args",
+    ["limit=ten", "offset=1.5", "sort=nonsense", "sort=stake&order=up"],
+)
+def test_api_richlist_rejects_bad_arguments(richlist_api, args):
+    assert richlist_api.get(f"/api/richlist/BEE?{args}").status_code == 400
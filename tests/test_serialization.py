@@ -0,0 +1,81 @@
+import pickle
+
+import pytest
+
+from viewr.utils import serialization
+from viewr.utils.serialization import MAGIC, MSGPACK, NO_CODEC, PICKLE, CacheSerializer
+
+VALUE = ({"symbol": "BEE", "rows": [(f"user{i}", i / 2) for i in range(200)]}, 1.7e9)
+
+
+def codec(name):
+    pytest.importorskip({"zstd": "zstandard", "lz4": "lz4.frame"}.get(name, "zlib"))
+    return name
+
+
+@pytest.mark.parametrize("use_msgpack", [False, True])
+@pytest.mark.parametrize("name", ["zstd", "lz4", "zlib"])
+def test_round_trip_with_each_codec(name, use_msgpack):
+    if use_msgpack:
+        pytest.importorskip("msgpack")
+    serializer = CacheSerializer(compression=codec(name), use_msgpack=use_msgpack)
+    encoded = serializer.dumps(VALUE, key="memo:f:1")
+    assert encoded[:1] == MAGIC
+    assert encoded[1:2] == (MSGPACK if use_msgpack else PICKLE)
+    assert encoded[2:3] == serialization.CODECS[name][0]
+    # Tuples come back as tuples, not lists.
+    assert serializer.loads(encoded, key="memo:f:1") == VALUE
+
+
+def test_small_values_are_not_compressed():
+    serializer = CacheSerializer(compression="zlib", threshold=1024)
+    encoded = serializer.dumps({"a": 1})
+    assert encoded[2:3] == NO_CODEC
+    assert serializer.loads(encoded) == {"a": 1}
+
+
+def test_integers_stay_plain_and_legacy_values_load():
+    serializer = CacheSerializer()
+    assert serializer.dumps(42) == b"42"
+    assert serializer.loads(b"42") == 42
+    assert serializer.loads(b"!" + pickle.dumps(VALUE)) == VALUE
+
+
+def test_msgpack_falls_back_to_pickle_for_other_objects():
+    pytest.importorskip("msgpack")
+    serializer = CacheSerializer(use_msgpack=True)
+    value = {1, 2, 3}
+    encoded = serializer.dumps(value)
+    assert encoded[1:2] == PICKLE
+    assert serializer.loads(encoded) == value
+
+
+def test_unreadable_values_load_as_missing(monkeypatch):
+    pytest.importorskip("msgpack")
+    packed = CacheSerializer(compression="zlib", use_msgpack=True).dumps(VALUE)
+    assert CacheSerializer(use_msgpack=False).loads(packed) is None
+
+    compressed = CacheSerializer(compression="zlib").dumps(VALUE)
+    monkeypatch.setattr(serialization, "_load_codec", lambda name: None)
+    assert CacheSerializer(compression="none").loads(compressed) is None
+    assert CacheSerializer().loads(MAGIC + PICKLE + NO_CODEC + b"garbage") is None
+
+
+def test_missing_codec_falls_back(monkeypatch):
+    monkeypatch.setattr(
+        serialization,
+        "_load_codec",
+        lambda name: serialization._zlib_codec() if name == "zlib" else None,
+    )
+    assert CacheSerializer(compression="auto").codec_name == "zlib"
+    assert CacheSerializer(compression="zstd").codec_name is None
+
+
+def test_writes_and_reads_are_counted_per_family():
+    serializer = CacheSerializer(compression="zlib")
+    encoded = serializer.dumps(VALUE, key="memo:viewr.f:abc")
+    serializer.loads(encoded, key="memo:viewr.f:abc")
+    family = serializer.stats.snapshot()["families"]["memo:viewr.f"]
+    assert family["writes"] == family["reads"] == 1
+    assert family["stored_bytes"] == len(encoded)
+    assert family["ratio"] < 1
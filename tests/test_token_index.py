@@ -0,0 +1,116 @@
+import random
+import time
+
+import pytest
+
+from viewr.services.token_index import GRAM_SIZE, SORT_FIELDS, TokenIndex
+
+WORDS = ["bee", "hive", "swap", "leo", "beer", "honey", "bank", "sim", "star"]
+
+
+def make_tokens(count=300, seed=7):
+    rng = random.Random(seed)
+    tokens = []
+    for i in range(count):
+        symbol = (rng.choice(WORDS) + rng.choice(["", "P", "X", str(i)])).upper()
+        name = " ".join(rng.choices(WORDS, k=rng.randint(0, 3))).title()
+        tokens.append(
+            {
+                "symbol": f"{symbol}{i}",
+                "name": name or None,
+                "supply": rng.choice([rng.uniform(0, 1e6), None]),
+                "circulatingSupply": rng.uniform(0, 1e6),
+            }
+        )
+    later = time.time() + 3600
+    metrics = {
+        t["symbol"]: {
+            "lastPrice": str(rng.uniform(0, 10)),
+            "volume": str(rng.choice([0, rng.uniform(0, 1e4)])),
+            "volumeExpiration": later,
+            "priceChangePercent": f"{rng.uniform(-50, 50):.2f}%",
+            "lastDayPriceExpiration": later,
+        }
+        for t in tokens
+        if rng.random() < 0.7
+    }
+    return TokenIndex(tokens, metrics)
+
+
+def linear_search(index, query):
+    query = query.lower()
+    return [
+        pos
+        for pos, token in enumerate(index.tokens)
+        if query in str(token.get("symbol") or "").lower()
+        or query in str(token.get("name") or "").lower()
+    ]
+
+
+def linear_order(index, sort, descending):
+    def value(pos):
+        v = index.tokens[pos].get(sort)
+        return str(v or "").lower() if sort in ("symbol", "name") else v
+
+    positions = range(len(index.tokens))
+    if sort in ("symbol", "name"):
+        present, missing = list(positions), []
+    else:
+        present = [p for p in positions if isinstance(value(p), (int, float))]
+        missing = [p for p in positions if p not in present]
+    return sorted(present, key=value, reverse=descending) + missing
+
+
+def queries(index):
+    found = {"", "zzz", "q", "beehive", "bee hive", "ee", "HoNeY", "1"}
+    rng = random.Random(1)
+    for token in rng.sample(index.tokens, 40):
+        text = str(token.get("name") or token["symbol"]).lower()
+        for size in range(1, GRAM_SIZE + 4):
+            start = rng.randint(0, max(len(text) - size, 0))
+            found.add(text[start : start + size])
+    return sorted(found)
+
+
+def test_search_matches_a_linear_scan():
+    index = make_tokens()
+    for query in queries(index):
+        expected = [index.tokens[p] for p in linear_search(index, query)]
+        assert index.search(query) == expected, query
+        assert index.search(query, limit=5) == expected[:5], query
+
+
+def test_short_queries_are_single_lookups():
+    index = make_tokens()
+    for query in ("b", "be", "bee"):
+        assert len(query) <= GRAM_SIZE
+        assert index._matches(query) == linear_search(index, query)
+
+
+@pytest.mark.parametrize("sort", SORT_FIELDS)
+@pytest.mark.parametrize("descending", [False, True])
+def test_sorted_search_matches_a_linear_scan(sort, descending):
+    index = make_tokens()
+    order = linear_order(index, sort, descending)
+    for query in ("", "bee", "honey", "ank", "zzz"):
+        matches = set(linear_search(index, query))
+        expected = [index.tokens[p] for p in order if p in matches]
+        assert index.search(query, sort=sort, descending=descending) == expected
+        assert (
+            index.search(query, limit=3, sort=sort, descending=descending)
+            == expected[:3]
+        )
+
+
+def test_ranked_search_keeps_the_same_matches():
+    index = make_tokens()
+    ranked = index.search("bee", ranked=True)
+    assert sorted(t["symbol"] for t in ranked) == sorted(
+        t["symbol"] for t in index.search("bee")
+    )
+    assert ranked[0]["symbol"].lower().startswith("bee")
+
+
+def test_unknown_sort_field():
+    with pytest.raises(ValueError):
+        make_tokens(10).search("", sort="nonsense")
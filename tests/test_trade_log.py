@@ -0,0 +1,109 @@
+import time
+
+import pytest
+
+from viewr.services import market
+
+
+class FakeTrades:
+    """``he_api`` over an in-memory ``tradesHistory``, ``_id`` ascending."""
+
+    def __init__(self):
+        self.trades = []
+        self.queries = []
+        self.down = False
+
+    def add(self, count, age=0):
+        start = self.trades[-1]["_id"] + 1 if self.trades else 1
+        now = int(time.time())
+        self.trades.extend(
+            {"_id": i, "symbol": "BEE", "timestamp": now - age}
+            for i in range(start, start + count)
+        )
+
+    def find(self, contract, table, query, limit, indexes):
+        assert (contract, table) == ("market", "tradesHistory")
+        self.queries.append(query)
+        if self.down:
+            raise ConnectionError("node down")
+        trades = [t for t in self.trades if t["symbol"] == query["symbol"]]
+        bound = query.get("_id", {})
+        if "$gt" in bound:
+            trades = [t for t in trades if t["_id"] > bound["$gt"]]
+        if "$lt" in bound:
+            trades = [t for t in trades if t["_id"] < bound["$lt"]]
+        if indexes[0]["descending"]:
+            trades = trades[::-1]
+        return [dict(t) for t in trades[:limit]]
+
+
+@pytest.fixture
+def upstream(app, monkeypatch):
+    fake = FakeTrades()
+    monkeypatch.setattr(market, "he_api", fake)
+    monkeypatch.setattr(market, "TRADE_PAGE_SIZE", 3)
+    monkeypatch.setattr(market, "TRADE_LOG_MAX_PAGES", 2)
+    monkeypatch.setattr(market, "TRADE_LOG_MAX_TRADES", 6)
+    with app.app_context():
+        yield fake
+
+
+def ids(trades):
+    return [t["_id"] for t in trades]
+
+
+def test_cold_log_walks_back_from_the_newest_trade(upstream):
+    upstream.add(4)
+    assert ids(market.sync_trade_log("bee")) == [1, 2, 3, 4]
+    assert upstream.queries == [
+        {"symbol": "BEE"},
+        {"symbol": "BEE", "_id": {"$lt": 2}},
+    ]
+
+
+def test_gap_is_filled_from_the_last_stored_trade(upstream):
+    upstream.add(2)
+    market.sync_trade_log("BEE")
+    upstream.add(4)
+    upstream.queries.clear()
+
+    assert ids(market.sync_trade_log("BEE")) == [1, 2, 3, 4, 5, 6]
+    assert upstream.queries == [
+        {"symbol": "BEE", "_id": {"$gt": 2}},
+        {"symbol": "BEE", "_id": {"$gt": 5}},
+    ]
+
+
+def test_gap_beyond_max_pages_rebuilds_the_log(upstream):
+    upstream.add(2)
+    market.sync_trade_log("BEE")
+    upstream.add(7)
+    upstream.queries.clear()
+
+    # Two full pages of "$gt" leave the gap open, so the newest six trades
+    # are fetched again from the top instead.
+    assert ids(market.sync_trade_log("BEE")) == [4, 5, 6, 7, 8, 9]
+    assert upstream.queries[2:] == [
+        {"symbol": "BEE"},
+        {"symbol": "BEE", "_id": {"$lt": 7}},
+    ]
+
+
+def test_log_is_trimmed_to_retention_and_size(upstream):
+    upstream.add(2, age=(market.TRADE_LOG_RETENTION_DAYS + 1) * 24 * 60 * 60)
+    upstream.add(2)
+    assert ids(market.sync_trade_log("BEE")) == [3, 4]
+
+    upstream.add(5)
+    assert ids(market.sync_trade_log("BEE")) == [4, 5, 6, 7, 8, 9]
+
+
+def test_upstream_failure_serves_the_stored_log(upstream):
+    upstream.add(2)
+    market.sync_trade_log("BEE")
+    upstream.add(1)
+    upstream.down = True
+
+    assert ids(market.sync_trade_log("BEE")) == [1, 2]
+    with pytest.raises(ConnectionError):
+        market.sync_trade_log("OTHER")
@@ -0,0 +1,102 @@
+import pytest
+from nectarengine.exceptions import TokenDoesNotExists
+
+from viewr.api import hive_engine
+from viewr.services import market
+
+
+def test_pinned_nodes_skip_discovery(app, node_state, monkeypatch):
+    def discover(**kwargs):
+        raise AssertionError("discovery should not run")
+
+    monkeypatch.setattr(hive_engine, "discover_nodes", discover)
+    app.config["HE_NODES"] = ["http://127.0.0.1:5055/"]
+    with app.app_context():
+        assert hive_engine.get_nodes() == ["http://127.0.0.1:5055/"]
+        assert hive_engine.get_node_pool().nodes == ["http://127.0.0.1:5055/"]
+
+
+def test_market_history_uses_configured_api(app, monkeypatch):
+    calls = []
+
+    class Response:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return [{"timestamp": 1}]
+
+    def get(url, **kwargs):
+        calls.append((url, kwargs["params"]))
+        return Response()
+
+    monkeypatch.setattr(hive_engine.session, "get", get)
+    app.config["HE_HISTORY_API"] = "http://127.0.0.1:5055"
+    with app.app_context():
+        assert hive_engine.get_market_history("BEE", 1000) == [{"timestamp": 1}]
+    assert calls == [
+        (
+            "http://127.0.0.1:5055/marketHistory",
+            {"symbol": "BEE", "timestampStart": 1000},
+        )
+    ]
+
+
+class FakeApi:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def batch(self, calls):
+        self.calls.append(calls)
+        return [(self.rows[params["table"]], None) for _, params in calls]
+
+
+def test_order_books_read_both_tables_in_one_batch(monkeypatch):
+    api = FakeApi({"buyBook": [{"account": "alice"}], "sellBook": []})
+    monkeypatch.setattr(hive_engine, "he_api", api)
+    monkeypatch.setattr(market, "get_token_info", lambda symbol: {"symbol": "BEE"})
+    books = market.get_order_books("bee", limit=50, offset=100)
+    assert books == {"buy": [{"account": "alice"}], "sell": []}
+    assert [[params["table"] for _, params in calls] for calls in api.calls] == [
+        ["buyBook", "sellBook"]
+    ]
+    _, params = api.calls[0][0]
+    assert params["query"] == {"symbol": "BEE"}
+    assert (params["limit"], params["offset"]) == (50, 100)
+
+
+def test_order_books_reject_unknown_tokens(monkeypatch):
+    api = FakeApi({})
+    monkeypatch.setattr(hive_engine, "he_api", api)
+    monkeypatch.setattr(market, "get_token_info", lambda symbol: None)
+    with pytest.raises(TokenDoesNotExists):
+        market.get_order_books("NOPE")
+    assert api.calls == []
+
+
+def test_orderbook_api_pages_both_books(client, monkeypatch):
+    pages = {
+        "buy": [[{"account": f"a{i}"} for i in range(100)], [{"account": "bob"}]],
+        "sell": [[{"account": "carol"}]],
+    }
+    requested = []
+
+    def get_order_books(symbol, limit=100, offset=0, sides=("buy", "sell")):
+        requested.append((offset, tuple(sides)))
+        return {side: pages[side][offset // limit] for side in sides}
+
+    monkeypatch.setattr("viewr.routes.api.get_order_books", get_order_books)
+    response = client.get("/api/orderbook/BEE?exclude=bob")
+    assert response.status_code == 200
+    assert len(response.json["buy_book"]) == 100
+    assert response.json["sell_book"] == [{"account": "carol"}]
+    assert requested == [(0, ("buy", "sell")), (100, ("buy",))]
+
+
+def test_orderbook_api_errors_for_unknown_tokens(client, monkeypatch):
+    def get_order_books(symbol, **kwargs):
+        raise TokenDoesNotExists(f"{symbol} does not exists")
+
+    monkeypatch.setattr("viewr.routes.api.get_order_books", get_order_books)
+    assert client.get("/api/orderbook/NOPE").status_code == 500
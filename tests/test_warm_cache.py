@@ -0,0 +1,65 @@
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+
+WARM_CACHE = Path(__file__).resolve().parent.parent / "warm_cache.py"
+
+
+@pytest.fixture
+def warm_cache(app, monkeypatch):
+    spec = importlib.util.spec_from_file_location("warm_cache", WARM_CACHE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(module, "set_rate_limit", lambda rate: None)
+    monkeypatch.setattr(module, "prioritized_symbols", lambda: ["GOOD", "BAD"])
+    monkeypatch.setattr(module, "get_token_infos", lambda symbols: {})
+    return module
+
+
+def test_missing_token_info_is_not_recorded_as_warmed(
+    warm_cache, monkeypatch, tmp_path
+):
+    monkeypatch.setattr(
+        warm_cache,
+        "get_token_info",
+        lambda symbol: None if symbol == "BAD" else {"symbol": symbol},
+    )
+    state = tmp_path / "state.json"
+    warm_cache.warm_caches(tasks=("info",), workers=1, state_file=str(state))
+    assert json.loads(state.read_text())["done"] == [["info", "GOOD"]]
+
+
+def test_missing_pool_is_not_recorded_as_warmed(warm_cache, monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        warm_cache,
+        "get_lp_pools_for_token",
+        lambda symbol: [{"tokenPair": f"{symbol}:SWAP.HIVE"}],
+    )
+    monkeypatch.setattr(
+        warm_cache, "get_lp_pool", lambda pair: None if "BAD" in pair else {}
+    )
+    monkeypatch.setattr(warm_cache, "get_lp_positions", lambda pair, limit: [])
+    state = tmp_path / "state.json"
+    warm_cache.warm_caches(tasks=("pools",), workers=1, state_file=str(state))
+    assert json.loads(state.read_text())["done"] == [["pools", "GOOD"]]
+
+
+def test_failed_trade_sync_is_not_recorded_as_warmed(warm_cache, monkeypatch, tmp_path):
+    def sync_trade_log(symbol):
+        if symbol == "BAD":
+            raise ConnectionError("upstream down")
+        return []
+
+    warmed = []
+    monkeypatch.setattr(warm_cache, "sync_trade_log", sync_trade_log)
+    monkeypatch.setattr(
+        warm_cache,
+        "get_trade_history",
+        lambda symbol, limit, days: warmed.append(symbol) or [],
+    )
+    state = tmp_path / "state.json"
+    warm_cache.warm_caches(tasks=("trades",), workers=1, state_file=str(state))
+    assert json.loads(state.read_text())["done"] == [["trades", "GOOD"]]
+    assert warmed == ["GOOD"]
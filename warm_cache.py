@@ -1,37 +1,243 @@
 #!/usr/bin/env python
-"""Pre-warm Redis/Flask-Caching entries for richlists."""
+"""Pre-warm Redis/Flask-Caching entries for tokens, richlists, pools and trades.
 
+Tokens are warmed most-active first (by 24h market volume) on a worker pool,
+with a global cap on upstream calls per second. Progress is recorded in a
+state file as items finish, so an interrupted or partly failed run resumes
+where it left off; pass ``--reset`` to start over.
+"""
+
+import argparse
+import json
 import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from flask import current_app
 
 from viewr import create_app
-from viewr.services.tokens import get_richlist, get_tokens
+from viewr.api.hive_engine import set_rate_limit
+from viewr.services.market import (
+    get_market_metrics,
+    get_trade_history,
+    sync_trade_log,
+)
+from viewr.services.pools import get_lp_pool, get_lp_pools_for_token, get_lp_positions
+from viewr.services.tokens import (
+    get_richlist,
+    get_token_info,
+    get_token_infos,
+    get_tokens,
+)
+from viewr.utils.metrics import REGISTRY
 
+STATE_FILE = ".warm_cache_state.json"
 
-def warm_richlists() -> None:
-    """Fetch all token symbols and warm their richlist caches."""
+
+def _warm_info(symbol):
+    # get_token_info logs errors and returns None (which isn't cached)
+    # rather than raising; don't let that count as warmed.
+    if get_token_info(symbol) is None:
+        raise RuntimeError("no token info returned")
+
+
+def _warm_pools(symbol):
+    for pool in get_lp_pools_for_token(symbol):
+        token_pair = pool.get("tokenPair")
+        if token_pair:
+            # Likewise for a pool lookup that failed.
+            if get_lp_pool(token_pair) is None:
+                raise RuntimeError(f"no pool returned for {token_pair}")
+            get_lp_positions(token_pair, limit=200)
+
+
+def _warm_trades(symbol):
+    # get_trade_history returns [] when the sync fails; sync first, which
+    # raises if there is no stored log to fall back on.
+    sync_trade_log(symbol)
+    get_trade_history(symbol, limit=500, days=30)
+
+
+# Arguments mirror the routes so the warmed entries are the ones they read.
+TASKS = {
+    "info": _warm_info,
+    "richlist": get_richlist,
+    "pools": _warm_pools,
+    "trades": _warm_trades,
+}
+
+
+class Progress:
+    """Resumable record of finished (task, symbol) pairs plus throughput."""
+
+    def __init__(self, path, total, reset=False):
+        self.path = path
+        self.total = total
+        self.done = set()
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._completed_this_run = 0
+        self._last_save = 0.0
+        self._last_report = 0.0
+        if not reset and os.path.exists(path):
+            with open(path) as f:
+                self.done = {tuple(item) for item in json.load(f).get("done", [])}
+
+    def is_done(self, task, symbol):
+        return (task, symbol) in self.done
+
+    def record(self, task, symbol, ok):
+        with self._lock:
+            if ok:
+                self.done.add((task, symbol))
+            else:
+                self.failed += 1
+            self._completed_this_run += 1
+            now = time.monotonic()
+            if now - self._last_save >= 5:
+                self._save()
+                self._last_save = now
+            if now - self._last_report >= 10:
+                self._report()
+                self._last_report = now
+
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"done": sorted(self.done)}, f)
+        os.replace(tmp, self.path)
+
+    def _report(self):
+        elapsed = time.monotonic() - self._started
+        rate = self._completed_this_run / elapsed if elapsed else 0.0
+        remaining = self.total - len(self.done)
+        eta = remaining / rate if rate else float("inf")
+        current_app.logger.info(
+            "%d/%d warmed (%d failed), %.2f items/s, ETA %s",
+            len(self.done),
+            self.total,
+            self.failed,
+            rate,
+            time.strftime("%H:%M:%S", time.gmtime(eta)) if rate else "unknown",
+        )
+
+    def finish(self):
+        with self._lock:
+            self._report()
+            if len(self.done) >= self.total:
+                # A complete run leaves nothing to resume.
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+            else:
+                self._save()
+
+
+def prioritized_symbols():
+    """Return every token symbol, highest 24h market volume first."""
+    metrics = get_market_metrics() or {}
+
+    def volume(symbol):
+        try:
+            return float(metrics.get(symbol, {}).get("volume", 0) or 0)
+        except (TypeError, ValueError):
+            return 0.0
+
+    symbols = [t.get("symbol") for t in get_tokens() if t.get("symbol")]
+    return sorted(symbols, key=volume, reverse=True)
+
+
+def warm_caches(
+    tasks=tuple(TASKS),
+    workers=8,
+    rate=20.0,
+    state_file=STATE_FILE,
+    reset=False,
+    limit=None,
+):
+    """Warm the given cache ``tasks`` for every token, most active first."""
     app = create_app()
+    REGISTRY.start_flusher(app)
     with app.app_context():
-        tokens = get_tokens()
-        total = len(tokens)
-        current_app.logger.info("Warming richlist cache for %s tokens", total)
-        for idx, token in enumerate(tokens, start=1):
-            symbol = token.get("symbol")
-            if not symbol:
-                continue
-            try:
-                get_richlist(symbol)
-                current_app.logger.debug(
-                    "(%d/%d) Cached richlist for %s", idx, total, symbol
-                )
-            except Exception as exc:
-                current_app.logger.warning(
-                    "Failed to cache richlist for %s: %s", symbol, exc
-                )
-        current_app.logger.info("Richlist cache warm-up complete.")
+        set_rate_limit(rate)
+        symbols = prioritized_symbols()
+        if limit:
+            symbols = symbols[:limit]
+        work = [(task, symbol) for symbol in symbols for task in tasks]
+        progress = Progress(state_file, len(work), reset=reset)
+        pending = [item for item in work if not progress.is_done(*item)]
+        current_app.logger.info(
+            "Warming %s for %d tokens: %d items pending, %d already done",
+            ",".join(tasks),
+            len(symbols),
+            len(pending),
+            len(work) - len(pending),
+        )
+
+        if "info" in tasks:
+            # One $in query per 100 tokens instead of one call each; the
+            # per-item "info" tasks below then hit the cache.
+            get_token_infos([symbol for task, symbol in pending if task == "info"])
+
+        def run(task, symbol):
+            with app.app_context():
+                TASKS[task](symbol)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(run, task, symbol): (task, symbol)
+                for task, symbol in pending
+            }
+            for future in as_completed(futures):
+                task, symbol = futures[future]
+                try:
+                    future.result()
+                    progress.record(task, symbol, True)
+                except Exception as exc:
+                    current_app.logger.warning(
+                        "Failed to warm %s for %s: %s", task, symbol, exc
+                    )
+                    progress.record(task, symbol, False)
+        progress.finish()
+        current_app.logger.info("Cache warm-up complete.")
+
+
+def warm_richlists() -> None:
+    """Fetch all token symbols and warm their richlist caches."""
+    warm_caches(tasks=("richlist",))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--tasks",
+        default=",".join(TASKS),
+        help=f"comma-separated subset of: {', '.join(TASKS)}",
+    )
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument(
+        "--rate", type=float, default=20.0, help="max upstream calls per second"
+    )
+    parser.add_argument("--state-file", default=STATE_FILE)
+    parser.add_argument("--reset", action="store_true", help="ignore saved progress")
+    parser.add_argument("--limit", type=int, help="only warm the N most active tokens")
+    args = parser.parse_args()
+    tasks = tuple(t.strip() for t in args.tasks.split(",") if t.strip())
+    unknown = set(tasks) - set(TASKS)
+    if unknown:
+        parser.error(f"unknown tasks: {', '.join(sorted(unknown))}")
+    warm_caches(
+        tasks=tasks,
+        workers=args.workers,
+        rate=args.rate,
+        state_file=args.state_file,
+        reset=args.reset,
+        limit=args.limit,
+    )
 
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
-    warm_richlists()
+    main()